@@ -1,65 +1,162 @@
+import atexit
 import json
-from contextlib import contextmanager
+import threading
 from pathlib import Path
-from typing import Any, Tuple, TypeVar
+from typing import Any, Hashable, Optional, Tuple, TypeVar
 
 from rich import print
 
+from ideaseed import locking, ondisk
+
 T = TypeVar("T")
 
 
+class _Store:
+    """
+    The whole auth cache file, read once per process and shared by the caches of every service.
+    Changes are written back right after logging in, and when ideaseed exits (see `flush`).
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self._data: Optional[dict[str, Any]] = None
+        # Services whose data changed since the file was read. `None` means it was removed.
+        self.changes: dict[str, Optional[dict[str, Any]]] = {}
+        # Logged-in clients, by `Cache.client_key`
+        self.clients: dict[Hashable, Any] = {}
+
+    @property
+    def data(self) -> dict[str, Any]:
+        with self.lock:
+            return self._loaded()
+
+    def _loaded(self) -> dict[str, Any]:
+        if self._data is None:
+            self._data = self._read()
+        return self._data
+
+    def _read(self) -> dict[str, Any]:
+        try:
+            return json.loads(self.path.read_text() or "{}")
+        except FileNotFoundError:
+            return {}
+
+    def set(self, service: str, value: dict[str, Any]):
+        with self.lock:
+            self._loaded()[service] = value
+            self.changes[service] = value
+
+    def remove(self, service: str):
+        with self.lock:
+            self._loaded().pop(service, None)
+            self.changes[service] = None
+
+    def flush(self):
+        """
+        Writes changes back to the file.
+        The file is read again while holding a lock on it, so that changes made by another ideaseed process
+        in the meantime (to other services) are kept, and replaced all at once so that it is never half-written.
+        """
+        with self.lock:
+            if not self.changes:
+                return
+            with locking.locked(self.path):
+                on_disk = self._read()
+                for service, value in self.changes.items():
+                    if value is None:
+                        on_disk.pop(service, None)
+                    else:
+                        on_disk[service] = value
+                ondisk.atomic_write(self.path, json.dumps(on_disk), durability="file")
+            self._data = on_disk
+            self.changes.clear()
+
+    def clear(self):
+        """
+        Forgets everything, in memory and on disk.
+        """
+        with self.lock, locking.locked(self.path):
+            self.path.unlink(missing_ok=True)
+            self._data = {}
+            self.changes.clear()
+            self.clients.clear()
+
+
+_stores: dict[Path, _Store] = {}
+_stores_lock = threading.Lock()
+
+
+def store(path: Path) -> _Store:
+    with _stores_lock:
+        path = path.expanduser().absolute()
+        if path not in _stores:
+            _stores[path] = _Store(path)
+        return _stores[path]
+
+
+@atexit.register
+def flush():
+    """
+    Writes the changes made to every auth cache file during this process
+    """
+    for shared_store in list(_stores.values()):
+        shared_store.flush()
+
+
 class Cache:
     def __init__(self, path: Path, service: str):
         if not isinstance(path, Path):
             raise TypeError("Please use a Path for the `path` argument.")
         self.path = path
         self.service = service
-        self.create()
+        self.store = store(path)
         self.cache = self.read()
 
     def read(self) -> dict[str, Any]:
-        with open(self.path, "r") as file:
-            self.cache = json.load(file).get(self.service, {})
+        self.cache = self.store.data.get(self.service, {})
         return self.cache
 
-    def create(self):
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        if not (self.path.exists() and self.path.read_text() != ""):
-            self.path.write_text("{}")
-
-    @contextmanager
-    def modify(self):
-        """
-        Context manager that reads from the cache file (into `self.cache`), executes the given function, and writes back the result (from `self.cache`).
-        """
-        with open(self.path, "r") as file:
-            self.cache = json.load(file)
-
-        yield
-
-        with open(self.path, "w") as file:
-            json.dump(self.cache, file)
-
     def write(self, data: dict[str, Any]):
-        with self.modify():
-            self.cache |= {self.service: data}
+        self.store.set(self.service, data)
+        self.cache = data
 
     def clear(self):
         print(f"[black on yellow]Clearing [bold]{self.service}[/bold] cache...")
-        with self.modify():
-            del self.cache[self.service]
+        self.store.remove(self.service)
+        self.store.clients.pop(self.client_key, None)
+        self.cache = {}
 
     def clear_all(self):
-        self.path.unlink(missing_ok=True)
+        self.store.clear()
+        self.cache = {}
+
+    @property
+    def client_key(self) -> Hashable:
+        """
+        Caches with the same key share their logged-in client (see `login`)
+        """
+        return self.service
 
     def login(self) -> Any:
+        """
+        Logs in, from the cache if possible. Services are only logged into once per process.
+        New credentials are written to the auth cache file right away, so that a crash does not lose them.
+        """
+        if self.client_key in self.store.clients:
+            return self.store.clients[self.client_key]
+
         print(f"[dim]Logging into [blue bold]{self.service}[/]...")
         if self.cache:
-            return self.login_from_cache()
-
-        loggedin, cache_data = self.login_manually()
-        self.write(cache_data)
-        print("[dim]Logged in.")
+            loggedin = self.login_from_cache()
+        else:
+            loggedin, cache_data = self.login_manually()
+            self.write(cache_data)
+            self.store.flush()
+            print("[dim]Logged in.")
+
+        if loggedin is not None:
+            self.store.clients[self.client_key] = loggedin
         return loggedin
 
     def login_manually(self, **params) -> Tuple[Any, dict[str, Any]]:
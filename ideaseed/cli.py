@@ -7,6 +7,22 @@ Usage:
     ideaseed [options] version | --version
     ideaseed [options] help | --help
     ideaseed [options] update
+    ideaseed [options] sync queyd
+    ideaseed [options] [-# LABEL...] [-@ USER...] search QUERY
+    ideaseed [options] reindex
+    ideaseed [options] archive export DESTINATION
+    ideaseed [options] archive compact
+    ideaseed [options] archive dedupe
+    ideaseed [options] archive similar
+    ideaseed [options] watch DIR
+    ideaseed [options] daemon
+    ideaseed [options] [-# LABEL...] [-@ USER...] interactive [REPO]
+    ideaseed [options] completion SHELL
+    ideaseed [options] warm [REPOSITORIES...]
+    ideaseed [options] outbox
+    ideaseed [options] outbox send
+    ideaseed [options] pull user
+    ideaseed [options] pull REPO
     ideaseed [options] [-# LABEL...] [-@ USER...] user BODY
     ideaseed [options] [-# LABEL...] [-@ USER...] user TITLE BODY
     ideaseed [options] [-# LABEL...] [-@ USER...] user PROJECT TITLE BODY
@@ -30,10 +46,66 @@ Commands:
     version                 Outputs the version number
     update                  Check for updates. If any is available, shows the changelog. 
                             You can then decide to install the new version.
+    sync queyd              Saves notes from Queyd that were created or changed since the last sync
+                            into the --local-copy directory, as DIR/PROJECT/slug.md.
+                            Requires --queyd and --local-copy.
+    search                  Searches for QUERY in the titles and bodies of the ideas in the --local-copy directory.
+                            Results can be narrowed down with -#, -@, -P, -C, -M, --pin and --color
+                            (--color=white does not filter anything, since it is the default value).
+    reindex                 Updates the search index with local copies that were
+                            added, changed or deleted by something else than ideaseed.
+    archive export          Writes ideas saved with --local-copy-format=pack to DESTINATION,
+                            as one file per idea (the same layout as --local-copy-format=files).
+    archive compact         Merges older segments of a --local-copy-format=pack local copy
+                            into a compressed one, dropping ideas that were saved again since.
+    archive dedupe          Deletes local copies that have the same repo, title, body and url as another one
+                            (ignoring whitespace), keeping the oldest one. Use --dry-run to only list them.
+    archive similar         Lists groups of local copies that are worded almost the same.
+                            Before sending an idea, the most similar ones already in --local-copy
+                            are also shown.
+    watch                   Watches the local copies in DIR, and pushes changes made to their title, body,
+                            labels, milestone, pin state or color to the GitHub issue or Google Keep note
+                            they link to (see 'url' in Local Copy). Only changed fields are sent.
+                            Cards created in GitHub projects without an issue cannot be updated.
+                            Linux only.
+    pull                    Saves issues of REPO (or note cards of your user's projects, with 'pull user')
+                            that were created or changed since the last pull into the --local-copy directory,
+                            as DIR/[USER/]REPO/slug.md (or DIR/PROJECT/slug.md).
+                            When nothing changed, this only costs one request.
+    daemon                  Keeps ideaseed running in the background, logged in. While it runs,
+                            other ideaseed commands are sent to it instead of starting from scratch.
+                            Unix only.
+    interactive             Asks for ideas one after the other, until an empty body is entered,
+                            and sends them all to REPO (or to Google Keep) with the same options.
+                            Ideas are sent in the background while the next one is typed,
+                            and a summary is shown at the end.
+    completion              Outputs the completion script for SHELL. Add 'source (ideaseed completion fish | psub)'
+                            (or 'source <(ideaseed completion bash)', or zsh) to your shell's configuration file.
+                            Repositories, and the projects, columns, labels and milestones
+                            of the repositories you sent ideas to, are completed from a local cache
+                            that is refreshed in the background once a day.
+    warm                    Fills the local cache of GitHub metadata (see completion) right away:
+                            projects, columns, labels, milestones and collaborators of REPOSITORIES
+                            (by default, the ones ideas were sent to, and the ones in --local-copy).
+                            Repositories are fetched concurrently, using at most half of
+                            what is left of GitHub's rate limit. Meant to be run by cron.
+    outbox                  Lists the ideas that could not be sent everywhere before the --deadline,
+                            with where they still have to go.
+    outbox send             Sends the ideas of the outbox where they still have to go,
+                            oldest first, with the options they were sent with the first time
+                            (but with this command's --deadline and --dry-run).
 
 
 Arguments:
     BODY      Sets the note's body. Required.
+    QUERY     Words to search for. Ideas containing all of them are shown.
+              Use "" to only filter ideas with the given options, most recent first.
+    DESTINATION
+              Directory to export ideas to.
+    DIR       A --local-copy directory.
+    SHELL     bash, zsh or fish.
+    REPOSITORIES
+              Repositories to warm the cache of, as [USER/]REPO.
     TITLE     Sets the title.
     REPO      The repository to put the issue/card into. Uses the format [USER/]REPO. 
               If USER/ is omitted, the currently-logged-in user's username is assumed.
@@ -43,8 +115,10 @@ Arguments:
     PROJECT   Specify which GitHub project to add the card to.
               When used without COLUMN, the card is added to the Default Column (see --default-column)
               Can use Placeholders
+              Can also be the project's number, node ID or URL, which does not need to list every project.
     COLUMN    Specify which column to use.
               Can use Placeholders.
+              Can also be the column's ID, node ID or URL (as copied from the column's menu).
 
 
 Options:
@@ -68,11 +142,19 @@ Options:
                             Cannot be used in the 'user' command.
                             Cannot be used with --no-issue
        --debug              Shows extra information. Used for debugging purposes.
+       --profile            Shows how many requests were sent to GitHub and Google Keep,
+                            what is left of their rate limits and how long was spent waiting for them,
+                            once the command is done.
+       --deadline=SECONDS   Gives up after SECONDS seconds (calls that can't be cut short,
+                            such as logging into Google Keep, get 2 more seconds).
+                            What was not created by then is listed, the idea is put in the outbox
+                            (see outbox) and ideaseed exits with status 75.
 
     REPO only: 
        --self-assign        Assign the created issue to yourself. 
                             Has no effect when --assign is used.
     -M --milestone=NAME     Adds the issue to the milestone NAME.
+                            NAME can also be the milestone's number, node ID or URL.
 
     Google Keep only:
        --pin                Pins the card. 
@@ -106,6 +188,17 @@ Configuration:
                                     ideas will not get saved locally.
                                     DIR must exist beforehand. ~ and ~user constructs get expanded.
                                     See Local Copy for more information.
+   --local-copy-format=FORMAT       How local copies are stored [default: files]
+                                    files: one markdown file per idea, see Local Copy.
+                                    pack:  ideas are appended to a few big files, inside DIR/.ideaseed/pack.
+                                           Way faster to store, backup and replicate with lots of ideas.
+                                           Use 'archive export' to get them as files.
+                                           Ideas stored this way are not seen by 'search'.
+   --on-conflict=POLICY             What to do when a local copy with the same name already exists [default: ask]
+                                    ask:       ask whether to overwrite it.
+                                               Acts like 'suffix' when stdin is not a terminal.
+                                    suffix:    save to DIR/[USER/]REPO/slug-2.md (or -3, -4...) instead.
+                                    overwrite: replace it.
    --queyd=SERVICE_URL              Set Queyd GraphQL API endpoint URL.
 
 
@@ -134,6 +227,8 @@ Local Copy:
     assignees:      People assigned           (related to -@ / --assign)
     color:          The card's color          (related to --color)
     column:         The project's column      (related to -C / --column)
+    fingerprint:    A hash of the repo, title and body. Saving an idea that has the same fingerprint
+                    and url as an existing local copy does not write a new file.
     labels:         Included labels           (related to -# / --label)
     milestone:      Assigned milestone        (related to -M / --milestone)
     pinned:         The card's pinned state   (related to --pin)
@@ -152,18 +247,25 @@ Local Copy:
 
 from __future__ import annotations
 
+import math
+import sys
+from datetime import datetime
 from pathlib import Path
+from time import monotonic
 from typing import Any, Optional
 
+import rich.markup
 from docopt import docopt
 from rich import print
 
-from ideaseed import (authentication, config_wizard, github_cards, gkeep,
-                      ondisk, queyd, ui, update_checker)
-from ideaseed.constants import VALID_COLOR_NAMES, VERSION
+from ideaseed import (authentication, completion, config_wizard, daemon,
+                      deadline, fanout, github_cards, gkeep, interactive_mode,
+                      locking, metadata, ondisk, outbox, pack, queyd,
+                      ratelimit, search, sync, update_checker, watch)
+from ideaseed.constants import DEADLINE_EXIT_STATUS, VALID_COLOR_NAMES, VERSION
 from ideaseed.ondisk import Idea
 from ideaseed.queyd import QueydClient
-from ideaseed.ui import ABOUT_SCREEN, make_table, show_dry_run_banner
+from ideaseed.ui import ABOUT_SCREEN, show_dry_run_banner
 from ideaseed.update_checker import get_latest_version
 from ideaseed.utils import english_join, remove_duplicates_in_list_of_dict
 
@@ -174,6 +276,10 @@ class UsageError(Exception):
     pass
 
 
+# Keys of commands that would otherwise end up in the same key as an option
+COMMAND_KEYS = {"queyd": "sync_queyd"}
+
+
 def run(argv=None):
     """
     `run` is `do` with KeyboardInterrupts catched and displayed nicely.
@@ -189,7 +295,6 @@ def run(argv=None):
 def do(argv=None):
     flags = docopt(__doc__, argv)
     args = flags_to_args(flags)
-    idea = Idea()
 
     # docopt freaks out and duplicates any non-first --label occurence, so we remove them
     args = remove_duplicates_in_list_of_dict(args)
@@ -204,6 +309,22 @@ def do(argv=None):
     if args["debug"]:
         print(args)
 
+    seconds = parse_deadline(args["deadline"])
+    started = monotonic()
+    # The daemon runs many commands in the same process
+    ratelimit.reset_counters()
+    try:
+        with deadline.enforced(seconds):
+            run_command(args)
+    except deadline.DeadlineExceeded as error:
+        print(f"[red]{error}: stopped before anything was sent", file=sys.stderr)
+        sys.exit(DEADLINE_EXIT_STATUS)
+    finally:
+        if args["profile"]:
+            show_profile(monotonic() - started)
+
+
+def run_command(args: dict[str, Any]):
     # Initialize auth caches
     auth_cache_path = None
     github_cache = None
@@ -228,6 +349,8 @@ def do(argv=None):
 
     # Validate color's value
     validate_tag_color(args["color"])
+    validate_local_copy_format(args["local_copy_format"])
+    validate_on_conflict(args["on_conflict"])
 
     # Check for updates
     if not args["update"]:
@@ -266,41 +389,304 @@ def do(argv=None):
         authentication.Cache(auth_cache_path, "whatever").clear_all()
         return
 
-    elif args["user"]:
-        show_dry_run_banner(**args)
-        idea = github_cards.push_to_user(**args) or Idea()
+    elif args["sync"]:
+        local_copy_dir = get_local_copy_dir(args["local_copy"])
+        if not (queyd_client and local_copy_dir):
+            raise UsageError("sync queyd needs both --queyd and --local-copy")
+        report = sync.sync_queyd(queyd_client, local_copy_dir)
+        print(
+            f"Synced [bold blue]{len(report.created)}[/] new and [bold blue]{len(report.updated)}[/] changed notes from Queyd"
+        )
+        show_conflicts(report)
+        return
 
-    elif args["repo"]:
-        show_dry_run_banner(**args)
-        idea = github_cards.push_to_repo(**args) or Idea()
+    elif args["search"] or args["reindex"]:
+        local_copy_dir = get_local_copy_dir(args["local_copy"])
+        if not local_copy_dir:
+            raise UsageError(
+                f"{'search' if args['search'] else 'reindex'} needs --local-copy"
+            )
+        if args["reindex"]:
+            reindexed, removed = search.reindex(local_copy_dir)
+            print(
+                f"Indexed [bold blue]{reindexed}[/] local copies, removed [bold blue]{removed}[/] deleted ones"
+            )
+            return
+        show_search_results(
+            search.search(
+                local_copy_dir,
+                args["query"],
+                labels=args["label"],
+                project=args["project"],
+                column=args["column"],
+                milestone=args["milestone"],
+                assignees=args["assign"],
+                color=None if args["color"] == "white" else args["color"],
+                pinned=True if args["pin"] else None,
+            ),
+            local_copy_dir,
+        )
+        return
 
-    else:
-        show_dry_run_banner(**args)
-        idea = gkeep.push_to_gkeep(**args) or Idea()
+    elif args["pull"]:
+        local_copy_dir = get_local_copy_dir(args["local_copy"])
+        if not local_copy_dir:
+            raise UsageError("pull needs --local-copy")
+        gh = github_cache.login()
+        if args["user"]:
+            report = sync.pull_user_cards(gh, local_copy_dir)
+        else:
+            metadata_dir = metadata.directory(auth_cache_path)
+            repo = github_cards.resolve_repository(gh, args["repo"], metadata_dir)
+            report = sync.pull_issues(
+                gh,
+                github_cards.resolve_self_repository_shorthand(gh, repo, metadata_dir),
+                local_copy_dir,
+            )
+        print(
+            f"Pulled [bold blue]{len(report.created)}[/] new and [bold blue]{len(report.updated)}[/] changed ideas"
+        )
+        show_conflicts(report)
+        return
+
+    elif args["watch"]:
+        local_copy_dir = get_local_copy_dir(args["dir"])
+        if not local_copy_dir:
+            raise UsageError("watch needs an existing directory")
+        watch.watch(local_copy_dir, auth_cache_path, dry_run=args["dry_run"])
+        return
+
+    elif args["daemon"]:
+        daemon.serve()
+        return
 
-    if args["local_copy"] and idea.body and not args["dry_run"]:
-        local_copy_dir = Path(args["local_copy"]).expanduser()
-        if not local_copy_dir.exists() or not local_copy_dir.is_dir():
+    elif args["archive"]:
+        local_copy_dir = get_local_copy_dir(args["local_copy"])
+        if not local_copy_dir:
+            raise UsageError("archive needs --local-copy")
+        if args["export"]:
+            exported = pack.export(
+                local_copy_dir, Path(args["destination"]).expanduser()
+            )
+            print(f"Exported [bold blue]{exported}[/] ideas to {args['destination']}")
+        elif args["compact"]:
+            merged, kept = pack.compact(local_copy_dir)
+            print(
+                f"Compacted [bold blue]{merged}[/] segments, keeping [bold blue]{kept}[/] ideas"
+            )
+        elif args["dedupe"]:
+            removed = ondisk.dedupe(local_copy_dir, dry_run=args["dry_run"])
+            for duplicate, original in removed:
+                print(
+                    f"[dim]{duplicate.relative_to(local_copy_dir)}[/] is a duplicate of {original.relative_to(local_copy_dir)}"
+                )
             print(
-                f"[red]Given directory for --local-copy ([bold]{local_copy_dir}[/bold]) does not exist or is not a directory"
+                f"{'Would remove' if args['dry_run'] else 'Removed'} [bold blue]{len(removed)}[/] duplicates"
+            )
+        elif args["similar"]:
+            clusters = search.similar_clusters(local_copy_dir)
+            for cluster in clusters:
+                print(f"[bold]{len(cluster)}[/] similar ideas:")
+                for path in cluster:
+                    print(f"    [dim]{path.relative_to(local_copy_dir)}[/]")
+            if not clusters:
+                print("[yellow]No similar ideas found")
+        return
+
+    elif args["completion"]:
+        if args["shell"] not in completion.SHELLS:
+            raise UsageError(
+                f"{args['shell']!r} is not a supported shell. Supported shells are {english_join(list(completion.SHELLS))}"
             )
-        elif saved_to := ondisk.save(
-            local_copy=local_copy_dir, idea=idea, repo=args["repo"]
-        ):
-            ui.get_console().print(make_table(local_copy=saved_to))
+        metadata_dir = metadata.directory(auth_cache_path)
+        sys.stdout.write(
+            completion.script(
+                args["shell"], metadata_dir / metadata.COMPLETION_INDEX_FILE, __doc__
+            )
+        )
+        if github_cache.cache and metadata.needs_refresh(metadata_dir):
+            metadata.refresh_in_background(auth_cache_path)
+        return
+
+    elif args["warm"]:
+        if not github_cache.cache:
+            github_cache.login()
+        warmed = metadata.warm(
+            github_cache.login_from_cache,
+            metadata.directory(auth_cache_path),
+            args["repositories"],
+            local_copy=get_local_copy_dir(args["local_copy"]),
+        )
+        for repo, requests, unchanged, seconds, error in warmed:
+            status = f"[red]{rich.markup.escape(str(error))}" if error else ""
+            print(
+                f"[bold]{repo}[/]: [blue]{requests}[/] requests ([blue]{unchanged}[/] unchanged) in [blue]{seconds:.2f}[/]s {status}"
+            )
+        if any(result.error for result in warmed):
+            sys.exit(1)
+        return
+
+    elif args["outbox"]:
+        outbox_dir = outbox.directory(auth_cache_path)
+        if args["send"]:
+            send_outbox(args, outbox_dir, auth_cache_path)
+        else:
+            show_outbox(outbox_dir)
+        return
+
+    elif args["interactive"]:
+        resolve_repository(args, github_cache, auth_cache_path)
+        refresh_metadata_if_needed(args, github_cache, auth_cache_path)
+        show_dry_run_banner(**args)
+        interactive_mode.run(args, get_local_copy_dir(args["local_copy"]), queyd_client)
+        return
+
+    if local_copy_dir := get_local_copy_dir(args["local_copy"]):
+        show_similar_ideas(idea_from_args(args), local_copy_dir)
+
+    destinations = [outbox.PUSH]
+    if not args["dry_run"]:
+        destinations += [outbox.QUEYD] if queyd_client else []
+        destinations += [outbox.LOCAL_COPY] if local_copy_dir else []
+
+    idea, unfinished = send_idea(
+        args, destinations, idea_from_args(args), queyd_client, auth_cache_path
+    )
+    if unfinished:
+        if not args["dry_run"]:
+            outbox.put(
+                outbox.directory(auth_cache_path),
+                outbox.Entry(args, unfinished, idea._asdict()),
+            )
+            print("[yellow]The idea was put in the outbox, see 'ideaseed outbox send'")
+        sys.exit(DEADLINE_EXIT_STATUS)
+
+
+def send_idea(
+    args: dict[str, Any],
+    destinations: list[str],
+    idea: Idea,
+    queyd_client: Optional[QueydClient],
+    auth_cache_path: Path,
+) -> tuple[Idea, list[str]]:
+    """
+    Sends `idea` to `destinations` (see `ideaseed.outbox`), and shows what was created.
+    Returns the idea as it was sent, and the destinations it was not sent to before the deadline.
+    """
+    done = set()
+    outcomes: dict[str, fanout.Outcome] = {}
+    in_background = []
+    try:
+        if outbox.PUSH in destinations:
+            github_cache = github_cards.AuthCache(auth_cache_path)
+            resolve_repository(args, github_cache, auth_cache_path)
+            refresh_metadata_if_needed(args, github_cache, auth_cache_path)
+
+        if outbox.PUSH in destinations:
+            show_dry_run_banner(**args)
+            try:
+                if args["user"]:
+                    idea = github_cards.push_to_user(**args) or Idea()
+                elif args["repo"]:
+                    idea = github_cards.push_to_repo(**args) or Idea()
+                else:
+                    idea = gkeep.push_to_gkeep(**args) or Idea()
+            except deadline.DeadlineExceeded as error:
+                if not error.created:
+                    raise
+                # Pushing again would create it twice
+                print(f"[yellow]{error}, add {error.created} to it yourself")
+                idea.url = error.created
+            done.add(outbox.PUSH)
+
+        if not idea.body:
+            # Nothing to send when nothing was pushed
+            done |= {outbox.QUEYD, outbox.LOCAL_COPY}
         else:
-            print("[yellow]Did not save a local copy")
+            # Queyd gets the idea as it was pushed (with defaults applied, created labels...)
+            # while the local copy is written
+            if outbox.QUEYD in destinations:
+                in_background = fanout.start([fanout.to_queyd(queyd_client, idea)])
+            if outbox.LOCAL_COPY in destinations:
+                # Might ask before overwriting, so it has to run in the foreground
+                outcomes[outbox.LOCAL_COPY] = fanout.run(
+                    fanout.to_local_copy(
+                        Path(args["local_copy"]).expanduser(),
+                        idea,
+                        args["repo"],
+                        local_copy_format=args["local_copy_format"],
+                        on_conflict=args["on_conflict"],
+                    )
+                )
+
+    except deadline.DeadlineExceeded as error:
+        # Don't get interrupted while reporting
+        deadline.disarm()
+        print(f"[red]{error}")
+
+    if in_background:
+        (outcomes[outbox.QUEYD],) = fanout.finish(in_background)
+    # Other errors are reported, but sending again would not fix them
+    done |= {
+        destination
+        for destination, outcome in outcomes.items()
+        if not isinstance(outcome.error, deadline.DeadlineExceeded)
+    }
+
+    fanout.report(outcomes.values())
+    unfinished = [
+        destination for destination in destinations if destination not in done
+    ]
+    if unfinished:
+        print(f"[yellow]Not sent to {english_join(unfinished)} before the deadline")
+    return idea, unfinished
+
+
+def show_outbox(outbox_dir: Path):
+    entries = outbox.entries(outbox_dir) if outbox_dir.exists() else []
+    if not entries:
+        print("[yellow]The outbox is empty")
+    for path, entry in entries:
+        idea = entry.as_idea
+        print(
+            f"[bold]{rich.markup.escape(idea.title or ondisk.first_line(idea.body))}[/] [dim]({path.stem})"
+        )
+        print(f"    still has to be sent to {english_join(entry.pending)}")
 
-    if args["queyd"] and queyd and not args["dry_run"]:
-        try:
-            gql_response = queyd_client.add(idea).json()
-            if gql_response.get("data"):
-                data = gql_response["data"]
-                ui.get_console().print(make_table(queyd_id=data["add"]["id"]))
-            else:
-                print(f"[red]Couldn't add idea to Queyd: {gql_response.get('errors')}")
-        except Exception as e:
-            print(f"[red]Failed to add idea to Queyd: {e}")
+
+def send_outbox(args: dict[str, Any], outbox_dir: Path, auth_cache_path: Path):
+    """
+    Sends ideas of the outbox where they still have to go (see `send_idea`), oldest first,
+    and stops at the first one that is not sent everywhere before the deadline
+    """
+    if not outbox_dir.exists():
+        print("[yellow]The outbox is empty")
+        return
+    # Another `outbox send` would send the same ideas
+    with locking.locked(outbox_dir / "send"):
+        for path, entry in outbox.entries(outbox_dir):
+            entry_args = entry.args | {
+                "deadline": args["deadline"],
+                "dry_run": args["dry_run"],
+                "open": False,
+            }
+            # Only pushing shows what would happen, the other destinations would be sent to for real
+            pending = entry.pending
+            if args["dry_run"]:
+                pending = [outbox.PUSH] if outbox.PUSH in pending else []
+            queyd_client = None
+            if outbox.QUEYD in pending:
+                queyd_client = queyd.AuthCache(
+                    auth_cache_path, entry_args["queyd"]
+                ).login()
+            _, unfinished = send_idea(
+                entry_args, pending, entry.as_idea, queyd_client, auth_cache_path
+            )
+            if args["dry_run"]:
+                continue
+            outbox.update(path, entry._replace(pending=unfinished))
+            if unfinished:
+                sys.exit(DEADLINE_EXIT_STATUS)
 
 
 def flags_to_args(flags: dict[str, Any]) -> dict[str, Any]:
@@ -310,7 +696,8 @@ def flags_to_args(flags: dict[str, Any]) -> dict[str, Any]:
     and keys are lowercased.
     When conflicts arise (ie --repo: None vs REPO: "ideaseed"), do a 'or',
     prefering values appearing sooner in the dict.
-    Also replaces `'<None>'` with `None`
+    Also replaces `'<None>'` with `None`.
+    Commands that have the same name as an option get a key of their own (see `COMMAND_KEYS`).
 
     >>> flags_to_args({'--about': False,
     ... '--assign': None,
@@ -326,12 +713,16 @@ def flags_to_args(flags: dict[str, Any]) -> dict[str, Any]:
     ... 'TITLE': 'a',
     ... 'version': True})
     {'about': False, 'assign': None, 'auth_cache': '~/.cache/ideaseed/auth.json', 'create_missing': False, 'default_project': None, 'label': None, 'title': 'a', 'version': True, 'body': 'b', 'column': None, 'repo': None}
+    >>> flags_to_args({'--queyd': 'https://queyd.example', 'queyd': True, 'sync': True})
+    {'queyd': 'https://queyd.example', 'sync_queyd': True, 'sync': True}
     """
     args = {}
     for name, value in flags.items():
         if value == "<None>":
             flags[name] = None
-        normalized_name = name.removeprefix("--").replace("-", "_").lower()
+        normalized_name = COMMAND_KEYS.get(
+            name, name.removeprefix("--").replace("-", "_").lower()
+        )
         args[normalized_name] = (
             args[normalized_name] or flags[name]
             if normalized_name in args
@@ -341,6 +732,126 @@ def flags_to_args(flags: dict[str, Any]) -> dict[str, Any]:
     return args
 
 
+def show_search_results(results: list[search.SearchResult], local_copy: Path):
+    if not results:
+        print("[yellow]No idea found")
+        return
+    for result in results:
+        print(
+            f"[bold]{rich.markup.escape(result.title or ondisk.first_line(result.body))}[/]"
+        )
+        print(f"    [dim]{result.path.relative_to(local_copy)}[/]")
+        if result.url:
+            print(f"    [blue link {result.url}]{rich.markup.escape(result.url)}")
+
+
+def show_conflicts(report: sync.SyncReport):
+    for conflict in report.conflicts:
+        print(f"[yellow]Not overwriting [bold]{conflict}[/bold], which already exists")
+    if report.interrupted:
+        print(
+            f"[yellow]Stopped early: {rich.markup.escape(report.interrupted)}. Run the same command later to get the rest."
+        )
+
+
+def show_profile(seconds: float):
+    """
+    Shows what was sent to each host (see `ideaseed.ratelimit`), on stderr so that it does not mix with output
+    """
+    print(f"[bold]Profile[/]: done in [blue]{seconds:.2f}[/]s", file=sys.stderr)
+    for budget in ratelimit.budgets():
+        print(
+            f"    [bold]{budget.host}[/] ({budget.account}): [blue]{budget.requests}[/] requests, "
+            f"[blue]{budget.retries}[/] retried, waited [blue]{budget.waited:.2f}[/]s",
+            file=sys.stderr,
+        )
+        for name, limit in sorted(budget.limits.items()):
+            print(
+                f"        {name}: [blue]{limit.remaining}[/]/{limit.limit} left, "
+                f"resets at {datetime.fromtimestamp(limit.reset):%H:%M:%S}",
+                file=sys.stderr,
+            )
+
+
+def show_similar_ideas(idea: Idea, local_copy: Path):
+    """
+    Shows ideas of the local copy that look like `idea`, if the local copy was indexed already
+    """
+    if not (local_copy / ondisk.STATE_DIR_NAME / search.INDEX_FILE).exists():
+        return
+    similar_ideas = search.similar(local_copy, idea, limit=3)
+    if not similar_ideas:
+        return
+    print("[yellow]You already had similar ideas:")
+    for similar_idea in similar_ideas:
+        print(
+            f"[bold]{rich.markup.escape(similar_idea.title or ondisk.first_line(similar_idea.body))}[/] [dim]({similar_idea.similarity:.0%} similar)"
+        )
+        print(f"    [dim]{similar_idea.path.relative_to(local_copy)}[/]")
+        if similar_idea.url:
+            print(
+                f"    [blue link {similar_idea.url}]{rich.markup.escape(similar_idea.url)}"
+            )
+
+
+def resolve_repository(
+    args: dict[str, Any], github_cache: github_cards.AuthCache, auth_cache_path: Path
+):
+    """
+    Replaces REPO with the repository it refers to (see `github_cards.resolve_repository`),
+    so that local copies of ideas sent to it end up in the same directory whatever way it is typed
+    """
+    if github_cache and args["repo"] and not args["user"]:
+        args["repo"] = github_cards.resolve_repository(
+            github_cache.login(), args["repo"], metadata.directory(auth_cache_path)
+        )
+
+
+def refresh_metadata_if_needed(
+    args: dict[str, Any], github_cache: github_cards.AuthCache, auth_cache_path: Path
+):
+    """
+    Refreshes the metadata cache in the background if it is too old or misses the repository ideas are sent to,
+    so that shell completion knows about it next time
+    """
+    repos = [args["repo"]] if args["repo"] else []
+    if (
+        github_cache
+        and github_cache.cache
+        and metadata.needs_refresh(metadata.directory(auth_cache_path), repos)
+    ):
+        metadata.refresh_in_background(auth_cache_path, repos)
+
+
+def idea_from_args(args: dict[str, Any]) -> Idea:
+    """
+    The idea as given on the command line, before anything is resolved by GitHub or Google Keep
+    """
+    return Idea(
+        title=args["title"] or "",
+        body=args["body"] or "",
+        project=args["project"] or "",
+        labels=list(args["label"] or []),
+        repo=args["repo"] or "",
+    )
+
+
+def get_local_copy_dir(local_copy: Optional[str]) -> Optional[Path]:
+    """
+    Returns the expanded --local-copy directory, or `None` if it is not set or is not a directory
+    (in which case an error is printed)
+    """
+    if not local_copy:
+        return None
+    local_copy_dir = Path(local_copy).expanduser()
+    if not local_copy_dir.exists() or not local_copy_dir.is_dir():
+        print(
+            f"[red]Given directory for --local-copy ([bold]{local_copy_dir}[/bold]) does not exist or is not a directory"
+        )
+        return None
+    return local_copy_dir
+
+
 def check_for_updates(check_for_updates_flag: bool):
     if check_for_updates_flag:
         latest_version = get_latest_version()
@@ -348,6 +859,40 @@ def check_for_updates(check_for_updates_flag: bool):
             update_checker.notification(VERSION, latest_version)
 
 
+def parse_deadline(seconds: Optional[str]) -> Optional[float]:
+    """
+    >>> parse_deadline("2.5")
+    2.5
+    >>> parse_deadline(None) is None
+    True
+    """
+    if not seconds:
+        return None
+    try:
+        parsed = float(seconds)
+    except ValueError:
+        parsed = None
+    if parsed is None or not math.isfinite(parsed) or parsed <= 0:
+        raise UsageError(
+            f"{seconds!r} is not a valid deadline. It should be a positive number of seconds"
+        )
+    return parsed
+
+
+def validate_local_copy_format(local_copy_format: str):
+    if local_copy_format not in ("files", "pack"):
+        raise UsageError(
+            f"{local_copy_format!r} is not a valid local copy format. Valid formats are files and pack"
+        )
+
+
+def validate_on_conflict(on_conflict: str):
+    if on_conflict not in ("ask", "suffix", "overwrite"):
+        raise UsageError(
+            f"{on_conflict!r} is not a valid conflict policy. Valid policies are ask, suffix and overwrite"
+        )
+
+
 def validate_tag_color(color: Optional[str]):
     if color and color not in map(str.lower, VALID_COLOR_NAMES):
         raise UsageError(
@@ -0,0 +1,232 @@
+"""
+Shell completion for bash, zsh and fish (``ideaseed completion SHELL``).
+
+Completing names of repositories, projects, columns, labels and milestones through GitHub's API
+would take seconds, so candidates come from the index written by `ideaseed.metadata`.
+Completion scripts never start Python: they run a single awk program, that knows ideaseed's
+usage patterns and options (read from the CLI's docstring when the script is generated)
+and reads the index directly.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+
+from docopt import parse_defaults
+
+SHELLS = ("bash", "zsh", "fish")
+
+# What option values and positional arguments are completed with
+KINDS = {
+    "--repo": "repo",
+    "--project": "project",
+    "--column": "column",
+    "--label": "label",
+    "--milestone": "milestone",
+}
+
+# Run with the index as its first argument, followed by the words typed so far
+# (the last one being the word to complete). Prints one candidate per line.
+# Set `quote` to escape candidates for bash, and `keep_option` for shells that
+# complete --option=value as a single word.
+AWK_PROGRAM = r"""
+function emit(name) {
+    if (index(name, prefix) != 1 || name in seen)
+        return
+    seen[name] = 1
+    if (quote)
+        gsub("[][ \t!\"#$&\047()*;<>?\\\\`{|}~^]", "\\\\&", name)
+    print shown name
+}
+function canonical(name) {
+    return (name in long) ? long[name] : name
+}
+BEGIN {
+    FS = "\t"
+@DEFINITIONS@
+    # bash splits --option=value into --option, = and value
+    count = 0
+    for (i = 2; i < ARGC; i++) {
+        if (ARGV[i] == "=" && count > 0) {
+            words[count - 1] = words[count - 1] "="
+            glue = 1
+        } else if (glue) {
+            words[count - 1] = words[count - 1] ARGV[i]
+            glue = 0
+        } else {
+            words[count++] = ARGV[i]
+        }
+    }
+    ARGC = 2
+    if (count == 0)
+        words[count++] = ""
+    current = words[count - 1]
+
+    positionals = 0
+    for (i = 0; i < count - 1; i++) {
+        word = canonical(words[i])
+        if (word in takes_value) {
+            if (i + 1 < count - 1)
+                value[word] = words[i + 1]
+            i++
+        } else if (word ~ /^-[^=]*=/) {
+            value[canonical(substr(word, 1, index(word, "=") - 1))] = substr(word, index(word, "=") + 1)
+        } else if (word !~ /^-/) {
+            positional[positionals++] = word
+        }
+    }
+    repo = value["--repo"]
+    project = value["--project"]
+
+    if (count >= 2 && canonical(words[count - 2]) in takes_value && words[count - 2] !~ /=/) {
+        option = canonical(words[count - 2])
+        prefix = current
+    } else if (current ~ /^-[^=]*=/) {
+        option = canonical(substr(current, 1, index(current, "=") - 1))
+        prefix = substr(current, index(current, "=") + 1)
+        if (keep_option)
+            shown = substr(current, 1, index(current, "="))
+    } else if (current ~ /^-/) {
+        prefix = current
+        for (i = 1; i <= option_count; i++)
+            emit(options[i])
+        exit
+    }
+    if (option != "") {
+        if (option in kind_of)
+            want[kind_of[option]] = 1
+    } else {
+        prefix = current
+        for (p = 1; p <= pattern_count; p++) {
+            n = split(patterns[p], tokens, " ")
+            if (n <= positionals)
+                continue
+            matched = 1
+            pattern_repo = repo
+            pattern_project = project
+            for (k = 0; k < positionals; k++) {
+                token = tokens[k + 1]
+                if (token ~ /^[a-z]/ && token != positional[k]) {
+                    matched = 0
+                    break
+                }
+                if (token == "REPO")
+                    pattern_repo = positional[k]
+                if (token == "PROJECT")
+                    pattern_project = positional[k]
+            }
+            if (!matched)
+                continue
+            token = tokens[positionals + 1]
+            if (token ~ /^[a-z]/)
+                emit(token)
+            else if (token == "SHELL")
+                for (i = 1; i <= shell_count; i++)
+                    emit(shells[i])
+            else if (token == "REPO" || token == "PROJECT" || token == "COLUMN") {
+                want[tolower(token)] = 1
+                repo = pattern_repo
+                project = pattern_project
+            }
+        }
+    }
+
+    # Only read the index if there is something to look for in it
+    wanted = 0
+    for (kind in want)
+        wanted = 1
+    if (!wanted)
+        exit
+}
+($1 in want) && ($1 == "repo" || repo == "" || $2 == repo) && ($1 != "column" || project == "" || $3 == project) {
+    emit($4)
+}
+"""
+
+
+def usage_patterns(doc: str) -> list[str]:
+    """
+    Commands and positional arguments of each usage pattern of `doc`
+
+    >>> usage_patterns('''Usage:
+    ...     ideaseed [options] about | --about
+    ...     ideaseed [options] [-# LABEL...] interactive [REPO]
+    ...     ideaseed [options] REPO TITLE BODY
+    ...
+    ... Commands:''')
+    ['about', 'interactive REPO', 'REPO TITLE BODY']
+    """
+    usage = doc.split("Usage:", 1)[1].split("\n\n", 1)[0]
+    patterns = []
+    for line in usage.strip().splitlines():
+        words = re.sub(r"\[-[^]]*\]|\[options\]", "", line).split("|")[0].split()[1:]
+        patterns.append(" ".join(word.strip("[].") for word in words))
+    return patterns
+
+
+def _awk_string(text: str) -> str:
+    return json.dumps(text, ensure_ascii=False)
+
+
+def definitions(doc: str) -> str:
+    """
+    awk statements that define the usage patterns and options of `doc`
+    """
+    statements = []
+    for number, pattern in enumerate(usage_patterns(doc), start=1):
+        statements.append(f"patterns[{number}] = {_awk_string(pattern)}")
+    statements.append(f"pattern_count = {len(usage_patterns(doc))}")
+
+    names = []
+    for option in parse_defaults(doc):
+        if option.long:
+            names.append(option.long)
+            if option.short:
+                statements.append(
+                    f"long[{_awk_string(option.short)}] = {_awk_string(option.long)}"
+                )
+            if option.argcount:
+                statements.append(f"takes_value[{_awk_string(option.long)}] = 1")
+    for number, name in enumerate(names, start=1):
+        statements.append(f"options[{number}] = {_awk_string(name)}")
+    statements.append(f"option_count = {len(names)}")
+
+    for option, kind in KINDS.items():
+        statements.append(f"kind_of[{_awk_string(option)}] = {_awk_string(kind)}")
+    for number, shell in enumerate(SHELLS, start=1):
+        statements.append(f"shells[{number}] = {_awk_string(shell)}")
+    statements.append(f"shell_count = {len(SHELLS)}")
+    return "\n".join(f"    {statement}" for statement in statements)
+
+
+def script(shell: str, index: Path, doc: str) -> str:
+    """
+    The completion script for `shell`, to be sourced from its configuration file.
+    """
+    program = AWK_PROGRAM.replace("@DEFINITIONS@", definitions(doc))
+    if shell == "fish":
+        # Backslashes are the only thing (besides quotes) that fish unescapes in single quotes
+        program = program.replace("\\", "\\\\")
+        return f"""function __ideaseed_complete
+    set -l words (commandline -opc)
+    set -l current (commandline -ct)
+    awk -v keep_option=1 '{program}' {_shell_quote(index)} $words[2..-1] "$current" 2>/dev/null
+end
+complete -c ideaseed -f -a '(__ideaseed_complete)'
+"""
+
+    function = f"""_ideaseed_complete() {{
+    local IFS=$'\\n'
+    COMPREPLY=($(awk -v quote=1 {"-v keep_option=1 " if shell == "zsh" else ""}'{program}' {_shell_quote(index)} "${{COMP_WORDS[@]:1:COMP_CWORD}}" 2>/dev/null))
+}}
+complete -o default -F _ideaseed_complete ideaseed
+"""
+    if shell == "zsh":
+        return "autoload -U +X bashcompinit && bashcompinit\n" + function
+    return function
+
+
+def _shell_quote(path: Path) -> str:
+    return "'" + str(path).replace("'", "'\"'\"'") + "'"
@@ -8,6 +8,55 @@ VERSION = Version("1.2.2")
 
 RELEASES_RSS_URL = "https://pypi.org/rss/project/ideaseed/releases.xml"
 
+# Maximum number of ideas sent to Queyd in a single request by QueydClient.add_many
+QUEYD_BATCH_SIZE = 50
+
+# Number of notes fetched per request when syncing from Queyd
+QUEYD_PAGE_SIZE = 100
+
+# Seconds to wait for Queyd to answer a request
+QUEYD_TIMEOUT = 10
+
+# Seconds to wait for another ideaseed process to release a state file (see ideaseed.locking)
+LOCK_TIMEOUT = 10
+
+# Seconds after which cached GitHub metadata (see ideaseed.metadata) gets refreshed in the background
+METADATA_MAX_AGE = 24 * 60 * 60
+
+# Repositories whose metadata is fetched at the same time by `ideaseed warm`
+WARM_CONCURRENCY = 8
+
+# Pages of a GitHub list that are fetched at the same time (see github_cards.get_pages)
+PAGE_CONCURRENCY = 8
+
+# Share of what is left of GitHub's rate limit that `ideaseed warm` can use
+WARM_BUDGET_SHARE = 0.5
+
+# Token bucket pacing requests to each host (see ideaseed.ratelimit): points per second, and burst size.
+# GitHub allows 900 points per minute, requests that change something costing MUTATION_COST points and others 1.
+REQUEST_RATES = {"api.github.com": (15, 60)}
+DEFAULT_REQUEST_RATE = (5, 20)
+MUTATION_COST = 5
+
+# Seconds ideaseed is willing to wait for a rate limit to reset.
+# Requests that would have to wait longer are sent anyway, and fail.
+MAX_RATE_LIMIT_WAIT = 60
+
+# Times a rate-limited request is sent again
+RATE_LIMIT_RETRIES = 3
+
+# Seconds to wait before retrying a 429 response that does not say how long to wait
+DEFAULT_RETRY_AFTER = 60
+
+# Seconds to wait for an answer from servers whose client has no timeout of its own (Google Keep, PyPI...)
+NETWORK_TIMEOUT = 30
+
+# Seconds after the --deadline at which calls that can't be given a timeout get interrupted (see ideaseed.deadline)
+ALARM_GRACE = 2
+
+# Exit status of commands stopped by their --deadline (EX_TEMPFAIL in sysexits.h)
+DEADLINE_EXIT_STATUS = 75
+
 COLOR_NAME_TO_HEX_MAP: dict[str, str] = {
     "Blue": "AECBFA",
     "Brown": "E6C9A8",
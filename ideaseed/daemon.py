@@ -0,0 +1,306 @@
+"""
+Keeps ideaseed running in the background (``ideaseed daemon``), so that every other ``ideaseed``
+command does not have to start Python, import everything, read the auth cache and log in again.
+
+The ``ideaseed`` command itself is `run`, a thin client that only imports the standard library:
+it sends its arguments, working directory and environment to the daemon through a Unix socket,
+along with its stdin, stdout and stderr file descriptors. The daemon runs the command on them,
+so output (and prompts) go straight to the client's terminal, then sends back the exit status.
+When no daemon is running, the command is run in-process, as usual.
+
+Commands are run one at a time: they use the process' working directory, environment and standard streams.
+That's why ``watch`` and ``interactive``, which run until they are stopped, are never forwarded.
+Interrupting the client (Ctrl-C) interrupts the command it is running in the daemon.
+"""
+
+from __future__ import annotations
+
+import array
+import json
+import os
+import select
+import signal
+import socket
+import struct
+import sys
+import threading
+import traceback
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+_LENGTH = struct.Struct(">I")
+_STATUS = struct.Struct(">i")
+_STANDARD_STREAMS = (0, 1, 2)
+# Commands that would keep the daemon busy until they are stopped, or that are the daemon itself
+_CLIENT_COMMANDS = {"daemon", "interactive", "watch"}
+
+
+def socket_path() -> Path:
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "ideaseed.sock"
+    return Path.home() / ".cache" / "ideaseed" / "daemon.sock"
+
+
+def run(argv: Optional[list[str]] = None):
+    """
+    Entry point of the ``ideaseed`` command
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    # Ideas that are just one of these words are not forwarded either, they are still sent as usual
+    if not _CLIENT_COMMANDS.intersection(argv):
+        status = forward(argv)
+        if status is not None:
+            sys.exit(status)
+
+    from ideaseed import cli
+
+    cli.run(argv)
+
+
+def forward(argv: list[str]) -> Optional[int]:
+    """
+    Has the daemon run the command, returning its exit status.
+    Returns `None` if no daemon is running.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(str(socket_path()))
+    except OSError:
+        client.close()
+        return None
+
+    with client:
+        request = json.dumps(
+            {"argv": argv, "cwd": os.getcwd(), "environ": dict(os.environ)}
+        ).encode("utf-8")
+        client.sendmsg(
+            [_LENGTH.pack(len(request)) + request],
+            [
+                (
+                    socket.SOL_SOCKET,
+                    socket.SCM_RIGHTS,
+                    array.array("i", _STANDARD_STREAMS),
+                )
+            ],
+        )
+        try:
+            response = _receive_exactly(client, _STATUS.size)
+        except KeyboardInterrupt:
+            # Makes the daemon interrupt the command, then waits for it to be done with our terminal.
+            # Hitting Ctrl-C again leaves right away.
+            client.shutdown(socket.SHUT_WR)
+            try:
+                response = _receive_exactly(client, _STATUS.size)
+            except KeyboardInterrupt:
+                return 2
+    if response is None:
+        # The daemon stopped while running the command
+        return 1
+    (status,) = _STATUS.unpack(response)
+    return status
+
+
+def _receive_exactly(connection: socket.socket, size: int) -> Optional[bytes]:
+    data = b""
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def _receive_request(
+    connection: socket.socket,
+) -> tuple[Optional[dict], list[int]]:
+    """
+    Reads a request and the file descriptors sent along with it
+    """
+    file_descriptors = array.array("i")
+    data, ancillary, _, _ = connection.recvmsg(
+        _LENGTH.size,
+        socket.CMSG_SPACE(len(_STANDARD_STREAMS) * file_descriptors.itemsize),
+    )
+    for level, kind, payload in ancillary:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            file_descriptors.frombytes(
+                payload[: len(payload) - len(payload) % file_descriptors.itemsize]
+            )
+    rest = _receive_exactly(connection, _LENGTH.size - len(data))
+    if rest is None:
+        return None, list(file_descriptors)
+    (length,) = _LENGTH.unpack(data + rest)
+    request = _receive_exactly(connection, length)
+    return (json.loads(request) if request else None), list(file_descriptors)
+
+
+def _same_user(connection: socket.socket) -> bool:
+    if not hasattr(socket, "SO_PEERCRED"):
+        return True
+    credentials = connection.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+    )
+    _, uid, _ = struct.unpack("3i", credentials)
+    return uid == os.getuid()
+
+
+def serve():
+    """
+    Runs commands sent by `forward` until interrupted.
+    """
+    # Imported here so that `run` stays light when a daemon is running
+    import rich
+
+    from ideaseed import authentication, cli, ondisk, ui
+
+    path = socket_path()
+    path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+    if path.exists():
+        if forward_is_possible(path):
+            rich.print(f"[red]A daemon is already running at [bold]{path}")
+            return
+        path.unlink()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(path))
+    os.chmod(path, 0o600)
+    server.listen()
+    # Stopping the daemon with kill also removes the socket
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    rich.print(f"Listening on [bold]{path}[/]. Hit Ctrl-C to stop.")
+
+    try:
+        while True:
+            connection, _ = server.accept()
+            with connection:
+                if not _same_user(connection):
+                    continue
+                request, file_descriptors = _receive_request(connection)
+                if request is None or len(file_descriptors) != 3:
+                    for descriptor in file_descriptors:
+                        os.close(descriptor)
+                    continue
+                status = _run_request(request, file_descriptors, connection, cli.run)
+                # Changes are saved after every command, not when the daemon stops
+                authentication.flush()
+                # Other processes might have changed the local copy directory in the meantime
+                ondisk.forget()
+                ui.get_console.cache_clear()
+                ui.plain_output.cache_clear()
+                try:
+                    connection.sendall(_STATUS.pack(status))
+                except OSError:
+                    # The client went away (e.g. it was interrupted)
+                    pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        path.unlink(missing_ok=True)
+
+
+def forward_is_possible(path: Path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(path))
+            return True
+        except OSError:
+            return False
+
+
+def _run_request(
+    request: dict, file_descriptors: list[int], connection: socket.socket, run
+) -> int:
+    """
+    Runs `run(argv)` as if the process was the client: in its working directory,
+    with its environment and on its standard streams.
+    The command is interrupted, as with Ctrl-C, if the client hangs up before it is done.
+    """
+    import rich
+
+    saved_streams = [os.dup(stream) for stream in _STANDARD_STREAMS]
+    saved_cwd = os.getcwd()
+    saved_environ = dict(os.environ)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    for descriptor, stream in zip(file_descriptors, _STANDARD_STREAMS):
+        os.dup2(descriptor, stream)
+        os.close(descriptor)
+    try:
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["environ"])
+        # rich's global console (used by `rich.print`) guesses the terminal's size and colors once
+        rich.reconfigure()
+        try:
+            with _interrupted_on_hangup(connection):
+                run(request["argv"])
+            return 0
+        except SystemExit as exit:
+            # Same as what Python does when exiting
+            if exit.code is None or isinstance(exit.code, int):
+                return exit.code or 0
+            print(exit.code, file=sys.stderr)
+            return 1
+        except KeyboardInterrupt:
+            return 2
+        except Exception:
+            traceback.print_exc()
+            return 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        for saved, stream in zip(saved_streams, _STANDARD_STREAMS):
+            os.dup2(saved, stream)
+            os.close(saved)
+        os.chdir(saved_cwd)
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        rich.reconfigure()
+
+
+@contextmanager
+def _interrupted_on_hangup(connection: socket.socket) -> Iterator[None]:
+    """
+    Raises `KeyboardInterrupt` in the `with` block when the client hangs up,
+    which it only does when it is interrupted (or killed) before getting the exit status.
+    A real signal is used, so that reading from the terminal (e.g. a prompt) gets interrupted too.
+    Must be used from the main thread.
+    """
+    running = True
+
+    def interrupt(signum, frame):
+        # The hangup may be noticed right after the block ended
+        if running:
+            raise KeyboardInterrupt
+
+    def watch():
+        readable, _, _ = select.select([connection, stop_reading], [], [])
+        if connection not in readable:
+            return
+        try:
+            hung_up = not connection.recv(1, socket.MSG_PEEK)
+        except OSError:
+            hung_up = True
+        if hung_up:
+            signal.pthread_kill(threading.main_thread().ident, signal.SIGINT)
+
+    stop_reading, stop_writing = os.pipe()
+    previous_handler = signal.signal(signal.SIGINT, interrupt)
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        yield
+    finally:
+        try:
+            running = False
+        finally:
+            os.write(stop_writing, b"\0")
+            watcher.join()
+            os.close(stop_reading)
+            os.close(stop_writing)
+            signal.signal(signal.SIGINT, previous_handler)
@@ -0,0 +1,118 @@
+"""
+A time limit for a whole command (``--deadline``).
+
+Network calls get `timeout` as their timeout, so that none of them can outlast the deadline,
+and long-running work calls `check` between steps. Both raise `DeadlineExceeded` once it passed.
+Calls that can't be given a timeout (logging into Google Keep...) are interrupted by a timer
+in the main thread, `ALARM_GRACE` seconds after the deadline.
+"""
+
+from __future__ import annotations
+
+import signal
+import threading
+from contextlib import contextmanager
+from time import monotonic
+from typing import Iterator, Optional
+
+import requests
+
+from ideaseed.constants import ALARM_GRACE
+
+
+class DeadlineExceeded(Exception):
+    """The command took longer than its --deadline"""
+
+    def __init__(
+        self, message: str = "The deadline passed", created: Optional[str] = None
+    ):
+        super().__init__(message)
+        # URL of what was created anyway before the deadline passed, if anything
+        self.created = created
+
+
+_deadline: Optional[float] = None
+
+
+def remaining() -> Optional[float]:
+    """
+    Seconds left until the deadline, `None` if there is none
+    """
+    if _deadline is None:
+        return None
+    return max(0.0, _deadline - monotonic())
+
+
+def check():
+    if _deadline is not None and monotonic() >= _deadline:
+        raise DeadlineExceeded()
+
+
+def timeout(default: Optional[float]) -> Optional[float]:
+    """
+    The timeout to give a network call that would otherwise have `default` as its timeout
+    """
+    check()
+    left = remaining()
+    if left is None:
+        return default
+    return left if default is None else min(default, left)
+
+
+@contextmanager
+def cut_short() -> Iterator[None]:
+    """
+    Turns timeouts of network calls that were cut short by the deadline (see `timeout`) into `DeadlineExceeded`
+    """
+    try:
+        yield
+    except requests.Timeout as error:
+        left = remaining()
+        # Socket timeouts are not exactly on time
+        if left is not None and left < 0.1:
+            raise DeadlineExceeded() from error
+        raise
+
+
+def _interrupt(signum, frame):
+    raise DeadlineExceeded()
+
+
+def disarm():
+    """
+    Stops the timer of `enforced`, to clean up after a `DeadlineExceeded`
+    without getting interrupted
+    """
+    if (
+        hasattr(signal, "setitimer")
+        and threading.current_thread() is threading.main_thread()
+    ):
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+@contextmanager
+def enforced(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Sets the deadline to `seconds` from now for the duration of the `with` block.
+    Nothing changes if `seconds` is `None`.
+    """
+    global _deadline
+    if seconds is None:
+        yield
+        return
+
+    _deadline = monotonic() + seconds
+    alarm = (
+        hasattr(signal, "setitimer")
+        and threading.current_thread() is threading.main_thread()
+    )
+    if alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _interrupt)
+        signal.setitimer(signal.ITIMER_REAL, seconds + ALARM_GRACE)
+    try:
+        yield
+    finally:
+        if alarm:
+            disarm()
+            signal.signal(signal.SIGALRM, previous_handler)
+        _deadline = None
@@ -0,0 +1,151 @@
+"""
+Sends an idea to its secondary destinations (Queyd, the local copy directory) at the same time,
+once it was pushed to the main one (GitHub or Google Keep) and is resolved,
+so that this takes as long as the slowest destination instead of the sum of all of them.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+from time import monotonic
+from typing import Any, Callable, Iterable, NamedTuple, Optional
+
+from rich import print
+
+from ideaseed import deadline, ondisk, ui
+from ideaseed.constants import QUEYD_TIMEOUT
+from ideaseed.ondisk import Idea
+from ideaseed.queyd import QueydClient, QueydError
+
+
+class Destination(NamedTuple):
+    name: str
+    # Returns keyword arguments for `ui.make_table`, empty if nothing was sent.
+    send: Callable[[], dict[str, Any]]
+    # In seconds, `None` to wait for as long as it takes.
+    timeout: Optional[float] = None
+
+
+class Outcome(NamedTuple):
+    destination: Destination
+    table_rows: dict[str, Any]
+    error: Optional[Exception] = None
+
+
+class Started(NamedTuple):
+    destination: Destination
+    future: Future
+    started_at: float
+
+
+def start(destinations: Iterable[Destination]) -> list[Started]:
+    """
+    Starts sending to all `destinations` concurrently, each in its own thread.
+    Use `finish` to wait for them.
+    """
+    destinations = list(destinations)
+    if not destinations:
+        return []
+    executor = ThreadPoolExecutor(
+        max_workers=len(destinations), thread_name_prefix="ideaseed-fanout"
+    )
+    started = [
+        Started(destination, executor.submit(destination.send), monotonic())
+        for destination in destinations
+    ]
+    # Don't block on still-running destinations once their timeout is over
+    executor.shutdown(wait=False)
+    return started
+
+
+def run(destination: Destination) -> Outcome:
+    """
+    Sends to `destination` from the calling thread, for destinations that might prompt the user.
+    """
+    try:
+        return Outcome(destination, destination.send())
+    except Exception as error:
+        return Outcome(destination, {}, error)
+
+
+def finish(started: Iterable[Started]) -> list[Outcome]:
+    """
+    Waits for every started destination, for at most its own timeout (counted from when it was started),
+    and never past the deadline (see `ideaseed.deadline`).
+    """
+    outcomes = []
+    for destination, future, started_at in started:
+        timeout = (
+            None
+            if destination.timeout is None
+            else max(0, started_at + destination.timeout - monotonic())
+        )
+        left = deadline.remaining()
+        cut_short = left is not None and (timeout is None or left < timeout)
+        if cut_short:
+            timeout = left
+        try:
+            outcomes.append(Outcome(destination, future.result(timeout=timeout)))
+        except FutureTimeoutError:
+            outcomes.append(
+                Outcome(
+                    destination,
+                    {},
+                    (
+                        deadline.DeadlineExceeded()
+                        if cut_short
+                        else TimeoutError(
+                            f"Timed out after {destination.timeout} seconds"
+                        )
+                    ),
+                )
+            )
+        except Exception as error:
+            outcomes.append(Outcome(destination, {}, error))
+    return outcomes
+
+
+def report(outcomes: Iterable[Outcome]):
+    """
+    Prints errors, then a single table with what every destination reported.
+    """
+    table_rows = {}
+    for outcome in outcomes:
+        if outcome.error:
+            print(
+                f"[red]Couldn't send the idea to {outcome.destination.name}: {outcome.error}"
+            )
+        elif not outcome.table_rows:
+            print(f"[yellow]Did not send the idea to {outcome.destination.name}")
+        table_rows |= outcome.table_rows
+
+    if table_rows:
+        ui.show_table(**table_rows)
+
+
+def to_queyd(client: QueydClient, idea: Idea) -> Destination:
+    def _send() -> dict[str, Any]:
+        gql_response = client.add(idea).json()
+        if not gql_response.get("data"):
+            raise QueydError(gql_response.get("errors"))
+        return {"queyd_id": gql_response["data"]["add"]["id"]}
+
+    return Destination("Queyd", _send, timeout=QUEYD_TIMEOUT)
+
+
+def to_local_copy(
+    local_copy: Path, idea: Idea, repo: Optional[str], **save_options
+) -> Destination:
+    """
+    `save_options` are passed to `ondisk.save`
+    """
+
+    def _send() -> dict[str, Any]:
+        saved_to = ondisk.save(
+            local_copy=local_copy, idea=idea, repo=repo, **save_options
+        )
+        return {"local_copy": saved_to} if saved_to else {}
+
+    return Destination("the local copy directory", _send)
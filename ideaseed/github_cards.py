@@ -1,14 +1,23 @@
 from __future__ import annotations
 
+import json
 import re
+import threading
 import webbrowser
+from base64 import b64decode
 from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import closing
+from copy import copy as shallow_copy
 from pathlib import Path
-from typing import Any, Callable, Iterable, Optional, Tuple, TypeVar, Union
+from typing import (Any, Callable, Iterable, Iterator, NamedTuple, Optional,
+                    Tuple, TypeVar, Union)
+from urllib.parse import parse_qs, urlencode, urlparse
 
 import github.GithubObject
 from github import Github
-from github.GithubException import BadCredentialsException, TwoFactorException
+from github.GithubException import (BadCredentialsException, GithubException,
+                                    TwoFactorException, UnknownObjectException)
 from github.Issue import Issue
 from github.Label import Label
 from github.Milestone import Milestone
@@ -16,17 +25,31 @@ from github.NamedUser import NamedUser
 from github.Project import Project
 from github.ProjectColumn import ProjectColumn
 from github.Repository import Repository
+from github.Requester import Requester
 from rich import print
 from thefuzz import process as fuzzy_process
 
-from ideaseed import ui
+from ideaseed import deadline, metadata, ratelimit, ui
 from ideaseed.authentication import Cache as BaseCache
-from ideaseed.constants import UsageError
+from ideaseed.constants import PAGE_CONCURRENCY, UsageError
 from ideaseed.ondisk import Idea
 from ideaseed.utils import (answered_yes_to, ask, english_join,
                             error_message_no_object_found,
                             get_random_color_hexstring)
 
+# Projects (and their columns and cards) are only available with this media type
+PROJECTS_PREVIEW = "application/vnd.github.inertia-preview+json"
+NEXT_PAGE_LINK = re.compile(r'<([^>]+)>;\s*rel="next"')
+LAST_PAGE_LINK = re.compile(r'<([^>]+)>;\s*rel="last"')
+# Node IDs of classic projects, project columns and milestones (see `parse_reference`)
+NODE_ID = re.compile(r"(PRO|PC|MI)_[\w-]+")
+LEGACY_NODE_ID = re.compile(r"0\d+:(Project|ProjectColumn|Milestone)\d+")
+REFERENCE_URL_PATH = re.compile(r"/(projects|milestone)/(\d+)/?")
+
+PROJECT_FIELDS = "databaseId id number name body state url"
+COLUMN_FIELDS = "databaseId id name project { databaseId }"
+MILESTONE_FIELDS = "id number title state url"
+
 
 def validate_label_color(color: str):
     """
@@ -46,9 +69,13 @@ class AuthCache(BaseCache):
         `None` is returned if the cache does not exist or is invalid.
         """
         try:
-            return Github(
-                login_or_token=self.cache["pat"] or self.cache["username"],
-                password=self.cache["password"] if "password" in self.cache else None,
+            return ratelimit.install_on_github(
+                Github(
+                    login_or_token=self.cache["pat"] or self.cache["username"],
+                    password=(
+                        self.cache["password"] if "password" in self.cache else None
+                    ),
+                )
             )
         except Exception as error:
             print(f"[black on red]{error}")
@@ -68,7 +95,7 @@ class AuthCache(BaseCache):
         if method == LOGIN_METHODS.PAT:
             pat = ask("Personal access token", password=True)
             try:
-                gh = Github(pat)
+                gh = ratelimit.install_on_github(Github(pat))
                 # just instanciating does not mean auth succeeded
                 # seems like you need to _really_ hit Auth-retricted APIs,
                 # even gh.get_user() does not work.
@@ -86,7 +113,7 @@ class AuthCache(BaseCache):
             username = ask("Username")
             password = ask("Password", password=True)
             try:
-                gh = Github(username, password)
+                gh = ratelimit.install_on_github(Github(username, password))
                 gh.get_user().get_user_issues().get_page(0)
                 return gh, dict(method=method, username=username, password=password)
             except TwoFactorException:
@@ -102,15 +129,229 @@ class AuthCache(BaseCache):
                 return self.login_manually(method=method)
 
 
-def resolve_self_repository_shorthand(gh: Github, repo: str) -> str:
+def requester(gh: Github) -> Requester:
+    """
+    The HTTP client of `gh`, for requests that PyGithub has no method for
+    (conditional requests, raw pages...)
+    """
+    return gh._Github__requester
+
+
+def get_pages(
+    gh: Github,
+    url: str,
+    parameters: Optional[dict[str, Any]] = None,
+    etag: Optional[str] = None,
+    accept: Optional[str] = None,
+    on_request: Callable[[], None] = lambda: None,
+) -> tuple[Optional[str], Iterator[dict[str, Any]]]:
+    """
+    GETs every page of the list at `url`.
+    The first page is only sent if it changed since it had the ETag `etag`:
+    returns the first page's new ETag, or `None` (and no items) if it did not change.
+    `on_request` is called before each request (e.g. to count them).
+    Pages after the first one are fetched concurrently (see `fetched_pages`), and items come in order.
+    """
+    return _get_pages(requester(gh), url, parameters, etag, accept, on_request)
+
+
+def _get_pages(
+    requester: Requester,
+    url: str,
+    parameters: Optional[dict[str, Any]] = None,
+    etag: Optional[str] = None,
+    accept: Optional[str] = None,
+    on_request: Callable[[], None] = lambda: None,
+    in_order: bool = True,
+) -> tuple[Optional[str], Iterator[dict[str, Any]]]:
+    headers = {"If-None-Match": etag} if etag else {}
+    if accept:
+        headers["Accept"] = accept
+    on_request()
+    status, response_headers, data = requester.requestJson(
+        "GET", url, parameters, headers
+    )
+    if status == 304:
+        return None, iter(())
+    if status >= 400:
+        raise GithubException(status, data, response_headers)
+
+    def _items() -> Iterator[dict[str, Any]]:
+        yield from json.loads(data)
+        if remaining := page_urls(response_headers.get("link", "")):
+            for _ in remaining:
+                on_request()
+            for page in fetched_pages(requester, remaining, accept, in_order):
+                yield from page
+            return
+
+        # Without a link to the last page, pages can only be followed one after the other
+        page_headers = response_headers
+        while next_page := NEXT_PAGE_LINK.search(page_headers.get("link", "")):
+            on_request()
+            page_headers, page = requester.requestJsonAndCheck(
+                "GET",
+                next_page.group(1),
+                headers={"Accept": accept} if accept else None,
+            )
+            yield from page
+
+    return response_headers.get("etag"), _items()
+
+
+def page_urls(link: str) -> list[str]:
+    """
+    URLs of the pages that come after the first one, from the first page's Link header.
+    Empty if it does not link to the last page.
+
+    >>> page_urls('<https://api.github.com/repositories/1/labels?per_page=100&page=2>; rel="next", '
+    ...           '<https://api.github.com/repositories/1/labels?per_page=100&page=3>; rel="last"')
+    ['https://api.github.com/repositories/1/labels?per_page=100&page=2', 'https://api.github.com/repositories/1/labels?per_page=100&page=3']
+    >>> page_urls('<https://api.github.com/repositories/1/labels?page=2>; rel="next"')
+    []
+    """
+    last = LAST_PAGE_LINK.search(link)
+    if not last:
+        return []
+    url = urlparse(last.group(1))
+    query = parse_qs(url.query)
+    return [
+        url._replace(query=urlencode(query | {"page": page}, doseq=True)).geturl()
+        for page in range(2, int(query["page"][0]) + 1)
+    ]
+
+
+def detached(requester: Requester) -> Requester:
+    """
+    A copy of `requester` with a connection of its own.
+    Requesters send everything through a single connection, so they can't be shared between threads.
+    """
+    copy = shallow_copy(requester)
+    copy._Requester__connection = None
+    return copy
+
+
+def fetched_pages(
+    requester: Requester,
+    urls: list[str],
+    accept: Optional[str] = None,
+    in_order: bool = True,
+) -> Iterator[list[dict[str, Any]]]:
+    """
+    GETs the pages at `urls`, `PAGE_CONCURRENCY` at a time.
+    Pages come in the order of `urls`, or as soon as they arrive if not `in_order`.
+    Pages that did not come yet are not requested anymore when the iteration stops.
+    """
+    threads = threading.local()
+
+    def fetch(url: str) -> list[dict[str, Any]]:
+        if not hasattr(threads, "requester"):
+            threads.requester = detached(requester)
+        _, page = threads.requester.requestJsonAndCheck(
+            "GET", url, headers={"Accept": accept} if accept else None
+        )
+        return page
+
+    executor = ThreadPoolExecutor(
+        max_workers=PAGE_CONCURRENCY, thread_name_prefix="ideaseed-pages"
+    )
+    futures = [executor.submit(fetch, url) for url in urls]
+    try:
+        for future in futures if in_order else as_completed(futures):
+            yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def list_objects(
+    owner: github.GithubObject.GithubObject,
+    klass: type[T],
+    url: str,
+    names: Iterable[str] = (),
+    get_name: Callable[[T], str] = lambda obj: obj.name,
+    parameters: Optional[dict[str, Any]] = None,
+    accept: Optional[str] = None,
+) -> list[T]:
     """
-    Adds USERNAME/ to a `repo` that has no slashes
+    The objects listed at `url` (labels of a repository, its projects...), as `klass` instances.
+    Pages are fetched concurrently (see `get_pages`), and the listing stops as soon as
+    objects with every one of `names` are in, without waiting for the other pages.
+    """
+    missing = {name.lower() for name in names}
+    objects = []
+    _, items = _get_pages(
+        owner._requester,
+        url,
+        {"per_page": 100} | (parameters or {}),
+        accept=accept,
+        in_order=False,
+    )
+    with closing(items):
+        for item in items:
+            obj = klass(owner._requester, {}, item, completed=True)
+            objects.append(obj)
+            # Only objects that have a name are looked for (milestones have a title)
+            if missing:
+                missing.discard(get_name(obj).lower())
+                if not missing:
+                    break
+    return objects
+
+
+def resolve_self_repository_shorthand(
+    gh: Github, repo: str, metadata_dir: Optional[Path] = None
+) -> str:
+    """
+    Adds USERNAME/ to a `repo` that has no slashes.
+    USERNAME is taken from `metadata_dir` when it is cached there, instead of being requested.
     """
     if "/" not in repo:
-        return gh.get_user().login + "/" + repo
+        username = metadata.login(metadata_dir) if metadata_dir else None
+        return (username or gh.get_user().login) + "/" + repo
     return repo
 
 
+def resolve_repository(gh: Github, repo: str, metadata_dir: Path) -> str:
+    """
+    The repository `repo` refers to, as it would have been typed without typos (see `metadata.match_repo`).
+    It is looked up in the cached list of repositories the user can push to, which is refreshed first
+    if nothing matches, since the repository might be newer than the list.
+    `repo` is returned as is when the list was never cached, and when it has an OWNER/ that
+    is not in the list: issues can also be opened in repositories one can't push to.
+    """
+    names = metadata.repo_names(metadata_dir)
+    if not names:
+        return repo
+    matches = metadata.match_repo(repo, names)
+    if not matches:
+        # A single request, that does not count against the rate limit if nothing changed
+        metadata.refresh_repos(gh, metadata_dir)
+        names = metadata.repo_names(metadata_dir)
+        matches = metadata.match_repo(repo, names)
+
+    if len(matches) > 1:
+        raise UsageError(
+            f"{repo!r} could be {english_join(matches)}. Which one did you mean?"
+        )
+    if matches:
+        return matches[0]
+    if "/" in repo:
+        return repo
+    raise UsageError(repository_not_found_message(repo, names))
+
+
+def repository_not_found_message(repo: str, names: list[str]) -> str:
+    suggestions = [
+        name
+        for name, _ in fuzzy_process.extract(
+            repo, [name for name in names if ("/" in name) == ("/" in repo)], limit=3
+        )
+    ]
+    return f"Repository {repo!r} not found." + (
+        f" Did you mean {english_join(suggestions)}?" if suggestions else ""
+    )
+
+
 def resolve_defaults(
     column: Optional[str],
     project: Optional[str],
@@ -150,7 +391,9 @@ def resolve_defaults(
     return project, column
 
 
-def interactively_create_label(repo: Repository, name: str):
+def interactively_create_label(
+    repo: Repository, name: str, creations: Optional[Creations] = None
+):
     label_data = {
         "color": get_random_color_hexstring(),
         "description": ask(
@@ -162,16 +405,82 @@ def interactively_create_label(repo: Repository, name: str):
         "name": name,
     }
     print(f"Creating label {ui.Label(name, label_data['color'])}...")
+    if creations:
+        return creations.start(lambda gh: rebound(gh, repo).create_label(**label_data))
     return repo.create_label(**label_data)
 
 
+def rebound(gh: Github, obj: T) -> T:
+    """
+    `obj`, sending its requests with `gh` instead of the client it was created with.
+    No request is made, even if `obj` is not complete.
+    """
+    return gh.create_from_raw_data(type(obj), obj._rawData)
+
+
+class Creations:
+    """
+    Creates what is missing from a repository (see --create-missing) concurrently:
+    each object is sent as soon as everything about it was asked, while the next questions are asked.
+    PyGithub clients can't be shared between threads, so each creation uses its own, from `connect`.
+    """
+
+    def __init__(self, connect: Callable[[], Github]):
+        self.connect = connect
+        self.executor = ThreadPoolExecutor(thread_name_prefix="ideaseed-create")
+
+    def start(self, create: Callable[[Github], T]) -> Future[T]:
+        return self.executor.submit(lambda: create(self.connect()))
+
+    def __enter__(self) -> Creations:
+        return self
+
+    def __exit__(self, *exception):
+        self.executor.shutdown(wait=True)
+
+
+def resolved(obj: Union[T, Future[T]]) -> T:
+    """
+    `obj`, or what it resolves to if it is still being created (see `Creations`)
+    """
+    return obj.result() if isinstance(obj, Future) else obj
+
+
+def cached_or_fetched(
+    cached: Optional[list[T]],
+    names: Iterable[str],
+    fetch: Callable[[], Iterable[T]],
+    get_name: Callable[[T], str] = lambda obj: obj.name,
+) -> Iterable[T]:
+    """
+    The `cached` objects if all of `names` are among them, otherwise the ones from `fetch`
+    (the cache might be older than the objects that are looked for).
+    """
+    if cached is not None:
+        cached_names = {get_name(obj).lower() for obj in cached}
+        if all(name.lower() in cached_names for name in names):
+            return cached
+    return fetch()
+
+
 def label_names_to_labels(
-    repo: Repository, create_missing: bool, label: list[str]
-) -> list[Label]:
+    repo: Repository,
+    create_missing: bool,
+    label: list[str],
+    cache: Optional[metadata.CachedRepo] = None,
+    creations: Optional[Creations] = None,
+) -> list[Union[Label, Future[Label]]]:
+    """
+    Created labels are `Future`s when `creations` is given.
+    """
     label_names = label.copy()  # list of `str`s, no need to deepcopy.
     if not label_names:
         return []
-    all_labels = repo.get_labels()
+    all_labels = cached_or_fetched(
+        cache and cache.labels,
+        label_names,
+        lambda: list_objects(repo, Label, f"{repo.url}/labels", label_names),
+    )
     labels: list[Label] = []
     for label_name in label_names:
         label = search_for_object(
@@ -179,7 +488,7 @@ def label_names_to_labels(
             label_name,
             create_missing=create_missing,
             object_name="label",
-            create=lambda: interactively_create_label(repo, label_name),
+            create=lambda: interactively_create_label(repo, label_name, creations),
             available_names=label_names,
         )
         if label:
@@ -187,21 +496,302 @@ def label_names_to_labels(
     return labels
 
 
-def get_milestone_from_name(
-    repo: Repository, create_missing: bool, name: str
+def parse_reference(text: str) -> Union[int, str, None]:
+    """
+    The number (or ID, for columns) or node ID that `text` refers to a project, column or milestone with.
+    GitHub URLs of them work too. `None` if `text` is a name.
+
+    >>> parse_reference("3")
+    3
+    >>> parse_reference("https://github.com/ewen-lbh/ideaseed/projects/2")
+    2
+    >>> parse_reference("https://github.com/users/ewen-lbh/projects/1#column-13766426")
+    13766426
+    >>> parse_reference("https://github.com/ewen-lbh/ideaseed/milestone/4")
+    4
+    >>> parse_reference("PRO_kwLOBKSt0c4AEl8D")
+    'PRO_kwLOBKSt0c4AEl8D'
+    >>> parse_reference("MDc6UHJvamVjdDEwMjM=")
+    'MDc6UHJvamVjdDEwMjM='
+    >>> parse_reference("Roadmap") is None, parse_reference("TO_DO") is None
+    (True, True)
+    """
+    text = text.strip()
+    if text.isdigit():
+        return int(text)
+    if NODE_ID.fullmatch(text):
+        return text
+    try:
+        if LEGACY_NODE_ID.fullmatch(b64decode(text, validate=True).decode("utf-8")):
+            return text
+    except ValueError:
+        pass
+    url = urlparse(text)
+    if url.scheme in ("http", "https"):
+        if column := re.fullmatch(r"column-(\d+)", url.fragment):
+            return int(column.group(1))
+        if path := REFERENCE_URL_PATH.search(url.path):
+            return int(path.group(2))
+    return None
+
+
+def graphql(requester: Requester, query: str, **variables) -> dict[str, Any]:
+    """
+    The data of a GraphQL query (PyGithub only has REST methods).
+    Objects that were not found are `None`.
+    """
+    prefix = requester._Requester__prefix
+    url = "/graphql"
+    # GitHub Enterprise's REST API is at /api/v3, and its GraphQL API at /api/graphql
+    if prefix.endswith("/v3"):
+        port = requester._Requester__port
+        url = f"{requester._Requester__scheme}://{requester._Requester__hostname}{f':{port}' if port else ''}{prefix.removesuffix('/v3')}/graphql"
+    _, response = requester.requestJsonAndCheck(
+        "POST", url, input={"query": query, "variables": variables}
+    )
+    errors = [
+        error
+        for error in response.get("errors") or []
+        if error.get("type") != "NOT_FOUND"
+    ]
+    if errors or response.get("data") is None:
+        raise GithubException(400, response, None)
+    return response["data"]
+
+
+def find_by_reference(
+    text: str,
+    cached: Optional[Iterable[T]],
+    fetch: Callable[[Union[int, str]], Optional[T]],
+    object_name: str,
+    get_name: Callable[[T], str] = lambda obj: obj.name,
+    get_number: Callable[[T], int] = lambda obj: obj.number,
+) -> Optional[T]:
+    """
+    The object `text` refers to with a number, a node ID or a URL (see `parse_reference`),
+    from `cached` when it is there, otherwise from `fetch` (a single request, instead of listing every object).
+    `None` if `text` is a name, which includes numbers that are not the number of any object:
+    projects and columns can be named "2021".
+    Raises `UsageError` when nothing has the node ID or URL.
+    """
+    reference = parse_reference(text)
+    if reference is None:
+        return None
+    for obj in cached or []:
+        if get_name(obj) == text:
+            return None
+        if reference in (get_number(obj), obj._rawData.get("node_id")):
+            return obj
+    try:
+        found = fetch(reference)
+    except GithubException as error:
+        # 403: it exists, but belongs to someone else
+        if error.status not in (403, 404):
+            raise
+        found = None
+    if found is None and not text.isdigit():
+        raise UsageError(f"There is no {object_name} at {text!r}")
+    return found
+
+
+def fetch_project(
+    owner: Union[Repository, NamedUser], reference: Union[int, str]
+) -> Optional[Project]:
+    """
+    The project of `owner` that has the number `reference`, or the project that has the node ID `reference`.
+    Projects can only be requested by number through GraphQL.
+    """
+    requester = owner._requester
+    if isinstance(reference, str):
+        data = graphql(
+            requester,
+            f"query($id: ID!) {{ node(id: $id) {{ ... on Project {{ {PROJECT_FIELDS} }} }} }}",
+            id=reference,
+        )["node"]
+    elif isinstance(owner, Repository):
+        data = graphql(
+            requester,
+            f"query($owner: String!, $name: String!, $number: Int!) {{ repository(owner: $owner, name: $name) {{ project(number: $number) {{ {PROJECT_FIELDS} }} }} }}",
+            owner=owner.owner.login,
+            name=owner.name,
+            number=reference,
+        )["repository"]["project"]
+    else:
+        data = graphql(
+            requester,
+            f"query($login: String!, $number: Int!) {{ user(login: $login) {{ project(number: $number) {{ {PROJECT_FIELDS} }} }} }}",
+            login=owner.login,
+            number=reference,
+        )["user"]["project"]
+    if not data:
+        return None
+    return Project(
+        requester,
+        {},
+        {
+            "id": data["databaseId"],
+            "node_id": data["id"],
+            "number": data["number"],
+            "name": data["name"],
+            "body": data["body"],
+            "state": data["state"].lower(),
+            "html_url": data["url"],
+            "url": f"/projects/{data['databaseId']}",
+            "columns_url": f"/projects/{data['databaseId']}/columns",
+        },
+        completed=True,
+    )
+
+
+def fetch_column(
+    project: Project, reference: Union[int, str]
+) -> Optional[ProjectColumn]:
+    """
+    The column of `project` that has the ID or node ID `reference`.
+    Column IDs are not scoped to a project, so columns of other projects are `None` too.
+    """
+    requester = project._requester
+    if isinstance(reference, int):
+        headers, data = requester.requestJsonAndCheck(
+            "GET",
+            f"/projects/columns/{reference}",
+            headers={"Accept": PROJECTS_PREVIEW},
+        )
+        column = ProjectColumn(requester, headers, data, completed=True)
+    else:
+        data = graphql(
+            requester,
+            f"query($id: ID!) {{ node(id: $id) {{ ... on ProjectColumn {{ {COLUMN_FIELDS} }} }} }}",
+            id=reference,
+        )["node"]
+        if not data:
+            return None
+        column = ProjectColumn(
+            requester,
+            {},
+            {
+                "id": data["databaseId"],
+                "node_id": data["id"],
+                "name": data["name"],
+                "url": f"/projects/columns/{data['databaseId']}",
+                "cards_url": f"/projects/columns/{data['databaseId']}/cards",
+                "project_url": f"/projects/{data['project']['databaseId']}",
+            },
+            completed=True,
+        )
+    # Projects built by `fetch_project` have relative URLs, compare their IDs instead
+    if column.project_url.rstrip("/").rsplit("/", 1)[-1] != str(project.id):
+        return None
+    return column
+
+
+def fetch_milestone(
+    repo: Repository, reference: Union[int, str]
 ) -> Optional[Milestone]:
-    milestones = repo.get_milestones()
+    """
+    The milestone of `repo` that has the number `reference`, or the milestone that has the node ID `reference`
+    """
+    if isinstance(reference, int):
+        return repo.get_milestone(reference)
+    data = graphql(
+        repo._requester,
+        f"query($id: ID!) {{ node(id: $id) {{ ... on Milestone {{ {MILESTONE_FIELDS} }} }} }}",
+        id=reference,
+    )["node"]
+    if not data:
+        return None
+    return Milestone(
+        repo._requester,
+        {},
+        {
+            "node_id": data["id"],
+            "number": data["number"],
+            "title": data["title"],
+            "state": data["state"].lower(),
+            "html_url": data["url"],
+            "url": f"{repo.url}/milestones/{data['number']}",
+        },
+        completed=True,
+    )
+
+
+def get_milestone_from_name(
+    repo: Repository,
+    create_missing: bool,
+    name: str,
+    cache: Optional[metadata.CachedRepo] = None,
+    creations: Optional[Creations] = None,
+) -> Optional[Union[Milestone, Future[Milestone]]]:
+    """
+    `name` can also be the milestone's number, node ID or URL (see `find_by_reference`).
+    A created milestone is a `Future` when `creations` is given.
+    """
+    if milestone := find_by_reference(
+        name,
+        cache and cache.milestones,
+        lambda reference: fetch_milestone(repo, reference),
+        "milestone",
+        get_name=lambda obj: obj.title,
+    ):
+        return milestone
+    milestones = cached_or_fetched(
+        cache and [m for m in cache.milestones if m.state == "open"],
+        [name],
+        lambda: list_objects(
+            repo,
+            Milestone,
+            f"{repo.url}/milestones",
+            [name],
+            get_name=lambda obj: obj.title,
+        ),
+        get_name=lambda obj: obj.title,
+    )
     return search_for_object(
         milestones,
         name,
         create_missing=create_missing,
         object_name="milestone",
-        create=lambda: repo.create_milestone(title=name),
+        create=lambda: (
+            creations.start(lambda gh: rebound(gh, repo).create_milestone(title=name))
+            if creations
+            else repo.create_milestone(title=name)
+        ),
         get_name=lambda obj: obj.title,
         available_names=[m.title for m in milestones],
     )
 
 
+def create_issue(
+    repo: Repository,
+    title: str,
+    body: str,
+    labels: list[Label],
+    milestone: Optional[Milestone],
+    assignees: list[str],
+    project: Optional[Project],
+    column: Optional[ProjectColumn],
+) -> Issue:
+    """
+    Creates the issue, and its card in `column` if there is one
+    """
+    issue = repo.create_issue(
+        title=title or body,
+        body=body if title else "",
+        assignees=assignees,
+        labels=labels,
+        milestone=(milestone or github.GithubObject.NotSet),
+    )
+    if column is not None:
+        try:
+            column.create_card(content_id=issue.id, content_type="Issue")
+        except deadline.DeadlineExceeded as error:
+            raise deadline.DeadlineExceeded(
+                f"The deadline passed before the issue was added to {project.name}",
+                created=issue.html_url,
+            ) from error
+    return issue
+
+
 def create_and_show_issue(
     dry_run: bool,
     body: str,
@@ -212,18 +802,12 @@ def create_and_show_issue(
     labels: list[Label],
     column: Optional[ProjectColumn],
     assignees: list[NamedUser],
-):
+) -> Optional[Issue]:
     issue = None
     if not dry_run:
-        issue = repo.create_issue(
-            title=title or body,
-            body=body if title else "",
-            assignees=assignees,
-            labels=labels,
-            milestone=(milestone or github.GithubObject.NotSet),
+        issue = create_issue(
+            repo, title, body, labels, milestone, assignees, project, column
         )
-        if column is not None:
-            column.create_card(content_id=issue.id, content_type="Issue")
         url = issue.html_url
     else:
         url = None
@@ -243,6 +827,8 @@ def create_and_show_issue(
         url=url,
     )
 
+    return issue
+
 
 def get_card_title(repo_or_user: Union[Repository, NamedUser]) -> str:
     if isinstance(repo_or_user, Repository):
@@ -285,6 +871,87 @@ class AbstractCard:
     """Represents a future github card/issue, with all attributes refering to their names instead of their resolved github objects"""
 
 
+class Target(NamedTuple):
+    """
+    Where ideas go in a repository, and with what
+    """
+
+    repo: Repository
+    project: Optional[Project]
+    column: Optional[ProjectColumn]
+    labels: list[Label]
+    milestone: Optional[Milestone]
+    assignees: list[str]
+
+
+def resolve_target(
+    repo: Repository,
+    auth_cache: Path,
+    username: str,
+    project: Optional[str],
+    column: Optional[str],
+    default_project: Optional[str],
+    default_column: Optional[str],
+    label: list[str],
+    milestone: Optional[str],
+    assign: list[str],
+    self_assign: bool,
+    create_missing: bool,
+    cache: Optional[metadata.CachedRepo] = None,
+) -> Optional[Target]:
+    """
+    Finds the project, column, labels and milestone of `repo` that ideas go to.
+    Missing ones are created concurrently with --create-missing (see `Creations`).
+    Returns `None` if one of them was not found nor created, or if using a closed milestone was not confirmed.
+    """
+    assignees = assign
+    if self_assign and not len(assignees):
+        assignees = [username]
+    project, column = resolve_defaults(
+        column, project, default_project, default_column, repo.full_name, username
+    )
+    with Creations(AuthCache(auth_cache).login_from_cache) as creations:
+        # user specified a name
+        if project and column:
+            project, column = get_project_and_column(
+                repo, project, column, create_missing, cache, creations
+            )
+            # but it was not found nor created
+            if not (project and column):
+                return None
+        # user _did not_ specify a name (ie do not create a project card)
+        else:
+            project, column = None, None
+
+        # Get all labels
+        labels = label_names_to_labels(repo, create_missing, label, cache, creations)
+
+        # Some labels where not found
+        if len(labels) != len(label):
+            return None
+
+        if milestone is not None:
+            milestone = get_milestone_from_name(
+                repo, create_missing, milestone, cache, creations
+            )
+            if milestone is None:
+                print(f"[red]Given milestone does not exist")
+                return None
+
+        project: Optional[Project] = resolved(project)
+        column: Optional[ProjectColumn] = resolved(column)
+        labels: list[Label] = [resolved(label) for label in labels]
+        milestone: Optional[Milestone] = resolved(milestone)
+
+    if milestone is not None and milestone.state != "open":
+        if not answered_yes_to(
+            f"[yellow]:warning:[/] The selected milestone is {milestone.state}. Use this milestone?"
+        ):
+            return None
+
+    return Target(repo, project, column, labels, milestone, assignees)
+
+
 def push_to_repo(
     auth_cache: Optional[str],
     body: str,
@@ -310,56 +977,53 @@ def push_to_repo(
             "You need to specify a cache for now, I'll get to the --keyring implementation later"
         )
     gh = AuthCache(Path(auth_cache)).login()
-    repo_full_name = resolve_self_repository_shorthand(gh, repo)
-    repo: Repository = gh.get_repo(repo_full_name)
-    username = gh.get_user().login
-    assignees = assign
-    if self_assign and not len(assignees):
-        assignees = [username]
-    idea.assignees = assignees
-    project, column = resolve_defaults(
-        column, project, default_project, default_column, repo_full_name, username
+    metadata_dir = metadata.directory(Path(auth_cache))
+    repo_full_name = resolve_self_repository_shorthand(gh, repo, metadata_dir)
+    # Filled by `ideaseed warm` (or in the background, see `metadata.refresh_in_background`)
+    cache = metadata.cached(gh, metadata_dir, repo_full_name)
+    try:
+        repo: Repository = cache.repo if cache else gh.get_repo(repo_full_name)
+    except UnknownObjectException:
+        raise UsageError(
+            repository_not_found_message(
+                repo_full_name, metadata.repo_names(metadata_dir)
+            )
+        )
+    username = metadata.login(metadata_dir) or gh.get_user().login
+    target = resolve_target(
+        repo,
+        Path(auth_cache),
+        username,
+        project=project,
+        column=column,
+        default_project=default_project,
+        default_column=default_column,
+        label=label,
+        milestone=milestone,
+        assign=assign,
+        self_assign=self_assign,
+        create_missing=create_missing,
+        cache=cache,
     )
-    # user specified a name
+    if target is None:
+        return
+    _, project, column, labels, milestone, assignees = target
+    idea.assignees = assignees
+
     if project and column:
-        project, column = get_project_and_column(repo, project, column, create_missing)
-        # but it was not found nor created
-        if not (project and column):
-            return
         idea.project = project.name
         idea.column = column.name
-    # user _did not_ specify a name (ie do not create a project card)
-    else:
-        project, column = None, None
-
-    project: Optional[Project]
-    column: Optional[ProjectColumn]
-
-    # Get all labels
-    labels = label_names_to_labels(repo, create_missing, label)
-
-    # Some labels where not found
-    if len(labels) != len(label):
-        return
 
     idea.labels = [l.name for l in labels]
 
     if milestone is not None:
-        milestone: Milestone = get_milestone_from_name(repo, create_missing, milestone)
-        if milestone is None:
-            print(f"[red]Given milestone does not exist")
-            return
-        if milestone.state != "open":
-            if not answered_yes_to(
-                f"[yellow]:warning:[/] The selected milestone is {milestone.state}. Use this milestone?"
-            ):
-                return
         idea.milestone = milestone.title
 
     url = None if dry_run else repo.html_url
+    issue = None
 
     if not no_issue:
-        create_and_show_issue(
+        issue = create_and_show_issue(
             dry_run=dry_run,
             body=body,
             title=title,
@@ -389,7 +1053,8 @@ def push_to_repo(
     if open and url:
         webbrowser.open(url)
 
-    idea.url = url or ""
+    # The issue's URL, so that `ideaseed watch` knows what to update
+    idea.url = (issue.html_url if issue else url) or ""
 
     return idea
 
@@ -491,7 +1156,9 @@ def search_for_object(
             ]
             print(f"{object_name} {name!r} was not found.")
             if suggestions:
-                print(f"Did you mean {english_join(name for name, _ in suggestions)} ?")
+                print(
+                    f"Did you mean {english_join([name for name, _ in suggestions])} ?"
+                )
 
         if create_missing and answered_yes_to(
             f"Create missing {object_name} {name!r}?", True
@@ -509,31 +1176,99 @@ def search_for_object(
 
 
 def get_project_and_column(
-    repo: Repository, project_name: str, column_name: str, create_missing: bool
-) -> tuple[Optional[Project], Optional[ProjectColumn]]:
+    repo: Repository,
+    project_name: str,
+    column_name: str,
+    create_missing: bool,
+    cache: Optional[metadata.CachedRepo] = None,
+    creations: Optional[Creations] = None,
+) -> tuple[
+    Optional[Union[Project, Future[Project]]],
+    Optional[Union[ProjectColumn, Future[ProjectColumn]]],
+]:
     """
-    Gets a project and column from a repo
+    Gets a project and column from a repo.
+    Their names can also be numbers (IDs for columns), node IDs or URLs (see `find_by_reference`).
+    Created ones are `Future`s when `creations` is given.
     """
-    project = search_for_object(
-        repo.get_projects(),
+
+    def create_project() -> Union[Project, Future[Project]]:
+        body = ask("Enter the project's description...")
+        if creations:
+            return creations.start(
+                lambda gh: rebound(gh, repo).create_project(
+                    name=project_name, body=body
+                )
+            )
+        return repo.create_project(name=project_name, body=body)
+
+    project = find_by_reference(
+        project_name,
+        cache and cache.projects,
+        lambda reference: fetch_project(repo, reference),
+        "project",
+    ) or search_for_object(
+        cached_or_fetched(
+            cache and cache.projects,
+            [project_name],
+            lambda: list_objects(
+                repo,
+                Project,
+                f"{repo.url}/projects",
+                [project_name],
+                accept=PROJECTS_PREVIEW,
+            ),
+        ),
         project_name,
         create_missing=create_missing,
         object_name="project",
-        create=lambda: repo.create_project(
-            name=project_name,
-            body=ask("Enter the project's description..."),
-        ),
+        create=create_project,
     )
 
     if project is None:
         return None, None
 
-    column = search_for_object(
-        project.get_columns(),
+    def create_column() -> Union[ProjectColumn, Future[ProjectColumn]]:
+        if isinstance(project, Future):
+            return creations.start(
+                lambda gh: rebound(gh, project.result()).create_column(name=column_name)
+            )
+        if creations:
+            return creations.start(
+                lambda gh: rebound(gh, project).create_column(name=column_name)
+            )
+        return project.create_column(name=column_name)
+
+    column = (
+        not isinstance(project, Future)
+        and find_by_reference(
+            column_name,
+            cache and cache.columns.get(project.id),
+            lambda reference: fetch_column(project, reference),
+            "column",
+            get_number=lambda obj: obj.id,
+        )
+    ) or search_for_object(
+        # A project that is being created has no columns yet
+        (
+            []
+            if isinstance(project, Future)
+            else cached_or_fetched(
+                cache and cache.columns.get(project.id),
+                [column_name],
+                lambda: list_objects(
+                    project,
+                    ProjectColumn,
+                    project.columns_url,
+                    [column_name],
+                    accept=PROJECTS_PREVIEW,
+                ),
+            )
+        ),
         column_name,
         create_missing=create_missing,
         object_name="column",
-        create=lambda: project.create_column(name=column_name),
+        create=create_column,
     )
 
     return project, column
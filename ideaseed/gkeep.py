@@ -14,9 +14,9 @@ from gkeepapi.exception import APIException, LoginException
 from gkeepapi.node import ColorValue
 from rich import print
 
-from ideaseed import authentication, ui
+from ideaseed import authentication, ratelimit, ui
 from ideaseed.constants import (COLOR_ALIASES, COLOR_NAME_TO_HEX_MAP,
-                                VALID_COLOR_NAMES)
+                                VALID_COLOR_NAMES, UsageError)
 from ideaseed.ondisk import Idea
 from ideaseed.utils import (answered_yes_to, ask, case_insensitive_find,
                             error_message_no_object_found, print_dry_run,
@@ -44,7 +44,7 @@ class AuthCache(authentication.Cache):
             )
 
         # Log in
-        keep = Keep()
+        keep = ratelimit.install_on_keep(Keep(), account=username)
 
         try:
             keep.login(username, password)
@@ -80,7 +80,7 @@ class AuthCache(authentication.Cache):
 
     def login_from_cache(self) -> Optional[Keep]:
         try:
-            keep = Keep()
+            keep = ratelimit.install_on_keep(Keep(), account=self.cache["email"])
             keep.resume(**self.cache)
             return keep
         except LoginException:
@@ -89,36 +89,59 @@ class AuthCache(authentication.Cache):
 
 @contextmanager
 def handle_api_errors():
+    """
+    Stops the command with an explanation when Google Keep's API answers with an error
+    """
     try:
         yield
     except APIException as error:
         print("Error with the Google Keep API")
         if error.code == 429:
             print(
-                """Too much requests per minute. Try again later.
+                """Too much requests per minute, even after waiting a bit. Try again later.
 Don't worry, your idea is still safe,
 just up-arrow on your terminal to re-run the command :)"""
             )
         print(f"[dim]{error}[/]")
-        return
+        sys.exit(1)
+
+
+def login(auth_cache: Path) -> Keep:
+    """
+    Logs into Google Keep, stopping the command if that's not possible
+    """
+    # Handle API errors
+    with handle_api_errors():
+        keep = AuthCache(auth_cache).login()
+    if keep is None:
+        raise UsageError("Could not log into Google Keep")
+    return keep
+
+
+def resolve_color(color: str) -> str:
+    # Get correct color name casing
+    color = case_insensitive_find(VALID_COLOR_NAMES, color)
+    # Resolve color aliases
+    return COLOR_ALIASES.get(color, color)
 
 
 def find_and_create_labels(
-    keep: Keep, labels: list[str], create_missing: bool
-) -> list[gkeepapi.node.Label]:
+    keep: Keep, label_names: list[str], create_missing: bool
+) -> Optional[list[gkeepapi.node.Label]]:
+    """
+    Returns `None` if a label was not found nor created.
+    """
     labels = []
-    for label in labels:
-        label = keep.findLabel(label)
+    for name in label_names:
+        label = keep.findLabel(name)
         if label is None:
-            if create_missing:
-                if answered_yes_to(f"Create missing label {label!r}?"):
-                    label = keep.createLabel(label)
-            else:
-                print(error_message_no_object_found("label", label))
-                return []
-
-        if label:
-            labels += [label]
+            if not (
+                create_missing and answered_yes_to(f"Create missing label {name!r}?")
+            ):
+                print(error_message_no_object_found("label", name))
+                return None
+            label = keep.createLabel(name)
+        labels.append(label)
     return labels
 
 
@@ -143,24 +166,19 @@ def push_to_gkeep(
         assignees=assign,
     )
 
-    # Get correct color name casing
-    color = case_insensitive_find(VALID_COLOR_NAMES, color)
-    # Resolve color aliases
-    if color in COLOR_ALIASES.keys():
-        color = COLOR_ALIASES[color]
-
+    color = resolve_color(color)
     idea.color = color
 
     # Log in
     sys.stdout.flush()
-    # Handle API errors
-    with handle_api_errors():
-        keep = AuthCache(Path(auth_cache)).login()
+    keep = login(Path(auth_cache))
 
     # Find/create all the labels
     labels = find_and_create_labels(keep, label, create_missing=create_missing)
+    if labels is None:
+        return
 
-    idea.labels = labels
+    idea.labels = [label.name for label in labels]
 
     # Create the card
     if not dry_run:
@@ -194,7 +212,8 @@ def push_to_gkeep(
     )
 
     # Beam it up to Google's servers
-    keep.sync()
+    with handle_api_errors():
+        keep.sync()
 
     # Open the browser
     if open and not dry_run:
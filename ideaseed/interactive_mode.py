@@ -0,0 +1,318 @@
+"""
+Sends several ideas in a row, logging in only once (``ideaseed interactive``).
+
+While the first idea is being typed, the destination's metadata (the repository,
+its labels, milestones and projects) is fetched in the background, unless it is cached (see ``ideaseed warm``).
+Labels, milestone, project and column are then resolved once for the whole session,
+the same way as when sending a single idea, so that sending an idea only costs the requests that actually create it.
+Ideas are sent one after the other in the background, so that the next one can be typed right away.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, NamedTuple, Optional
+
+import rich.markup
+from github import Github
+from github.GithubException import UnknownObjectException
+from github.Label import Label
+from github.Milestone import Milestone
+from github.Project import Project
+from gkeepapi import Keep
+from rich import print
+
+from ideaseed import fanout, github_cards, gkeep, metadata, ondisk
+from ideaseed.constants import UsageError
+from ideaseed.ondisk import Idea
+from ideaseed.queyd import QueydClient
+from ideaseed.utils import ask
+
+
+class Sent(NamedTuple):
+    idea: Idea
+    # Errors of every destination the idea could not be sent to
+    errors: list[str]
+
+
+def prefetch_github(gh: Github, repo: str, metadata_dir: Path) -> metadata.CachedRepo:
+    """
+    The metadata of `repo`: the cached one (see `ideaseed warm`) if there is one,
+    like `github_cards.push_to_repo`, otherwise fetched.
+    """
+    full_name = github_cards.resolve_self_repository_shorthand(gh, repo, metadata_dir)
+    if cache := metadata.cached(gh, metadata_dir, full_name):
+        return cache
+    try:
+        repo = gh.get_repo(full_name)
+    except UnknownObjectException:
+        raise UsageError(
+            github_cards.repository_not_found_message(
+                full_name, metadata.repo_names(metadata_dir)
+            )
+        )
+    return metadata.CachedRepo(
+        repo=repo,
+        labels=github_cards.list_objects(repo, Label, f"{repo.url}/labels"),
+        milestones=github_cards.list_objects(
+            repo, Milestone, f"{repo.url}/milestones", parameters={"state": "all"}
+        ),
+        projects=github_cards.list_objects(
+            repo,
+            Project,
+            f"{repo.url}/projects",
+            accept=github_cards.PROJECTS_PREVIEW,
+        ),
+        # Fetched for the project ideas go to only
+        columns={},
+        collaborators=[],
+    )
+
+
+def resolve_github(
+    gh: Github,
+    cache: metadata.CachedRepo,
+    auth_cache: str,
+    no_issue: bool,
+    **args,
+) -> Optional[github_cards.Target]:
+    """
+    Resolves where ideas go, like `github_cards.push_to_repo` does for a single idea.
+    Might ask to create missing labels, milestones, projects or columns.
+    Returns `None` if something was not found nor created.
+    """
+    metadata_dir = metadata.directory(Path(auth_cache))
+    target = github_cards.resolve_target(
+        cache.repo,
+        Path(auth_cache),
+        metadata.login(metadata_dir) or gh.get_user().login,
+        project=args["project"],
+        column=args["column"],
+        default_project=args["default_project"],
+        default_column=args["default_column"],
+        label=args["label"],
+        milestone=args["milestone"],
+        assign=args["assign"],
+        self_assign=args["self_assign"],
+        create_missing=args["create_missing"],
+        cache=cache,
+    )
+    if target and no_issue and not target.column:
+        raise UsageError(
+            "Cannot use --no-issue without a project and column (the idea needs to be put somewhere!)"
+        )
+    return target
+
+
+def send_to_github(target: github_cards.Target, idea: Idea, no_issue: bool, **_) -> str:
+    """
+    Creates the issue (or card) of `idea`, returning its URL.
+    """
+    idea.labels = [label.name for label in target.labels]
+    idea.milestone = target.milestone.title if target.milestone else ""
+    idea.project = target.project.name if target.project else ""
+    idea.column = target.column.name if target.column else ""
+    idea.assignees = target.assignees
+    if no_issue:
+        body = f"# {idea.title}\n\n{idea.body}" if idea.title else idea.body
+        target.column.create_card(note=body)
+        return target.project.html_url
+
+    return github_cards.create_issue(
+        target.repo,
+        title=idea.title,
+        body=idea.body,
+        labels=target.labels,
+        milestone=target.milestone,
+        assignees=target.assignees,
+        project=target.project,
+        column=target.column,
+    ).html_url
+
+
+class KeepTarget(NamedTuple):
+    keep: Keep
+    labels: list
+    color: str
+
+
+def resolve_gkeep(
+    keep: Keep, label: list[str], color: str, create_missing: bool, **_
+) -> Optional[KeepTarget]:
+    labels = gkeep.find_and_create_labels(keep, label, create_missing)
+    if labels is None:
+        return None
+    return KeepTarget(keep, labels, gkeep.resolve_color(color))
+
+
+def send_to_gkeep(
+    target: KeepTarget, idea: Idea, pin: bool, assign: list[str], **_
+) -> str:
+    idea.labels = [label.name for label in target.labels]
+    idea.color = target.color
+    idea.pinned = pin
+    idea.assignees = assign
+    note = gkeep.create_card(
+        target.keep,
+        assign=assign,
+        color=target.color,
+        labels=target.labels,
+        pin=pin,
+        title=idea.title,
+        body=idea.body,
+    )
+    target.keep.sync()
+    return f"https://keep.google.com/u/0/#NOTE/{note.id}"
+
+
+class Session:
+    """
+    Ideas typed in one go, all sent to the same place with the same options
+    (taken from the command line, see `cli.do`).
+    """
+
+    def __init__(
+        self,
+        args: dict[str, Any],
+        local_copy: Optional[Path],
+        queyd_client: Optional[QueydClient],
+    ):
+        self.args = args
+        self.local_copy = local_copy
+        self.queyd_client = queyd_client
+        # One idea at a time: clients of GitHub and Google Keep are not meant to be shared between threads,
+        # and ideas should show up in the order they were typed in
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="ideaseed-interactive"
+        )
+        self.sent: list[Future] = []
+
+        auth_cache = (github_cards.AuthCache if args["repo"] else gkeep.AuthCache)(
+            Path(args["auth_cache"])
+        )
+        if not auth_cache.cache:
+            # Logging in for the first time asks for credentials, so it can't happen in the background
+            auth_cache.login()
+        self.metadata: Future = self.executor.submit(self._prefetch, auth_cache)
+        self.target = None
+
+    def _prefetch(self, auth_cache) -> tuple[Any, Any]:
+        if not self.args["repo"]:
+            # Logging into Google Keep already syncs every note and label
+            return gkeep.login(auth_cache.path), None
+        client = auth_cache.login()
+        if client is None:
+            raise UsageError(f"Could not log into {auth_cache.service}")
+        return client, prefetch_github(
+            client,
+            self.args["repo"],
+            metadata.directory(Path(self.args["auth_cache"])),
+        )
+
+    def resolve(self) -> Optional[Any]:
+        client, cache = self.metadata.result()
+        if self.args["repo"]:
+            return resolve_github(client, cache, **self.args)
+        return resolve_gkeep(client, **self.args)
+
+    def submit(self, idea: Idea):
+        if self.target is None:
+            if self.metadata.running():
+                print("[dim]Fetching labels, milestones and projects...")
+            self.target = self.resolve()
+            if self.target is None:
+                raise UsageError("Nothing was sent")
+        self.sent.append(self.executor.submit(self._send, self.target, idea))
+
+    def _send(self, target: Any, idea: Idea) -> Sent:
+        send: Callable[..., str] = (
+            send_to_github if self.args["repo"] else send_to_gkeep
+        )
+        errors = []
+        if self.args["dry_run"]:
+            return Sent(idea, errors)
+
+        try:
+            idea.url = send(target, idea, **self.args)
+        except Exception as error:
+            return Sent(idea, [str(error)])
+
+        destinations = []
+        if self.queyd_client:
+            destinations.append(fanout.to_queyd(self.queyd_client, idea))
+        if self.local_copy:
+            destinations.append(
+                fanout.to_local_copy(
+                    self.local_copy,
+                    idea,
+                    self.args["repo"],
+                    local_copy_format=self.args["local_copy_format"],
+                    # Nobody can answer while the next idea is being typed
+                    on_conflict=(
+                        "suffix"
+                        if self.args["on_conflict"] == "ask"
+                        else self.args["on_conflict"]
+                    ),
+                )
+            )
+        for outcome in fanout.finish(fanout.start(destinations)):
+            if outcome.error:
+                errors.append(f"{outcome.destination.name}: {outcome.error}")
+        return Sent(idea, errors)
+
+    def finish(self) -> list[Sent]:
+        pending = sum(not future.done() for future in self.sent)
+        if pending:
+            print(f"[dim]Waiting for {pending} ideas to be sent...")
+        self.executor.shutdown(wait=True)
+        return [future.result() for future in self.sent]
+
+
+def prompt_for_idea() -> Optional[Idea]:
+    """
+    Asks for an idea. Returns `None` once the user is done.
+    """
+    title = ask("[bold]Title[/] [dim](optional)")
+    body = ask("[bold]Body[/] [dim](leave empty to finish)")
+    if not body:
+        return None
+    return Idea(title=title, body=body)
+
+
+def run(
+    args: dict[str, Any],
+    local_copy: Optional[Path],
+    queyd_client: Optional[QueydClient],
+):
+    session = Session(args, local_copy, queyd_client)
+    destination = args["repo"] or "Google Keep"
+    print(
+        f"Sending ideas to [bold]{destination}[/]. Leave the body empty or hit Ctrl-D to finish."
+    )
+    try:
+        while idea := prompt_for_idea():
+            session.submit(idea)
+    except (EOFError, KeyboardInterrupt):
+        print()
+    show_summary(session.finish(), dry_run=args["dry_run"])
+
+
+def show_summary(sent: list[Sent], dry_run: bool):
+    failed = 0
+    for idea, errors in sent:
+        name = rich.markup.escape(idea.title or ondisk.first_line(idea.body))
+        if errors:
+            failed += 1
+            print(f"[red]✗[/] [bold]{name}[/]")
+            for error in errors:
+                print(f"    [red]{rich.markup.escape(error)}")
+        elif idea.url:
+            print(f"[green]✓[/] [bold]{name}[/] [blue link {idea.url}]{idea.url}")
+        else:
+            print(f"[green]✓[/] [bold]{name}[/]")
+    verb = "Would have sent" if dry_run else "Sent"
+    print(
+        f"{verb} [bold blue]{len(sent) - failed}[/] ideas"
+        + (f", [red]{failed}[/] failed" if failed else "")
+    )
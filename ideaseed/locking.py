@@ -0,0 +1,234 @@
+"""
+Advisory locks (flock) on ideaseed's shared state files, so that several ideaseed processes
+can run at once without losing each other's changes.
+On Windows, ``msvcrt.locking`` is used instead. Where neither is available,
+only the threads of a single process are kept from stepping on each other.
+
+The lock of FILE is taken on FILE.lock, which is never replaced nor removed:
+FILE itself is usually replaced by a rename (see `ondisk.atomic_write`),
+which would make a lock taken on it useless.
+
+Run ``python -m ideaseed.locking`` for a stress test.
+"""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from time import monotonic, sleep
+from typing import IO, Iterator, Optional
+
+from ideaseed.constants import LOCK_TIMEOUT
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+class LockTimeout(Exception):
+    """Another process kept a lock for longer than we were willing to wait"""
+
+
+class _Lock:
+    def __init__(self):
+        # Threads of this process wait on this one, flock only works between processes
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.file: Optional[IO] = None
+
+
+_locks: dict[Path, _Lock] = {}
+_locks_lock = threading.Lock()
+
+
+def lock_path(path: Path) -> Path:
+    return path.with_name(path.name + ".lock")
+
+
+@contextmanager
+def locked(path: Path, timeout: float = LOCK_TIMEOUT) -> Iterator[None]:
+    """
+    Holds an exclusive lock on `path` for the duration of the `with` block.
+    Raises `LockTimeout` if it could not be taken within `timeout` seconds.
+    Locks are reentrant: taking the lock of a path that is already held by the current thread returns immediately.
+    """
+    with _locks_lock:
+        lock = _locks.setdefault(path.absolute(), _Lock())
+
+    deadline = monotonic() + timeout
+    if not lock.thread_lock.acquire(timeout=timeout):
+        raise LockTimeout(f"{path} is being used by another thread")
+    try:
+        if lock.depth == 0:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            lock.file = open(lock_path(path), "a")
+            try:
+                _flock(lock.file, path, deadline)
+            except BaseException:
+                lock.file.close()
+                raise
+        lock.depth += 1
+        try:
+            yield
+        finally:
+            lock.depth -= 1
+            if lock.depth == 0:
+                _unlock(lock.file)
+                lock.file.close()
+    finally:
+        lock.thread_lock.release()
+
+
+def _flock(file: IO, path: Path, deadline: float):
+    delay = 0.001
+    while True:
+        try:
+            _try_lock(file)
+            return
+        except BlockingIOError:
+            if monotonic() >= deadline:
+                raise LockTimeout(
+                    f"{path} is being used by another ideaseed process. Try again later."
+                )
+            sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+
+def _try_lock(file: IO):
+    """
+    Raises `BlockingIOError` if another process holds the lock
+    """
+    if fcntl is not None:
+        fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    elif msvcrt is not None:
+        # Locks the file's first byte, which works even if the file is empty
+        file.seek(0)
+        try:
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError as error:
+            raise BlockingIOError(error.errno, error.strerror) from error
+
+
+def _unlock(file: IO):
+    if fcntl is not None:
+        fcntl.flock(file, fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _stress_test(processes: int = 16, ideas_per_process: int = 20):
+    """
+    Runs `processes` ideaseed processes at once, each logging into its own service,
+    saving ideas with the same title into the same local copy directory and pack,
+    and syncing from the same (fake, local) Queyd server.
+    Then checks that nothing any of them wrote got lost.
+    """
+    import gzip
+    import json
+    import multiprocessing
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from ideaseed import authentication, ondisk, pack, sync
+    from ideaseed.queyd import QueydClient
+
+    notes = [
+        {
+            "id": str(i),
+            "title": f"Note {i}",
+            "project": "queyd",
+            "body": f"Body of note {i}",
+            "tags": [],
+            "updatedAt": f"2021-01-{i + 1:02}T00:00:00Z",
+        }
+        for i in range(10)
+    ]
+
+    class FakeQueyd(BaseHTTPRequestHandler):
+        def do_POST(self):
+            gzip.decompress(self.rfile.read(int(self.headers["Content-Length"])))
+            response = json.dumps({"data": {"notes": notes}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+        def log_message(self, *_):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeQueyd)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_port}/"
+
+    def work(number: int, directory: Path):
+        auth = authentication.Cache(directory / "auth.json", f"service-{number}")
+        auth.write({"token": str(number)})
+        # Child processes exit without running atexit handlers
+        authentication.flush()
+        local_copy = directory / "ideas"
+        for i in range(ideas_per_process):
+            idea = ondisk.Idea(title="Same title", body=f"Idea {i} of {number}")
+            ondisk.save(local_copy, idea, "stress/test", on_conflict="suffix")
+            pack.append(local_copy, local_copy / f"{number}-{i}.md", idea)
+        sync.sync_queyd(QueydClient.authenticated("", endpoint), local_copy)
+
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = Path(temporary)
+        (directory / "ideas").mkdir()
+        workers = [
+            multiprocessing.get_context("fork").Process(
+                target=work, args=(number, directory)
+            )
+            for number in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        server.shutdown()
+
+        local_copy = directory / "ideas"
+        expected = processes * ideas_per_process
+        saved = {
+            ondisk.load(local_copy, Path(entry.path)).body
+            for entry in ondisk.iter_local_copies(local_copy / "stress")
+        }
+        checks = {
+            "every process exited normally": all(w.exitcode == 0 for w in workers),
+            "every login was kept": set(
+                json.loads((directory / "auth.json").read_text())
+            )
+            == {f"service-{number}" for number in range(processes)},
+            "every idea was saved to its own file": len(saved) == expected,
+            "every idea is in the fingerprints index": len(
+                (ondisk.state_dir(local_copy) / ondisk.FINGERPRINTS_FILE)
+                .read_text()
+                .splitlines()
+            )
+            == expected + len(notes),
+            "every idea is in the pack": len(pack.latest_records(local_copy))
+            == expected,
+            "every note was synced once": len(
+                json.loads(
+                    (ondisk.state_dir(local_copy) / sync.QUEYD_STATE_FILE).read_text()
+                )["notes"]
+            )
+            == len(notes),
+        }
+
+    for check, passed in checks.items():
+        print(f"{'ok  ' if passed else 'FAIL'} {check}")
+    if not all(checks.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    _stress_test()
@@ -0,0 +1,532 @@
+"""
+A local cache of GitHub metadata: the repositories the user can push to, and the projects,
+columns, labels and milestones of the repositories ideas were sent to.
+
+Objects are kept as the JSON GitHub sent, so that they can be turned back into PyGithub objects
+without any request (see `Github.create_from_raw_data`).
+Lists are only sent again by GitHub when they changed since the last refresh
+(conditional requests, which do not count against the rate limit).
+
+The cache is refreshed in a separate process (see `refresh_in_background`), so that nothing waits for it.
+It lives in a ``metadata`` directory next to the auth cache:
+
+- user.json: the logged-in user
+- repos.json: the repositories the user has access to, to resolve REPO without any request (see `match_repo`)
+- repos/OWNER/REPO.json: metadata of a repository, collaborators included
+- completion.tsv: the names of all of the above, for shell completion (see `ideaseed.completion`)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import monotonic, time
+from typing import Any, Callable, Iterable, NamedTuple, Optional
+
+from github import Github
+from github.GithubException import GithubException
+from github.Label import Label
+from github.Milestone import Milestone
+from github.NamedUser import NamedUser
+from github.Project import Project
+from github.ProjectColumn import ProjectColumn
+from github.Repository import Repository
+
+from ideaseed import github_cards, locking, ondisk
+from ideaseed.constants import (METADATA_MAX_AGE, WARM_BUDGET_SHARE,
+                                WARM_CONCURRENCY)
+
+METADATA_DIR_NAME = "metadata"
+USER_FILE = "user.json"
+REPOS_FILE = "repos.json"
+COMPLETION_INDEX_FILE = "completion.tsv"
+REFRESH_LOG_FILE = "refresh.log"
+
+
+def directory(auth_cache: Path) -> Path:
+    return auth_cache.expanduser().parent / METADATA_DIR_NAME
+
+
+def repo_path(metadata_dir: Path, full_name: str) -> Path:
+    return metadata_dir / "repos" / f"{full_name}.json"
+
+
+def read(path: Path) -> dict[str, Any]:
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def write(path: Path, data: dict[str, Any]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    ondisk.atomic_write(path, json.dumps(data), durability="none")
+
+
+def is_stale(path: Path) -> bool:
+    try:
+        return time() - path.stat().st_mtime > METADATA_MAX_AGE
+    except FileNotFoundError:
+        return True
+
+
+def cached_repos(metadata_dir: Path) -> set[str]:
+    """
+    Full names of the repositories that have cached metadata
+    """
+    repos_dir = metadata_dir / "repos"
+    return {
+        path.relative_to(repos_dir).with_suffix("").as_posix()
+        for path in repos_dir.glob("*/*.json")
+    }
+
+
+def login(metadata_dir: Path) -> Optional[str]:
+    return read(metadata_dir / USER_FILE).get("data", {}).get("login")
+
+
+def repo_names(metadata_dir: Path) -> list[str]:
+    """
+    Names REPO can be given as to refer to a repository the user can push to (their own repositories,
+    the ones of their organizations and the ones they collaborate on): full names,
+    and names alone for their own repositories (see `full_name`).
+    Empty if the list of repositories was never cached.
+    """
+    username = login(metadata_dir)
+    names = []
+    for repo in read(metadata_dir / REPOS_FILE).get("items", []):
+        if not repo.get("permissions", {}).get("push"):
+            continue
+        names.append(repo["full_name"])
+        if repo["owner"]["login"] == username:
+            names.append(repo["name"])
+    return names
+
+
+def match_repo(repo: str, names: list[str]) -> list[str]:
+    """
+    The `names` that `repo` can refer to: the one it is (ignoring case),
+    or else the ones it is the start of. Only names of the same form are considered:
+    ``OWNER/REPO`` only matches full names, and ``REPO`` only matches names alone.
+
+    >>> names = ["ewen-lbh/ideaseed", "ideaseed", "ewen-lbh/ideas", "ideas", "ortfo/db"]
+    >>> match_repo("IdeaSeed", names)
+    ['ideaseed']
+    >>> match_repo("idea", names)
+    ['ideaseed', 'ideas']
+    >>> match_repo("ideas", names)
+    ['ideas']
+    >>> match_repo("ortfo/d", names)
+    ['ortfo/db']
+    >>> match_repo("db", names)
+    []
+    """
+    repo = repo.lower()
+    candidates = [name for name in names if ("/" in name) == ("/" in repo)]
+    exact = [name for name in candidates if name.lower() == repo]
+    if exact:
+        return exact
+    return [name for name in candidates if name.lower().startswith(repo)]
+
+
+class BudgetExhausted(Exception):
+    """All the requests a warm-up was allowed to make were made"""
+
+
+class Budget:
+    """
+    A number of requests, shared by every thread of a warm-up
+    """
+
+    def __init__(self, requests: int):
+        self.remaining = requests
+        self.lock = threading.Lock()
+
+    def spend(self):
+        with self.lock:
+            if self.remaining <= 0:
+                raise BudgetExhausted("Ran out of requests, try again later")
+            self.remaining -= 1
+
+    def refund(self):
+        with self.lock:
+            self.remaining += 1
+
+
+class Stats:
+    """
+    Requests made to refresh something
+    """
+
+    def __init__(self, budget: Optional[Budget] = None):
+        self.budget = budget
+        self.requests = 0
+        # Not-modified responses, which do not count against the rate limit
+        self.unchanged = 0
+
+    def request(self):
+        if self.budget is not None:
+            self.budget.spend()
+        self.requests += 1
+
+    def not_modified(self):
+        if self.budget is not None:
+            self.budget.refund()
+        self.unchanged += 1
+
+
+def _refresh_object(
+    gh: Github,
+    url: str,
+    cached: dict[str, Any],
+    stats: Stats,
+    accept: Optional[str] = None,
+) -> dict[str, Any]:
+    """
+    GETs `url`, unless it did not change since it was `cached`.
+    Cached objects look like ``{"etag": ..., "data": {...}}``.
+    """
+    headers = {"If-None-Match": cached["etag"]} if cached.get("etag") else {}
+    if accept:
+        headers["Accept"] = accept
+    stats.request()
+    status, response_headers, data = github_cards.requester(gh).requestJson(
+        "GET", url, None, headers
+    )
+    if status == 304:
+        stats.not_modified()
+        return cached
+    if status >= 400:
+        raise GithubException(status, data, response_headers)
+    return {"etag": response_headers.get("etag"), "data": json.loads(data)}
+
+
+def _refresh_list(
+    gh: Github,
+    url: str,
+    cached: dict[str, Any],
+    stats: Stats,
+    parameters: Optional[dict[str, Any]] = None,
+    accept: Optional[str] = None,
+) -> dict[str, Any]:
+    """
+    GETs every page of `url`, unless its first page did not change since it was `cached`.
+    Cached lists look like ``{"etag": ..., "items": [...]}``.
+    """
+    etag, items = github_cards.get_pages(
+        gh,
+        url,
+        {"per_page": 100} | (parameters or {}),
+        cached.get("etag"),
+        accept,
+        on_request=stats.request,
+    )
+    if etag is None:
+        stats.not_modified()
+        return cached
+    return {"etag": etag, "items": list(items)}
+
+
+def refresh_repos(gh: Github, metadata_dir: Path, stats: Optional[Stats] = None):
+    stats = stats or Stats()
+    user_path = metadata_dir / USER_FILE
+    write(user_path, _refresh_object(gh, "/user", read(user_path), stats))
+    repos_path = metadata_dir / REPOS_FILE
+    write(repos_path, _refresh_list(gh, "/user/repos", read(repos_path), stats))
+
+
+def refresh_repo(
+    gh: Github, metadata_dir: Path, full_name: str, stats: Optional[Stats] = None
+):
+    stats = stats or Stats()
+    path = repo_path(metadata_dir, full_name)
+    cached = read(path)
+    url = f"/repos/{full_name}"
+    refreshed = {
+        "repo": _refresh_object(gh, url, cached.get("repo", {}), stats),
+        "labels": _refresh_list(gh, f"{url}/labels", cached.get("labels", {}), stats),
+        "milestones": _refresh_list(
+            gh,
+            f"{url}/milestones",
+            cached.get("milestones", {}),
+            stats,
+            {"state": "all"},
+        ),
+        "projects": _refresh_list(
+            gh,
+            f"{url}/projects",
+            cached.get("projects", {}),
+            stats,
+            {"state": "open"},
+            accept=github_cards.PROJECTS_PREVIEW,
+        ),
+        "columns": {},
+    }
+    for project in refreshed["projects"]["items"]:
+        project_id = str(project["id"])
+        refreshed["columns"][project_id] = _refresh_list(
+            gh,
+            project["columns_url"],
+            cached.get("columns", {}).get(project_id, {}),
+            stats,
+            accept=github_cards.PROJECTS_PREVIEW,
+        )
+    try:
+        refreshed["collaborators"] = _refresh_list(
+            gh, f"{url}/collaborators", cached.get("collaborators", {}), stats
+        )
+    except GithubException as error:
+        # Only people with push access can list collaborators
+        if error.status != 403:
+            raise
+        refreshed["collaborators"] = {}
+    write(path, refreshed)
+
+
+def full_name(repo: str, username: Optional[str]) -> str:
+    """
+    `repo`, with the user's login prepended if it is a shorthand
+    (see `github_cards.resolve_self_repository_shorthand`)
+    """
+    return repo if "/" in repo else f"{username}/{repo}"
+
+
+def repos_in_local_copy(metadata_dir: Path, local_copy: Path) -> set[str]:
+    """
+    Repositories that ideas in `local_copy` were sent to (see `ondisk.get_path`):
+    DIR/OWNER/REPO directories, and DIR/REPO directories named like one of the user's repositories
+    (the others have Google Keep, Queyd or user project ideas).
+    """
+    username = login(metadata_dir)
+    own_repos = {
+        repo["name"]
+        for repo in read(metadata_dir / REPOS_FILE).get("items", [])
+        if repo["owner"]["login"] == username
+    }
+    repos = set()
+    for owner in os.scandir(local_copy):
+        if not owner.is_dir() or owner.name == ondisk.STATE_DIR_NAME:
+            continue
+        if owner.name in own_repos:
+            repos.add(f"{username}/{owner.name}")
+        for repo in os.scandir(owner.path):
+            if repo.is_dir():
+                repos.add(f"{owner.name}/{repo.name}")
+    return repos
+
+
+class Warmed(NamedTuple):
+    name: str
+    requests: int
+    unchanged: int
+    seconds: float
+    error: Optional[Exception] = None
+
+
+def _timed(name: str, refresh: Callable[[Stats], None], budget: Budget) -> Warmed:
+    stats = Stats(budget)
+    start = monotonic()
+    try:
+        refresh(stats)
+        error = None
+    except (GithubException, BudgetExhausted) as exception:
+        error = exception
+    return Warmed(name, stats.requests, stats.unchanged, monotonic() - start, error)
+
+
+def warm(
+    connect: Callable[[], Github],
+    metadata_dir: Path,
+    repos: Iterable[str] = (),
+    local_copy: Optional[Path] = None,
+    concurrency: int = WARM_CONCURRENCY,
+    budget: Optional[int] = None,
+) -> list[Warmed]:
+    """
+    Refreshes the list of repositories, then the metadata of `repos`, `concurrency` repositories at a time,
+    then the shell completion index.
+    `repos` can be shorthands. By default, they are the ones that are already cached
+    (the ones ideas were sent to) and the ones in `local_copy`.
+
+    Each thread uses its own client from `connect`, since PyGithub clients can't be shared between threads.
+    At most `budget` requests are made (not-modified responses excepted), by default
+    `WARM_BUDGET_SHARE` of what is left of the rate limit.
+    """
+    clients = threading.local()
+
+    def client() -> Github:
+        if not hasattr(clients, "gh"):
+            clients.gh = connect()
+        return clients.gh
+
+    with locking.locked(metadata_dir / "refresh"):
+        if budget is None:
+            remaining = client().get_rate_limit().core.remaining
+            budget = int(remaining * WARM_BUDGET_SHARE)
+        shared_budget = Budget(budget)
+
+        warmed = [
+            _timed(
+                "your repositories",
+                lambda stats: refresh_repos(client(), metadata_dir, stats),
+                shared_budget,
+            )
+        ]
+        username = login(metadata_dir)
+        if repos:
+            full_names = {full_name(repo, username) for repo in repos}
+        else:
+            full_names = cached_repos(metadata_dir)
+            if local_copy:
+                full_names |= repos_in_local_copy(metadata_dir, local_copy)
+
+        with ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="ideaseed-warm"
+        ) as executor:
+            warmed += executor.map(
+                lambda name: _timed(
+                    name,
+                    lambda stats: refresh_repo(client(), metadata_dir, name, stats),
+                    shared_budget,
+                ),
+                sorted(full_names),
+            )
+        write_completion_index(metadata_dir)
+    return warmed
+
+
+def needs_refresh(metadata_dir: Path, repos: Iterable[str] = ()) -> bool:
+    """
+    Whether the cache is too old, or misses one of `repos`
+    """
+    if is_stale(metadata_dir / COMPLETION_INDEX_FILE):
+        return True
+    username = login(metadata_dir)
+    return any(
+        not repo_path(metadata_dir, full_name(repo, username)).exists()
+        for repo in repos
+    )
+
+
+class CachedRepo(NamedTuple):
+    repo: Repository
+    labels: list[Label]
+    milestones: list[Milestone]
+    projects: list[Project]
+    # By project ID
+    columns: dict[int, list[ProjectColumn]]
+    collaborators: list[NamedUser]
+
+
+def cached(gh: Github, metadata_dir: Path, full_name: str) -> Optional[CachedRepo]:
+    """
+    The cached metadata of `full_name`, as PyGithub objects (no request is made).
+    `None` if the repository is not cached.
+    """
+    data = read(repo_path(metadata_dir, full_name))
+    if not data.get("repo", {}).get("data"):
+        return None
+
+    def objects(klass: type, cached_list: dict[str, Any]) -> list:
+        return [
+            gh.create_from_raw_data(klass, item)
+            for item in cached_list.get("items", [])
+        ]
+
+    return CachedRepo(
+        repo=gh.create_from_raw_data(Repository, data["repo"]["data"]),
+        labels=objects(Label, data["labels"]),
+        milestones=objects(Milestone, data["milestones"]),
+        projects=objects(Project, data["projects"]),
+        columns={
+            int(project_id): objects(ProjectColumn, columns)
+            for project_id, columns in data["columns"].items()
+        },
+        collaborators=objects(NamedUser, data.get("collaborators", {})),
+    )
+
+
+def refresh_in_background(auth_cache: Path, repos: Iterable[str] = ()):
+    """
+    Starts `warm` in another process, that keeps running after ideaseed exits.
+    """
+    metadata_dir = directory(auth_cache)
+    metadata_dir.mkdir(parents=True, exist_ok=True)
+    with open(metadata_dir / REFRESH_LOG_FILE, "a") as log:
+        subprocess.Popen(
+            [sys.executable, "-m", "ideaseed.metadata", str(auth_cache), *repos],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+
+
+def _index_field(text: str) -> str:
+    """
+    `text`, made safe to put in a TSV line
+
+    >>> _index_field("Two\\tlines\\nof text")
+    'Two lines of text'
+    """
+    return text.replace("\t", " ").replace("\n", " ")
+
+
+def write_completion_index(metadata_dir: Path):
+    """
+    Writes one ``KIND<TAB>REPO<TAB>PROJECT<TAB>NAME`` line per repository, label, milestone,
+    project and column, where REPO and PROJECT are the ones it belongs to (if any).
+    Repositories of the logged-in user are also listed by their name alone (see `full_name`).
+    """
+    username = login(metadata_dir)
+    lines: list[tuple[str, str, str, str]] = []
+    for repo in read(metadata_dir / REPOS_FILE).get("items", []):
+        if not repo.get("permissions", {}).get("push"):
+            continue
+        lines.append(("repo", "", "", repo["full_name"]))
+        if repo["owner"]["login"] == username:
+            lines.append(("repo", "", "", repo["name"]))
+
+    for full_name in sorted(cached_repos(metadata_dir)):
+        cached = read(repo_path(metadata_dir, full_name))
+        owner, name = full_name.split("/")
+        for repo in [full_name] + ([name] if owner == username else []):
+            for label in cached["labels"].get("items", []):
+                lines.append(("label", repo, "", label["name"]))
+            for milestone in cached["milestones"].get("items", []):
+                lines.append(("milestone", repo, "", milestone["title"]))
+            for project in cached["projects"].get("items", []):
+                lines.append(("project", repo, "", project["name"]))
+                columns = cached["columns"].get(str(project["id"]), {})
+                for column in columns.get("items", []):
+                    lines.append(("column", repo, project["name"], column["name"]))
+
+    ondisk.atomic_write(
+        metadata_dir / COMPLETION_INDEX_FILE,
+        "".join("\t".join(map(_index_field, line)) + "\n" for line in lines),
+        durability="none",
+    )
+
+
+if __name__ == "__main__":
+    # Run by `refresh_in_background`: python -m ideaseed.metadata AUTH_CACHE [REPO...]
+    auth_cache_path, *repos = sys.argv[1:]
+    auth_cache = github_cards.AuthCache(Path(auth_cache_path))
+    # Never ask for credentials, nobody would be there to answer
+    if auth_cache.cache:
+        metadata_dir = directory(Path(auth_cache_path))
+        try:
+            with locking.locked(metadata_dir / "refresh", timeout=0):
+                warm(
+                    auth_cache.login_from_cache,
+                    metadata_dir,
+                    [*repos, *cached_repos(metadata_dir)],
+                )
+        except locking.LockTimeout:
+            # Another refresh is already running
+            pass
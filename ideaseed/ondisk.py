@@ -4,33 +4,126 @@ Takes care of saving a copy of ideas to disk (if enable with --local-copy=DIR)
 Will save in {--local-copy}/{project name}/{slug of (title or body's first line)}
 """
 
+import hashlib
+import os
+import re
+import sys
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Any, Iterable, Iterator, NamedTuple, Optional
 
 import yaml
-from recordclass import RecordClass
 from slugify import slugify
 
+from ideaseed import locking, pack, search
 from ideaseed.utils import answered_yes_to
 
+STATE_DIR_NAME = ".ideaseed"
+FINGERPRINTS_FILE = "fingerprints.tsv"
 
-class Idea(RecordClass):
-    assignees: list[str] = []
-    body: str = ""
-    color: str = ""
-    column: str = ""
-    labels: list[str] = []
-    milestone: str = ""
-    pinned: bool = False
-    project: str = ""
-    repo: str = ""
-    title: str = ""
-    url: str = ""
+DURABILITY_LEVELS = ("none", "file", "full")
+
+
+# Fields that are written to the YAML header, in the order PyYAML writes them (sorted)
+HEADER_FIELDS = (
+    "assignees",
+    "color",
+    "column",
+    "fingerprint",
+    "labels",
+    "milestone",
+    "pinned",
+    "project",
+    "url",
+)
+
+# Plain (unquoted) YAML scalars that `_dump_header` and `_load_header` know how to handle.
+# Anything else goes through PyYAML.
+_PLAIN_SCALAR = re.compile(r"[A-Za-z][!-~]*(?: [!-~]+)*")
+_NOT_STRINGS = {"yes", "no", "true", "false", "on", "off", "null"}
+# PyYAML's default line width, past which it folds plain scalars at spaces
+_YAML_WIDTH = 80
+
+try:
+    _YAMLSafeLoader = yaml.CSafeLoader
+except AttributeError:
+    _YAMLSafeLoader = yaml.SafeLoader
+
+
+class Idea:
+    """
+    An idea, with what was used to publish it.
+
+    Lists are never shared between ideas: they are copied when the idea is created,
+    and by `copy`.
+    """
+
+    __slots__ = (
+        "assignees",
+        "body",
+        "color",
+        "column",
+        "fingerprint",
+        "labels",
+        "milestone",
+        "pinned",
+        "project",
+        "repo",
+        "title",
+        "url",
+    )
+    __fields__ = __slots__
+
+    def __init__(
+        self,
+        assignees: Iterable[str] = (),
+        body: str = "",
+        color: str = "",
+        column: str = "",
+        fingerprint: str = "",
+        labels: Iterable[str] = (),
+        milestone: str = "",
+        pinned: bool = False,
+        project: str = "",
+        repo: str = "",
+        title: str = "",
+        url: str = "",
+    ):
+        self.assignees: list[str] = list(assignees or [])
+        self.body = body
+        self.color = color
+        self.column = column
+        self.fingerprint = fingerprint
+        self.labels: list[str] = list(labels or [])
+        self.milestone = milestone
+        self.pinned = pinned
+        self.project = project
+        self.repo = repo
+        self.title = title
+        self.url = url
+
+    def copy(self) -> "Idea":
+        return Idea(**self._asdict())
+
+    def _asdict(self) -> dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__fields__}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Idea):
+            return NotImplemented
+        return all(
+            getattr(self, field) == getattr(other, field) for field in self.__fields__
+        )
+
+    def __repr__(self) -> str:
+        return f"Idea({', '.join(f'{k}={v!r}' for k, v in self._asdict().items())})"
 
     @property
     def as_markdown(self) -> str:
         return f"""---
-{yaml.dump(self._header_dict).strip()}
+{_dump_header(self._header_dict)}
 ---
 
 # {self.title}
@@ -38,19 +131,35 @@ class Idea(RecordClass):
 {self.body}
 """
 
+    @classmethod
+    def from_markdown(cls, text: str, repo: str = "") -> "Idea":
+        """
+        Parses a local copy written by `as_markdown`.
+        The repo is not part of the file, it is taken from `repo`.
+        Header keys that are not fields of `Idea` are ignored.
+        """
+        _, header, content = text.split("---\n", 2)
+        heading, _, body = content.removeprefix("\n").partition("\n\n")
+        return cls(
+            title=heading.removeprefix("#").removeprefix(" "),
+            body=body.removesuffix("\n"),
+            repo=repo,
+            **{
+                key: value
+                for key, value in _load_header(header).items()
+                if key in cls.__fields__
+            },
+        )
+
     @property
     def _header_dict(self) -> dict:
         """
         Returns a YAML header to be used by `self.as_markdown`
-
-        >>>
         """
-        excluded_keys = "body", "title", "repo"
         return {
             k: v
-            for k, v in self._asdict().items()
+            for k, v in ((k, getattr(self, k)) for k in HEADER_FIELDS)
             if v
-            and k not in excluded_keys
             and (
                 # also don't add color: White since it's the default
                 not (k == "color" and v == "White")
@@ -58,26 +167,518 @@ class Idea(RecordClass):
         }
 
 
-def save(local_copy: Path, idea: Idea, repo: str, **_) -> str:
+@lru_cache(maxsize=4096)
+def _is_plain_scalar(value: str, column: int) -> bool:
+    """
+    Whether PyYAML would write `value` as-is (without quotes nor folding) when it starts at `column`,
+    and would read it back as the same string.
+
+    >>> _is_plain_scalar("ewen-lbh", 0), _is_plain_scalar("https://github.com/ewen-lbh/ideaseed/issues/1", 5)
+    (True, True)
+    >>> _is_plain_scalar("yes", 0), _is_plain_scalar("12", 0), _is_plain_scalar("Waiting: on review", 0)
+    (False, False, False)
+    """
+    return bool(
+        _PLAIN_SCALAR.fullmatch(value)
+        and ": " not in value
+        and " #" not in value
+        and not value.endswith(":")
+        and value.lower() not in _NOT_STRINGS
+        and (" " not in value or column + len(value) <= _YAML_WIDTH)
+    )
+
+
+def _dump_header(header: dict[str, Any]) -> str:
+    """
+    Same as `yaml.dump(header).strip()`, without going through PyYAML for the usual values.
+
+    >>> _dump_header({"labels": ["bug", "help wanted"], "pinned": True, "url": "https://keep.google.com/u/0/#NOTE/1"})
+    'labels:\\n- bug\\n- help wanted\\npinned: true\\nurl: https://keep.google.com/u/0/#NOTE/1'
+    >>> _dump_header({})
+    '{}'
+    """
+    if not header:
+        return "{}"
+    lines = []
+    for key in sorted(header):
+        value = header[key]
+        if value is True:
+            lines.append(f"{key}: true")
+        elif isinstance(value, str) and _is_plain_scalar(value, len(key) + 2):
+            lines.append(f"{key}: {value}")
+        elif isinstance(value, list) and all(
+            isinstance(item, str) and _is_plain_scalar(item, 2) for item in value
+        ):
+            lines.append(f"{key}:")
+            lines.extend(f"- {item}" for item in value)
+        else:
+            lines.append(yaml.dump({key: value}).strip())
+    return "\n".join(lines)
+
+
+def _load_header(header: str) -> dict[str, Any]:
+    """
+    Same as `yaml.safe_load(header)`, without going through PyYAML for headers made by `_dump_header`
+    that only contain plain values.
+
+    >>> _load_header("labels:\\n- bug\\n- help wanted\\npinned: true\\nurl: https://keep.google.com/u/0/#NOTE/1\\n")
+    {'labels': ['bug', 'help wanted'], 'pinned': True, 'url': 'https://keep.google.com/u/0/#NOTE/1'}
+    """
+    loaded: dict[str, Any] = {}
+    current_list: Optional[list] = None
+    for line in header.splitlines():
+        if line.startswith("- ") and current_list is not None:
+            item = line[2:]
+            if not _is_plain_scalar(item, 2):
+                break
+            current_list.append(item)
+            continue
+
+        key, separator, value = line.partition(":")
+        if not separator or key not in HEADER_FIELDS:
+            break
+        current_list = None
+        if value == "":
+            loaded[key] = current_list = []
+        elif value == " true":
+            loaded[key] = True
+        elif value.startswith(" ") and _is_plain_scalar(value[1:], len(key) + 2):
+            loaded[key] = value[1:]
+        else:
+            break
+    else:
+        return loaded
+
+    return yaml.load(header, Loader=_YAMLSafeLoader) or {}
+
+
+def save(
+    local_copy: Path,
+    idea: Idea,
+    repo: str,
+    local_copy_format: str = "files",
+    on_conflict: str = "ask",
+    **_,
+) -> str:
     """
     Saves a local copy of the given Idea to the right path
-    Returns the path where the file was written.
+    Returns the path where the file was written (the pack's segment with the 'pack' format).
     Returns "" if the file was not written at all.
+
+    `on_conflict` says what to do when a local copy with the same slug already exists:
+
+    - ask: ask whether to overwrite it. When that's not possible, acts like 'suffix'
+    - suffix: save to the first free path among slug-2.md, slug-3.md, etc.
+    - overwrite: replace it
+
+    The 'pack' format always appends, the last saved idea wins.
+
+    If an idea with the same content (see `fingerprint`) and url was already saved with the 'files' format,
+    nothing is written and the path of the existing local copy is returned.
     """
 
     filepath = get_path(
         root_dir=local_copy, repo_full=repo, title=idea.title, body=idea.body
     )
-    if filepath.exists() and not answered_yes_to(
-        f"The local copy [bold blue]{filepath.relative_to(local_copy)}[/] already exists. Overwrite it?"
-    ):
-        return ""
+    if local_copy_format == "pack":
+        return pack.append(local_copy, filepath, idea)
 
-    filepath.parent.mkdir(parents=True, exist_ok=True)
-    filepath.write_text(idea.as_markdown)
+    if existing := saved_copy(local_copy, idea, get_repo(local_copy, filepath)):
+        return existing
+
+    if on_conflict == "ask" and not can_prompt():
+        on_conflict = "suffix"
+
+    if filepath.name in taken_names(filepath.parent):
+        if on_conflict == "ask" and not answered_yes_to(
+            f"The local copy [bold blue]{filepath.relative_to(local_copy)}[/] already exists. Overwrite it?"
+        ):
+            return ""
+
+    while True:
+        destination = first_free_path(filepath) if on_conflict == "suffix" else filepath
+        try:
+            write(local_copy, destination, idea, overwrite=on_conflict != "suffix")
+            return destination
+        except FileExistsError:
+            # Created by someone else since the directory was listed
+            taken_names(destination.parent).add(destination.name)
+
+
+def fingerprint(idea: Idea, repo: str) -> str:
+    """
+    Hash of the idea's content, that does not change with whitespace.
+    Ideas with the same fingerprint and url are considered duplicates.
+
+    >>> fingerprint(Idea(title="Idea", body="Some  body\\n"), "a/b") == fingerprint(Idea(title="Idea ", body="Some body"), "a/b")
+    True
+    >>> fingerprint(Idea(title="Idea", body="Some body"), "a/b") == fingerprint(Idea(title="Idea", body="Some body"), "a/c")
+    False
+    """
+    content = "\0".join(
+        " ".join((text or "").split()) for text in (repo, idea.title, idea.body)
+    )
+    return "sha256:" + hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class Fingerprints:
+    """
+    The fingerprints index of a local copy directory.
+
+    The index file has a ``fingerprint<TAB>url<TAB>path`` line per written local copy,
+    where the path is relative to the local copy directory. The last line of a path wins,
+    and the file is compacted once most of its lines were superseded.
+    """
+
+    __slots__ = ("by_path", "paths", "lines")
+
+    def __init__(self, by_path: dict[str, tuple[str, str]], lines: int):
+        # Fingerprint and url of the local copy at each path
+        self.by_path = by_path
+        # Path of the local copy that has a given fingerprint and url
+        self.paths = {key: path for path, key in by_path.items()}
+        # Number of lines of the index file
+        self.lines = lines
+
+
+_fingerprints: dict[Path, Fingerprints] = {}
+
+
+def fingerprints(local_copy: Path) -> Fingerprints:
+    """
+    The fingerprints index of `local_copy`.
+    Read from the local copy's state directory the first time, then kept in memory.
+    """
+    if local_copy not in _fingerprints:
+        _fingerprints[local_copy] = _load_fingerprints(local_copy)
+    return _fingerprints[local_copy]
+
+
+def _load_fingerprints(local_copy: Path) -> Fingerprints:
+    """
+    Reads the fingerprints index of `local_copy`, compacting it if needed
+    """
+    index_path = state_dir(local_copy) / FINGERPRINTS_FILE
+    with locking.locked(index_path):
+        lines = index_path.read_text().splitlines() if index_path.exists() else []
+        by_path = {}
+        for line in lines:
+            digest, url, path = (line.split("\t", 2) + ["", ""])[:3]
+            if path:  # Not cut short by a crash
+                by_path[path] = (digest, url)
+
+        if len(lines) <= 2 * len(by_path):
+            return Fingerprints(by_path, len(lines))
+
+        # Also forget local copies that were removed since
+        by_path = {
+            path: key for path, key in by_path.items() if (local_copy / path).exists()
+        }
+        _write_fingerprints(index_path, by_path)
+        return Fingerprints(by_path, len(by_path))
+
+
+def _write_fingerprints(index_path: Path, by_path: dict[str, tuple[str, str]]):
+    atomic_write(
+        index_path,
+        "".join(
+            f"{digest}\t{url}\t{path}\n" for path, (digest, url) in by_path.items()
+        ),
+    )
+
+
+def remember_fingerprint(local_copy: Path, fingerprint: str, url: str, filepath: Path):
+    relative_path = filepath.relative_to(local_copy).as_posix()
+    index = fingerprints(local_copy)
+    previous = index.by_path.get(relative_path)
+    if previous and index.paths.get(previous) == relative_path:
+        # Overwritten: that file does not hold the previous idea anymore
+        del index.paths[previous]
+    index.by_path[relative_path] = (fingerprint, url)
+    index.paths[(fingerprint, url)] = relative_path
+
+    index_path = state_dir(local_copy) / FINGERPRINTS_FILE
+    with locking.locked(index_path):
+        with open(index_path, "a") as index_file:
+            index_file.write(f"{fingerprint}\t{url}\t{relative_path}\n")
+        index.lines += 1
+        if index.lines > 2 * len(index.by_path):
+            # Re-read, to get what other processes wrote too
+            _fingerprints[local_copy] = _load_fingerprints(local_copy)
+
+
+def saved_copy(local_copy: Path, idea: Idea, repo: str) -> Optional[Path]:
+    """
+    The local copy that already holds `idea` (same fingerprint and url), if there is one.
+    """
+    key = (fingerprint(idea, repo), idea.url)
+    relative_path = fingerprints(local_copy).paths.get(key)
+    if relative_path is None:
+        return None
+
+    # The file may have been changed or removed since it was indexed
+    filepath = local_copy / relative_path
+    try:
+        existing = load(local_copy, filepath)
+    except (OSError, ValueError, yaml.YAMLError):
+        return None
+    if (fingerprint(existing, existing.repo), existing.url) != key:
+        return None
     return filepath
 
 
+def dedupe(local_copy: Path, dry_run: bool = False) -> list[tuple[Path, Path]]:
+    """
+    Removes local copies that have the same content and url as another one, keeping the oldest one,
+    in a single pass over `local_copy`. The fingerprints index is rebuilt along the way.
+    Returns (removed, kept) pairs. Nothing is removed if `dry_run` is set.
+    """
+    with locking.locked(state_dir(local_copy) / FINGERPRINTS_FILE):
+        kept: dict[tuple[str, str], os.DirEntry] = {}
+        removed = []
+        for entry in iter_local_copies(local_copy):
+            try:
+                idea = load(local_copy, Path(entry.path))
+            except (ValueError, yaml.YAMLError):
+                continue
+            # Copies of an idea that was published several times are not duplicates
+            key = (fingerprint(idea, idea.repo), idea.url)
+            if key not in kept:
+                kept[key] = entry
+                continue
+            duplicate, original = sorted(
+                (entry, kept[key]), key=lambda e: e.stat().st_mtime, reverse=True
+            )
+            kept[key] = original
+            removed.append((Path(duplicate.path), Path(original.path)))
+
+        if dry_run:
+            return removed
+
+        for duplicate, _ in removed:
+            duplicate.unlink()
+            search.remove(local_copy, duplicate)
+            taken_names(duplicate.parent).discard(duplicate.name)
+
+        by_path = {
+            Path(entry.path).relative_to(local_copy).as_posix(): key
+            for key, entry in kept.items()
+        }
+        _write_fingerprints(state_dir(local_copy) / FINGERPRINTS_FILE, by_path)
+        _fingerprints[local_copy] = Fingerprints(by_path, len(by_path))
+        return removed
+
+
+def can_prompt() -> bool:
+    """
+    Whether the user can be asked questions: not when writing lots of ideas at once,
+    nor when stdin is not a terminal.
+    """
+    return _current_batch() is None and sys.stdin is not None and sys.stdin.isatty()
+
+
+_taken_names: dict[Path, set[str]] = {}
+
+
+def taken_names(directory: Path) -> set[str]:
+    """
+    Names of the files in `directory`.
+    The directory is only listed the first time, `write` keeps the set up to date afterwards.
+    """
+    if directory not in _taken_names:
+        _taken_names[directory] = (
+            {entry.name for entry in os.scandir(directory)}
+            if directory.is_dir()
+            else set()
+        )
+    return _taken_names[directory]
+
+
+def forget():
+    """
+    Drops what was kept in memory about local copy directories (see `fingerprints` and `taken_names`),
+    for long-running processes whose directories can be changed by other processes in the meantime.
+    """
+    _fingerprints.clear()
+    _taken_names.clear()
+
+
+def first_free_path(filepath: Path) -> Path:
+    """
+    `filepath` itself if it is not taken, or the first of slug-2.md, slug-3.md... that is not.
+    """
+    taken = taken_names(filepath.parent)
+    if filepath.name not in taken:
+        return filepath
+    suffix = 2
+    while f"{filepath.stem}-{suffix}{filepath.suffix}" in taken:
+        suffix += 1
+    return filepath.with_name(f"{filepath.stem}-{suffix}{filepath.suffix}")
+
+
+def write(
+    local_copy: Path,
+    filepath: Path,
+    idea: Idea,
+    durability: str = "full",
+    overwrite: bool = True,
+):
+    """
+    Writes `idea` to `filepath`, creating parent directories as needed,
+    and updates the search index of `local_copy`.
+    Raises `FileExistsError` if `filepath` exists and `overwrite` is not set.
+    """
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    # The caller's idea is left as is
+    idea = idea.copy()
+    idea.fingerprint = fingerprint(idea, get_repo(local_copy, filepath))
+    atomic_write(filepath, idea.as_markdown, durability, overwrite)
+    taken_names(filepath.parent).add(filepath.name)
+    remember_fingerprint(local_copy, idea.fingerprint, idea.url, filepath)
+    if (batch := _current_batch()) is not None:
+        batch.indexed.setdefault(local_copy, []).append((filepath, idea))
+    else:
+        search.update(local_copy, filepath, idea)
+
+
+class _Batch(NamedTuple):
+    # Directories to fsync when the batch ends
+    directories: set[Path]
+    # Ideas to add to the search index of their local copy when the batch ends
+    indexed: dict[Path, list[tuple[Path, Idea]]]
+
+
+# Each thread has its own batch: one thread writing lots of ideas
+# must not change how the others write (nor stop them from prompting)
+_batches = threading.local()
+
+
+def _current_batch() -> Optional[_Batch]:
+    return getattr(_batches, "current", None)
+
+
+@contextmanager
+def group_commit():
+    """
+    Groups writes made inside of this context manager:
+    directories are fsynced and the search index is updated once at the end,
+    instead of after every single write.
+    Use it whenever lots of ideas are written at once.
+    """
+    if _current_batch() is not None:
+        # The outermost batch takes care of everything
+        yield
+        return
+
+    batch = _batches.current = _Batch(directories=set(), indexed={})
+    try:
+        yield
+    finally:
+        _batches.current = None
+        for directory in batch.directories:
+            fsync_directory(directory)
+        for local_copy, written in batch.indexed.items():
+            search.update_many(local_copy, written)
+
+
+def fsync_directory(directory: Path):
+    """
+    Makes sure that files created or renamed inside of `directory` are on disk.
+    """
+    descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def atomic_write(
+    filepath: Path, text: str, durability: str = "full", overwrite: bool = True
+):
+    """
+    Writes `text` to a temporary file next to `filepath`, then renames it to `filepath`,
+    so that a crash never leaves a half-written file behind.
+    If `overwrite` is not set, raises `FileExistsError` instead of replacing an existing file.
+
+    `durability` says how hard to try to keep the write if the whole system crashes right after:
+
+    - none: the data may still be in the OS' cache
+    - file: the file's content is flushed to disk (fsync) before it is renamed
+    - full: the directory is also fsynced, so that the rename itself is on disk.
+            When in a `group_commit`, this is done once at the end.
+    """
+    if durability not in DURABILITY_LEVELS:
+        raise ValueError(f"Unknown durability level {durability!r}")
+
+    # Unique to this thread, so that threads writing the same file don't share a temporary one
+    temporary = filepath.with_name(
+        f".{filepath.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    try:
+        with open(temporary, "w") as file:
+            file.write(text)
+            if durability != "none":
+                file.flush()
+                os.fsync(file.fileno())
+        if overwrite:
+            os.replace(temporary, filepath)
+        else:
+            # Unlike renaming, linking fails if the target already exists
+            os.link(temporary, filepath)
+            temporary.unlink()
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+
+    if durability == "full":
+        if (batch := _current_batch()) is not None:
+            batch.directories.add(filepath.parent)
+        else:
+            fsync_directory(filepath.parent)
+
+
+def load(local_copy: Path, filepath: Path) -> Idea:
+    """
+    Reads the local copy at `filepath`, guessing its repo from where it is in `local_copy`
+    """
+    return Idea.from_markdown(filepath.read_text(), repo=get_repo(local_copy, filepath))
+
+
+def get_repo(local_copy: Path, filepath: Path) -> str:
+    """
+    Inverse of what `get_path` does with the repo
+
+    >>> get_repo(Path("/ideas"), Path("/ideas/ewen-lbh/ideaseed/some-idea.md"))
+    'ewen-lbh/ideaseed'
+    >>> get_repo(Path("/ideas"), Path("/ideas/some-idea.md"))
+    ''
+    """
+    repo = filepath.parent.relative_to(local_copy).as_posix()
+    return "" if repo == "." else repo
+
+
+def iter_local_copies(local_copy: Path) -> Iterator[os.DirEntry]:
+    """
+    Yields every local copy file under `local_copy`, without going into ideaseed's own state directory.
+    """
+    for entry in os.scandir(local_copy):
+        if entry.is_dir(follow_symlinks=False):
+            if entry.name != STATE_DIR_NAME:
+                yield from iter_local_copies(Path(entry.path))
+        elif entry.name.endswith(".md"):
+            yield entry
+
+
+def state_dir(local_copy: Path) -> Path:
+    """
+    Directory where ideaseed keeps its own bookkeeping files for the local copy at `local_copy`
+    (sync state, indexes...). It is created if it does not exist yet.
+    """
+    path = local_copy / STATE_DIR_NAME
+    path.mkdir(exist_ok=True)
+    return path
+
+
 def first_line(text: str) -> str:
     return text.splitlines()[0]
 
@@ -92,3 +693,94 @@ def get_path(
         user, repo = "", repo_full
 
     return root_dir / user / repo / (slugify(title or first_line(body)) + ".md")
+
+
+def _benchmark_serialization(count: int = 100_000):
+    """
+    Serializes and parses `count` ideas, and does the same with PyYAML alone for comparison.
+    Run with ``python -m ideaseed.ondisk``.
+    """
+    from time import perf_counter
+
+    ideas = [
+        Idea(
+            title=f"Idea number {i}",
+            body=f"Some body for idea {i}\n\nWith a second paragraph.",
+            labels=["enhancement", "help wanted"][: i % 3],
+            assignees=["ewen-lbh"] if i % 2 else [],
+            project="Incubator" if i % 4 else "",
+            column="To do" if i % 4 else "",
+            milestone="v2.0.0" if i % 5 == 0 else "",
+            pinned=i % 7 == 0,
+            url=f"https://github.com/ewen-lbh/ideaseed/issues/{i}",
+        )
+        for i in range(count)
+    ]
+
+    start = perf_counter()
+    texts = [idea.as_markdown for idea in ideas]
+    serialized_in = perf_counter() - start
+
+    start = perf_counter()
+    parsed = [Idea.from_markdown(text) for text in texts]
+    parsed_in = perf_counter() - start
+    assert parsed == ideas
+
+    start = perf_counter()
+    headers = [yaml.dump(idea._header_dict).strip() for idea in ideas]
+    pyyaml_serialized_in = perf_counter() - start
+
+    start = perf_counter()
+    for header in headers:
+        yaml.safe_load(header)
+    pyyaml_parsed_in = perf_counter() - start
+
+    print(f"{count} ideas:")
+    print(
+        f"    serialized in {serialized_in:.2f}s (PyYAML: {pyyaml_serialized_in:.2f}s)"
+    )
+    print(f"    parsed in     {parsed_in:.2f}s (PyYAML: {pyyaml_parsed_in:.2f}s)")
+
+
+def _benchmark_writes(count: int = 2_000):
+    """
+    Writes `count` ideas with every durability level, one by one and in a `group_commit`.
+    Run with ``python -m ideaseed.ondisk``.
+    """
+    from contextlib import nullcontext
+    from tempfile import TemporaryDirectory
+    from time import perf_counter
+
+    ideas = [
+        Idea(
+            title=f"Idea number {i}",
+            body=f"Some body for idea {i}",
+            labels=["enhancement"],
+            url=f"https://github.com/ewen-lbh/ideaseed/issues/{i}",
+        )
+        for i in range(count)
+    ]
+
+    print(f"Writing {count} ideas:")
+    for durability in DURABILITY_LEVELS:
+        for grouped in (False, True):
+            with TemporaryDirectory() as directory:
+                local_copy = Path(directory)
+                start = perf_counter()
+                with group_commit() if grouped else nullcontext():
+                    for idea in ideas:
+                        write(
+                            local_copy,
+                            get_path(local_copy, "ewen-lbh/ideaseed", idea.title, ""),
+                            idea,
+                            durability,
+                        )
+                elapsed = perf_counter() - start
+            print(
+                f"    {durability:>4}{' (group commit)' if grouped else '               '}: {count / elapsed:8.0f} writes/s"
+            )
+
+
+if __name__ == "__main__":
+    _benchmark_serialization()
+    _benchmark_writes()
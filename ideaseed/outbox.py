@@ -0,0 +1,67 @@
+"""
+Ideas that could not be sent everywhere before the command's --deadline (``ideaseed outbox``).
+
+Each one is a JSON file in an ``outbox`` directory next to the auth cache. It holds the command-line
+arguments the idea was sent with, the destinations it still has to go to, and the idea as it was
+sent to the others. ``ideaseed outbox send`` sends it again, to those destinations only.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from time import time_ns
+from typing import Any, NamedTuple
+
+from ideaseed import ondisk
+from ideaseed.ondisk import Idea
+
+OUTBOX_DIR_NAME = "outbox"
+
+# Destinations an idea can be waiting for
+PUSH = "push"  # GitHub or Google Keep
+QUEYD = "queyd"
+LOCAL_COPY = "local copy"
+DESTINATIONS = (PUSH, QUEYD, LOCAL_COPY)
+
+
+class Entry(NamedTuple):
+    # Command-line arguments, as given to `cli.run_command`
+    args: dict[str, Any]
+    # Destinations the idea still has to be sent to
+    pending: list[str]
+    # The idea as it was sent to the other destinations (as `Idea._asdict` gives it)
+    idea: dict[str, Any]
+
+    @property
+    def as_idea(self) -> Idea:
+        return Idea(**self.idea)
+
+
+def directory(auth_cache: Path) -> Path:
+    return auth_cache.expanduser().parent / OUTBOX_DIR_NAME
+
+
+def put(outbox_dir: Path, entry: Entry) -> Path:
+    outbox_dir.mkdir(parents=True, exist_ok=True)
+    # Sorted by the time they were put in the outbox
+    path = outbox_dir / f"{time_ns()}.json"
+    ondisk.atomic_write(path, json.dumps(entry._asdict()))
+    return path
+
+
+def entries(outbox_dir: Path) -> list[tuple[Path, Entry]]:
+    return [
+        (path, Entry(**json.loads(path.read_text())))
+        for path in sorted(outbox_dir.glob("*.json"))
+    ]
+
+
+def update(path: Path, entry: Entry):
+    """
+    Writes `entry` back, or removes it if it is not waiting for anything anymore
+    """
+    if entry.pending:
+        ondisk.atomic_write(path, json.dumps(entry._asdict()))
+    else:
+        path.unlink(missing_ok=True)
@@ -0,0 +1,242 @@
+"""
+Packed local copies (``--local-copy-format=pack``)
+
+Instead of one file per idea, ideas are appended to segment files in the local copy's state directory,
+which is way easier on the filesystem (and on backups) for archives with lots of ideas.
+
+Each segment ``NNNNNN.seg`` is a sequence of records:
+
+    length of the payload (4 bytes, big endian) | flags (1 byte) | payload
+
+where the payload is the path the idea would have with ``--local-copy-format=files``
+(relative to the local copy directory), a NUL byte, and the idea as markdown.
+The payload is zlib-compressed when the ``COMPRESSED`` flag is set, which is the case in compacted segments.
+
+``NNNNNN.idx`` holds the offsets of the records of the corresponding segment (8 bytes, big endian each).
+It is the commit point of a segment: it is always written (or replaced) after the segment.
+
+Records are never modified: saving an idea to an already-used path appends a new record,
+and the last one wins.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+from ideaseed import locking, ondisk
+
+PACK_DIR_NAME = "pack"
+# A new segment is started once the current one gets bigger than this
+SEGMENT_MAX_SIZE = 64 * 1024 * 1024
+
+COMPRESSED = 0b1
+
+_RECORD_HEADER = struct.Struct(">IB")
+_INDEX_ENTRY = struct.Struct(">Q")
+
+
+class Record(NamedTuple):
+    path: str
+    markdown: str
+
+
+def pack_dir(local_copy: Path) -> Path:
+    path = ondisk.state_dir(local_copy) / PACK_DIR_NAME
+    path.mkdir(exist_ok=True)
+    return path
+
+
+def segments(local_copy: Path) -> list[Path]:
+    """
+    All segments of the pack, oldest first.
+    """
+    return sorted(pack_dir(local_copy).glob("[0-9]" * 6 + ".seg"))
+
+
+def _segment_path(local_copy: Path, number: int) -> Path:
+    return pack_dir(local_copy) / f"{number:06d}.seg"
+
+
+def _finish_compaction(local_copy: Path):
+    """
+    Recovers from a `compact` that was interrupted (by a crash).
+    Must be called with the segments locked.
+    """
+    for index in pack_dir(local_copy).glob("compacting-*.idx"):
+        compacted = index.with_name(index.stem.removeprefix("compacting-") + ".idx")
+        if index.with_suffix(".seg").exists():
+            # Interrupted before the compacted segment took its place: start over
+            index.with_suffix(".seg").unlink()
+            index.unlink()
+        else:
+            # Interrupted between the segment and its index: the segment is already
+            # the compacted one, so its index must be too.
+            os.replace(index, compacted)
+            ondisk.fsync_directory(index.parent)
+
+
+def _encode(record: Record, flags: int = 0) -> bytes:
+    payload = record.path.encode("utf-8") + b"\0" + record.markdown.encode("utf-8")
+    if flags & COMPRESSED:
+        payload = zlib.compress(payload, 9)
+    return _RECORD_HEADER.pack(len(payload), flags) + payload
+
+
+def _decode(buffer: mmap.mmap, offset: int) -> Optional[Record]:
+    """
+    Returns `None` if the record was cut short (by a crash during an append)
+    """
+    if offset + _RECORD_HEADER.size > len(buffer):
+        return None
+    length, flags = _RECORD_HEADER.unpack_from(buffer, offset)
+    start = offset + _RECORD_HEADER.size
+    if start + length > len(buffer):
+        return None
+    payload = buffer[start : start + length]
+    if flags & COMPRESSED:
+        payload = zlib.decompress(payload)
+    path, _, markdown = payload.partition(b"\0")
+    return Record(path.decode("utf-8"), markdown.decode("utf-8"))
+
+
+def _append(segment: Path, encoded_records: list[bytes], durability: str = "full"):
+    """
+    Appends records to `segment` then their offsets to its index, so that the index never points
+    to records that are not completely written (see `ondisk.atomic_write` for `durability`).
+    """
+    created = not segment.exists()
+    with open(segment, "ab") as segment_file:
+        offset = segment_file.tell()
+        offsets = []
+        for encoded in encoded_records:
+            offsets.append(offset)
+            offset += len(encoded)
+        segment_file.write(b"".join(encoded_records))
+        if durability != "none":
+            segment_file.flush()
+            os.fsync(segment_file.fileno())
+
+    with open(segment.with_suffix(".idx"), "ab") as index_file:
+        # Drop an entry that was cut short by a crash, or the new ones would be misaligned
+        if partial := index_file.tell() % _INDEX_ENTRY.size:
+            index_file.truncate(index_file.tell() - partial)
+        index_file.write(b"".join(map(_INDEX_ENTRY.pack, offsets)))
+        if durability != "none":
+            index_file.flush()
+            os.fsync(index_file.fileno())
+
+    if created and durability == "full":
+        ondisk.fsync_directory(segment.parent)
+
+
+def append(local_copy: Path, filepath: Path, idea: ondisk.Idea) -> Path:
+    """
+    Appends `idea` to the pack of `local_copy`, as if it were written to `filepath`.
+    Returns the segment it was written to.
+    """
+    with locking.locked(pack_dir(local_copy) / "segments"):
+        _finish_compaction(local_copy)
+        existing = segments(local_copy)
+        segment = existing[-1] if existing else _segment_path(local_copy, 1)
+        if segment.exists() and segment.stat().st_size >= SEGMENT_MAX_SIZE:
+            segment = _segment_path(local_copy, int(segment.stem) + 1)
+
+        _append(
+            segment,
+            [
+                _encode(
+                    Record(
+                        filepath.relative_to(local_copy).as_posix(), idea.as_markdown
+                    )
+                )
+            ],
+        )
+        return segment
+
+
+def read_segment(segment: Path) -> Iterator[Record]:
+    with open(segment.with_suffix(".idx"), "rb") as index_file:
+        index = index_file.read()
+    # Ignore an entry that was cut short by a crash
+    index = index[: len(index) - len(index) % _INDEX_ENTRY.size]
+    offsets = [offset for (offset,) in _INDEX_ENTRY.iter_unpack(index)]
+    if not offsets:
+        return
+    with open(segment, "rb") as segment_file, mmap.mmap(
+        segment_file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as buffer:
+        for offset in offsets:
+            record = _decode(buffer, offset)
+            if record is None:
+                return
+            yield record
+
+
+def latest_records(local_copy: Path) -> dict[str, Record]:
+    """
+    The last record written for each path
+    """
+    with locking.locked(pack_dir(local_copy) / "segments"):
+        _finish_compaction(local_copy)
+        return {
+            record.path: record
+            for segment in segments(local_copy)
+            for record in read_segment(segment)
+        }
+
+
+def export(local_copy: Path, destination: Path) -> int:
+    """
+    Writes every idea of the pack to `destination`,
+    with the same layout as ``--local-copy-format=files``.
+    Returns the number of written files.
+    """
+    with locking.locked(pack_dir(local_copy) / "segments"):
+        records = latest_records(local_copy)
+    with ondisk.group_commit():
+        for record in records.values():
+            filepath = destination / record.path
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            ondisk.atomic_write(filepath, record.markdown)
+    return len(records)
+
+
+def compact(local_copy: Path) -> tuple[int, int]:
+    """
+    Merges all segments but the one currently written to into a single, compressed one,
+    that only has the latest record of each path.
+    Returns the number of merged segments, and the number of records kept.
+    """
+    # Segments must not change while they are being merged
+    with locking.locked(pack_dir(local_copy) / "segments"):
+        _finish_compaction(local_copy)
+        *sealed, _ = segments(local_copy) or [None]
+        if not sealed:
+            return 0, 0
+
+        latest: dict[str, Record] = {}
+        for segment in sealed:
+            for record in read_segment(segment):
+                latest[record.path] = record
+
+        # Takes the place of the most recent sealed segment, so that records
+        # from the current segment still come after the compacted ones.
+        compacted = sealed[-1]
+        temporary = compacted.with_name(f"compacting-{compacted.name}")
+        _append(temporary, [_encode(record, COMPRESSED) for record in latest.values()])
+
+        # The index goes last: readers only trust offsets it lists,
+        # and `_finish_compaction` completes the swap if we crash in between.
+        os.replace(temporary, compacted)
+        os.replace(temporary.with_suffix(".idx"), compacted.with_suffix(".idx"))
+        for segment in sealed[:-1]:
+            segment.unlink()
+            segment.with_suffix(".idx").unlink(missing_ok=True)
+        ondisk.fsync_directory(compacted.parent)
+
+    return len(sealed), len(latest)
@@ -1,16 +1,19 @@
+import gzip
 import json
 from pathlib import Path
 from subprocess import call
-from typing import Any, Callable, NamedTuple, Tuple
+from typing import (Any, Callable, Hashable, Iterable, Iterator, NamedTuple,
+                    Optional, Tuple)
 
 import requests
 from requests.models import Response
 from rich.prompt import InvalidResponse
 
-from ideaseed import ui
+from ideaseed import deadline, ui
 from ideaseed.authentication import Cache, T
+from ideaseed.constants import QUEYD_BATCH_SIZE, QUEYD_PAGE_SIZE, QUEYD_TIMEOUT
 from ideaseed.ondisk import Idea
-from ideaseed.utils import ask
+from ideaseed.utils import ask, chunked
 
 """
 curl 'http://localhost:8000/' -H 'Accept-Encoding: gzip, deflate, br' -H 'Content-Type: application/json' -H 'Accept: application/json' -H 'Connection: keep-alive' -H 'DNT: 1' -H 'Origin: http://localhost:8000' --data-binary '{"query":"query {\n  notes {\n    id, title\n  }\n}"}' --compressed
@@ -31,37 +34,109 @@ def _gql_call(name: str, **arguments) -> str:
     return f"{name}({', '.join(f'{key}: {json.dumps(value)}' for key, value in arguments.items())})"
 
 
+def _add_call(idea: Idea) -> str:
+    return _gql_call(
+        "add",
+        title=idea.title,
+        project=idea.project,
+        body=idea.body,
+        tags=idea.labels,
+    )
+
+
+class QueydError(Exception):
+    """Queyd answered with GraphQL errors"""
+
+
+def _post(session: requests.Session, endpoint: str, document: str) -> Response:
+    """
+    Sends a GraphQL `document` to `endpoint`, with a gzip-compressed request body.
+    """
+    with deadline.cut_short():
+        return session.post(
+            endpoint,
+            data=gzip.compress(json.dumps({"query": document}).encode("utf-8")),
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+            timeout=deadline.timeout(QUEYD_TIMEOUT),
+        )
+
+
 class QueydClient(NamedTuple):
     query: Callable[[dict[str, Any]], Response]
     mutation: Callable[[dict[str, Any]], Response]
 
     @classmethod
     def authenticated(cls, auth_token: str, endpoint: str) -> "QueydClient":
+        # One session per client, so that every call reuses the same connection
+        session = requests.Session()
+        session.headers.update(
+            {
+                "Accept": "application/json",
+                "Authentication": f"Bearer {auth_token}",
+            }
+        )
         return cls(
-            query=lambda query: requests.post(
-                endpoint,
-                json={"query": _to_gql({"query": query})},
-                headers={"Authentication": f"Bearer {auth_token}"},
-            ),
-            mutation=lambda mutation: requests.post(
-                endpoint,
-                json={"query": _to_gql({"mutation": mutation})},
-                headers={"Authentication": f"Bearer {auth_token}"},
+            query=lambda query: _post(session, endpoint, _to_gql({"query": query})),
+            mutation=lambda mutation: _post(
+                session, endpoint, _to_gql({"mutation": mutation})
             ),
         )
 
     def add(self, idea: Idea) -> Response:
-        return self.mutation(
-            {
-                _gql_call(
-                    "add",
-                    title=idea.title,
-                    project=idea.project,
-                    body=idea.body,
-                    tags=idea.labels,
-                ): ["id"]
-            }
-        )
+        return self.mutation({_add_call(idea): ["id"]})
+
+    def add_many(
+        self, ideas: Iterable[Idea], batch_size: int = QUEYD_BATCH_SIZE
+    ) -> list[Response]:
+        """
+        Adds all `ideas`, packing up to `batch_size` of them in a single request
+        by using aliased `add` mutations (`idea0: add(...)`, `idea1: add(...)`, ...).
+        The IDs are available at `response.json()["data"][f"idea{i}"]["id"]`,
+        where `i` is the index of the idea inside its batch.
+        """
+        return [
+            self.mutation(
+                {f"idea{i}: {_add_call(idea)}": ["id"] for i, idea in enumerate(batch)}
+            )
+            for batch in chunked(ideas, batch_size)
+        ]
+
+    def notes(
+        self, updated_since: Optional[str] = None, page_size: int = QUEYD_PAGE_SIZE
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Iterates over all notes updated since `updated_since` (an ISO 8601 timestamp,
+        all notes are returned if not set), fetching them `page_size` at a time.
+        The ID of the last note of a page is used as the cursor for the next one.
+        """
+        cursor = None
+        while True:
+            arguments = {"first": page_size}
+            if updated_since:
+                arguments["updatedSince"] = updated_since
+            if cursor:
+                arguments["after"] = cursor
+
+            response = self.query(
+                {
+                    _gql_call("notes", **arguments): [
+                        "id",
+                        "title",
+                        "project",
+                        "body",
+                        "tags",
+                        "updatedAt",
+                    ]
+                }
+            ).json()
+            if response.get("errors"):
+                raise QueydError(response["errors"])
+
+            page = response["data"]["notes"]
+            yield from page
+            if len(page) < page_size:
+                return
+            cursor = page[-1]["id"]
 
 
 def is_correct_password(password: str, endpoint: str) -> bool:
@@ -84,6 +159,10 @@ class AuthCache(Cache):
         self.graphql_endpoint = graphql_endpoint
         super().__init__(path, "queyd")
 
+    @property
+    def client_key(self) -> Hashable:
+        return (self.service, self.graphql_endpoint)
+
     def login_from_cache(self) -> QueydClient:
         return QueydClient.authenticated(
             self.cache["token"], endpoint=self.graphql_endpoint
@@ -0,0 +1,325 @@
+"""
+Keeps requests to GitHub and Google Keep within their rate limits.
+
+Requests are sent through a `RateLimitedAdapter`, a transport adapter mounted on the HTTP sessions
+of PyGithub and gkeepapi (see `install_on_github` and `install_on_keep`). Requests made to the same host
+with the same account share a `Budget`:
+
+- they are paced by a token bucket, so that bursts (bulk operations, ``ideaseed warm``...)
+  stay under secondary rate limits;
+- the rate limit headers of every response (X-RateLimit-Remaining, X-RateLimit-Reset...) are recorded,
+  and requests wait for the reset when nothing is left;
+- rate-limited responses (429, or 403 with Retry-After or with nothing remaining) to requests
+  that can safely be sent again are retried after the delay the server asks for.
+
+Requests that would have to wait more than `MAX_RATE_LIMIT_WAIT` seconds are sent right away,
+and fail the way they always did: bulk operations stop cleanly on such errors (see `sync.pull_issues`).
+Budgets last as long as the process, and ``--profile`` shows them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from email.utils import parsedate_to_datetime
+from time import monotonic, sleep, time
+from typing import Iterable, Mapping, NamedTuple, Optional
+from urllib.parse import urlparse
+
+from github import Github
+from github.Requester import (HTTPRequestsConnectionClass,
+                              HTTPSRequestsConnectionClass)
+from gkeepapi import Keep
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+
+from ideaseed import deadline, github_cards
+from ideaseed.constants import (DEFAULT_REQUEST_RATE, DEFAULT_RETRY_AFTER,
+                                MAX_RATE_LIMIT_WAIT, MUTATION_COST,
+                                NETWORK_TIMEOUT, RATE_LIMIT_RETRIES,
+                                REQUEST_RATES)
+
+# Requests that have the same effect when sent twice
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+_READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class TokenBucket:
+    """
+    Allows `rate` points per second, up to `capacity` points at once
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.points = capacity
+        self.updated: Optional[float] = None
+
+    def take(self, cost: float, now: float) -> float:
+        """
+        Takes `cost` points, returning how many seconds to wait until they are actually there
+
+        >>> bucket = TokenBucket(rate=2, capacity=4)
+        >>> [bucket.take(1, now=0) for _ in range(5)]
+        [0, 0, 0, 0, 0.5]
+        >>> bucket.take(1, now=0.5)
+        0.5
+        >>> bucket.take(1, now=10)
+        0
+        """
+        if self.updated is not None:
+            self.points = min(
+                self.capacity, self.points + (now - self.updated) * self.rate
+            )
+        self.updated = now
+        self.points -= cost
+        return max(0, -self.points / self.rate)
+
+
+class Limit(NamedTuple):
+    remaining: int
+    limit: int
+    # Unix timestamp
+    reset: float
+
+
+class Budget:
+    """
+    What an account can still send to a host
+    """
+
+    def __init__(self, host: str, account: str):
+        self.host = host
+        self.account = account
+        self.bucket = TokenBucket(*REQUEST_RATES.get(host, DEFAULT_REQUEST_RATE))
+        self.lock = threading.Lock()
+        # By resource (GitHub has separate limits for "core", "search", "graphql"...)
+        self.limits: dict[str, Limit] = {}
+        # Unix timestamp before which the host asked not to send anything (with Retry-After)
+        self.blocked_until = 0.0
+        self.requests = 0
+        self.retries = 0
+        self.waited = 0.0
+
+    def delay(self, method: str, resource: str) -> float:
+        """
+        Counts a request, returning how many seconds to wait before sending it
+        """
+        now = time()
+        with self.lock:
+            self.requests += 1
+            delay = self.bucket.take(
+                1 if method in _READ_METHODS else MUTATION_COST, monotonic()
+            )
+            limit = self.limits.get(resource)
+            if limit and limit.remaining <= 0:
+                delay = max(delay, limit.reset - now)
+            return max(delay, self.blocked_until - now)
+
+    def wait(self, delay: float):
+        left = deadline.remaining()
+        if left is not None and 0 < delay >= left:
+            raise deadline.DeadlineExceeded(
+                f"The deadline would pass while waiting for {self.host}'s rate limit"
+            )
+        if 0 < delay <= MAX_RATE_LIMIT_WAIT:
+            sleep(delay)
+            with self.lock:
+                self.waited += delay
+
+    def record(self, headers: Mapping[str, str], retry_after: Optional[float]):
+        """
+        Takes note of the rate limit headers of a response
+        """
+        with self.lock:
+            if "x-ratelimit-remaining" in headers:
+                name = headers.get("x-ratelimit-resource", "core")
+                previous = self.limits.get(name, Limit(0, 0, 0))
+                self.limits[name] = Limit(
+                    remaining=int(headers["x-ratelimit-remaining"]),
+                    limit=int(headers.get("x-ratelimit-limit", previous.limit)),
+                    reset=float(headers.get("x-ratelimit-reset", previous.reset)),
+                )
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, time() + retry_after)
+
+    def retried(self):
+        with self.lock:
+            self.retries += 1
+
+
+_budgets: dict[tuple[str, str], Budget] = {}
+_budgets_lock = threading.Lock()
+
+
+def budget(host: str, account: str) -> Budget:
+    with _budgets_lock:
+        return _budgets.setdefault((host, account), Budget(host, account))
+
+
+def budgets() -> list[Budget]:
+    with _budgets_lock:
+        return list(_budgets.values())
+
+
+def reset_counters():
+    """
+    Forgets how many requests were sent (budgets themselves are kept)
+    """
+    for each in budgets():
+        with each.lock:
+            each.requests, each.retries, each.waited = 0, 0, 0.0
+
+
+def retry_delay(status: int, headers: Mapping[str, str], now: float) -> Optional[float]:
+    """
+    How many seconds the server asks to wait before sending a rate-limited request again,
+    `None` if the response was not rate-limited.
+
+    >>> retry_delay(429, {"retry-after": "30"}, now=0)
+    30.0
+    >>> retry_delay(403, {"x-ratelimit-remaining": "0", "x-ratelimit-reset": "100"}, now=40)
+    61.0
+    >>> retry_delay(403, {"x-ratelimit-remaining": "12"}, now=0) is None
+    True
+    >>> retry_delay(200, {"retry-after": "30"}, now=0) is None
+    True
+    """
+    if status not in (403, 429):
+        return None
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            # Retry-After can also be an HTTP date
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - now)
+    if headers.get("x-ratelimit-remaining") == "0" and headers.get("x-ratelimit-reset"):
+        # Resets are given to the second
+        return max(0.0, float(headers["x-ratelimit-reset"]) - now) + 1
+    if status == 429:
+        return float(DEFAULT_RETRY_AFTER)
+    return None
+
+
+def resource(path: str) -> str:
+    """
+    The GitHub rate limit requests to `path` count against
+
+    >>> resource("/search/issues"), resource("/graphql"), resource("/repos/ewen-lbh/ideaseed")
+    ('search', 'graphql', 'core')
+    """
+    if path.startswith("/search/"):
+        return "search"
+    if path == "/graphql":
+        return "graphql"
+    return "core"
+
+
+def _anonymized(authorization: str) -> str:
+    """
+    Tells tokens apart without showing them
+    """
+    if not authorization:
+        return "anonymous"
+    return "token " + hashlib.sha256(authorization.encode("utf-8")).hexdigest()[:8]
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """
+    Sends requests within the `Budget` of their host and `account`
+    (by default, the Authorization header they are sent with).
+    Rate-limited requests made with one of `retry_methods` are sent again.
+    """
+
+    def __init__(
+        self,
+        account: Optional[str] = None,
+        retry_methods: Iterable[str] = IDEMPOTENT_METHODS,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.account = account
+        self.retry_methods = frozenset(retry_methods)
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        url = urlparse(request.url)
+        account_budget = budget(
+            url.hostname or "",
+            self.account or _anonymized(request.headers.get("Authorization", "")),
+        )
+        requested_timeout = kwargs.get("timeout")
+        if not isinstance(requested_timeout, (int, float)):
+            requested_timeout = NETWORK_TIMEOUT
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            account_budget.wait(
+                account_budget.delay(request.method, resource(url.path))
+            )
+            kwargs["timeout"] = deadline.timeout(requested_timeout)
+            with deadline.cut_short():
+                response = super().send(request, **kwargs)
+            delay = retry_delay(response.status_code, response.headers, time())
+            account_budget.record(response.headers, delay)
+            if (
+                delay is None
+                or delay > MAX_RATE_LIMIT_WAIT
+                or request.method not in self.retry_methods
+                or attempt == RATE_LIMIT_RETRIES
+            ):
+                return response
+            response.close()
+            account_budget.retried()
+        return response
+
+
+def _mount(connection: HTTPRequestsConnectionClass | HTTPSRequestsConnectionClass):
+    connection.adapter = RateLimitedAdapter(
+        max_retries=connection.retry,
+        pool_connections=connection.pool_size,
+        pool_maxsize=connection.pool_size,
+    )
+    connection.session.mount(f"{connection.protocol}://", connection.adapter)
+
+
+class _HTTPConnection(HTTPRequestsConnectionClass):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _mount(self)
+
+
+class _HTTPSConnection(HTTPSRequestsConnectionClass):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _mount(self)
+
+
+def install_on_github(gh: Github) -> Github:
+    """
+    Makes `gh` send its requests through a `RateLimitedAdapter`.
+    PyGithub can only replace connection classes for every client at once
+    (and then stops reusing connections), so the client's own requester is changed instead.
+    """
+    requester = github_cards.requester(gh)
+    scheme = requester._Requester__scheme
+    requester._Requester__connectionClass = (
+        _HTTPSConnection if scheme == "https" else _HTTPConnection
+    )
+    requester._Requester__connection = None
+    return gh
+
+
+def install_on_keep(keep: Keep, account: str) -> Keep:
+    """
+    Makes `keep` send its requests through a `RateLimitedAdapter`.
+    Requests to Google Keep's API are all POSTs, but syncing twice is harmless:
+    notes are sent with IDs chosen by the client, so they are retried too.
+    """
+    for api in (keep._keep_api, keep._reminders_api, keep._media_api):
+        api._session.mount(
+            "https://",
+            RateLimitedAdapter(
+                account=account, retry_methods=IDEMPOTENT_METHODS | {"POST"}
+            ),
+        )
+    return keep
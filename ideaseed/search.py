@@ -0,0 +1,271 @@
+"""
+Full-text index of the local copy directory, to find past ideas (``ideaseed search``)
+
+The index is an SQLite database in the local copy's state directory.
+It is updated every time a local copy is written, and can be brought up to date
+with files edited by hand (or by anything else) with ``ideaseed reindex``.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional
+
+import yaml
+
+from ideaseed import ondisk, similarity
+from ideaseed.constants import LOCK_TIMEOUT
+
+INDEX_FILE = "index.sqlite3"
+# Stored as the database's user_version once the schemas below (and `similarity.SCHEMA`) were created in it.
+# Increase it when they change, so that existing indexes get the new tables.
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ideas (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    repo TEXT NOT NULL,
+    title TEXT NOT NULL,
+    body TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    project TEXT NOT NULL,
+    project_column TEXT NOT NULL,
+    milestone TEXT NOT NULL,
+    assignees TEXT NOT NULL,
+    color TEXT NOT NULL,
+    pinned INTEGER NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS ideas_text USING fts5(
+    title, body, content='ideas', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS ideas_inserted AFTER INSERT ON ideas BEGIN
+    INSERT INTO ideas_text(rowid, title, body) VALUES (new.rowid, new.title, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS ideas_deleted AFTER DELETE ON ideas BEGIN
+    INSERT INTO ideas_text(ideas_text, rowid, title, body) VALUES ('delete', old.rowid, old.title, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS ideas_updated AFTER UPDATE ON ideas BEGIN
+    INSERT INTO ideas_text(ideas_text, rowid, title, body) VALUES ('delete', old.rowid, old.title, old.body);
+    INSERT INTO ideas_text(rowid, title, body) VALUES (new.rowid, new.title, new.body);
+END;
+"""
+
+
+class SearchResult(NamedTuple):
+    path: Path
+    title: str
+    body: str
+    url: str
+
+
+def connect(local_copy: Path) -> sqlite3.Connection:
+    # SQLite does its own locking, we only need to wait as long as for other state files.
+    # Transactions take the write lock right away, so that waiting for it never ends in a deadlock.
+    connection = sqlite3.connect(
+        ondisk.state_dir(local_copy) / INDEX_FILE,
+        timeout=LOCK_TIMEOUT,
+        isolation_level="IMMEDIATE",
+    )
+    (version,) = connection.execute("PRAGMA user_version").fetchone()
+    if version < SCHEMA_VERSION:
+        connection.executescript(SCHEMA)
+        connection.executescript(similarity.SCHEMA)
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return connection
+
+
+def _upsert(
+    connection: sqlite3.Connection,
+    local_copy: Path,
+    filepath: Path,
+    mtime: float,
+    idea: ondisk.Idea,
+):
+    relative_path = filepath.relative_to(local_copy).as_posix()
+    connection.execute(
+        """
+        INSERT INTO ideas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET
+            mtime = excluded.mtime, repo = excluded.repo,
+            title = excluded.title, body = excluded.body,
+            labels = excluded.labels, project = excluded.project,
+            project_column = excluded.project_column, milestone = excluded.milestone,
+            assignees = excluded.assignees, color = excluded.color,
+            pinned = excluded.pinned, url = excluded.url
+        """,
+        (
+            relative_path,
+            mtime,
+            idea.repo or "",
+            idea.title or "",
+            idea.body or "",
+            json.dumps([str(label) for label in idea.labels]),
+            idea.project or "",
+            idea.column or "",
+            idea.milestone or "",
+            json.dumps(list(idea.assignees)),
+            idea.color or "",
+            bool(idea.pinned),
+            idea.url or "",
+        ),
+    )
+    similarity.store(connection, relative_path, idea)
+
+
+def update(local_copy: Path, filepath: Path, idea: ondisk.Idea):
+    """
+    Indexes `idea`, that was just written to `filepath`.
+    """
+    update_many(local_copy, [(filepath, idea)])
+
+
+def update_many(local_copy: Path, written: Iterable[tuple[Path, ondisk.Idea]]):
+    """
+    Indexes ideas that were just written, in a single transaction.
+    """
+    with closing(connect(local_copy)) as connection, connection:
+        for filepath, idea in written:
+            _upsert(connection, local_copy, filepath, filepath.stat().st_mtime, idea)
+
+
+def remove(local_copy: Path, filepath: Path):
+    relative_path = filepath.relative_to(local_copy).as_posix()
+    with closing(connect(local_copy)) as connection, connection:
+        connection.execute("DELETE FROM ideas WHERE path = ?", (relative_path,))
+        connection.execute("DELETE FROM signatures WHERE path = ?", (relative_path,))
+
+
+def reindex(local_copy: Path) -> tuple[int, int]:
+    """
+    Brings the index up to date with the files in `local_copy`.
+    Only files whose modification time changed since they were last indexed are read.
+
+    Returns the number of (re)indexed files and the number of removed ones.
+    """
+    with closing(connect(local_copy)) as connection, connection:
+        # Ideas indexed before similarity detection existed have no signature yet
+        indexed = dict(
+            connection.execute(
+                "SELECT path, mtime FROM ideas WHERE path IN (SELECT path FROM signatures)"
+            )
+        )
+        connection.execute(
+            "DELETE FROM ideas WHERE path NOT IN (SELECT path FROM signatures)"
+        )
+        reindexed = 0
+        for entry in ondisk.iter_local_copies(local_copy):
+            filepath = Path(entry.path)
+            relative_path = filepath.relative_to(local_copy).as_posix()
+            mtime = entry.stat().st_mtime
+            if indexed.pop(relative_path, None) == mtime:
+                continue
+            try:
+                idea = ondisk.load(local_copy, filepath)
+            except (ValueError, yaml.YAMLError):
+                # Not written by ideaseed (no or broken YAML header)
+                continue
+            _upsert(connection, local_copy, filepath, mtime, idea)
+            reindexed += 1
+
+        # Whatever was not seen anymore was deleted
+        connection.executemany(
+            "DELETE FROM ideas WHERE path = ?", ((path,) for path in indexed)
+        )
+        connection.executemany(
+            "DELETE FROM signatures WHERE path = ?", ((path,) for path in indexed)
+        )
+
+    return reindexed, len(indexed)
+
+
+def similar(
+    local_copy: Path, idea: ondisk.Idea, limit: int = 5, exclude: Optional[Path] = None
+) -> list[similarity.SimilarIdea]:
+    """
+    Indexed ideas that are worded almost like `idea`, most similar first.
+    """
+    with closing(connect(local_copy)) as connection:
+        return similarity.similar(connection, local_copy, idea, limit, exclude=exclude)
+
+
+def similar_clusters(local_copy: Path) -> list[list[Path]]:
+    """
+    Groups of indexed ideas that are worded almost the same, biggest groups first.
+    """
+    with closing(connect(local_copy)) as connection:
+        return similarity.clusters(connection, local_copy)
+
+
+def to_match_expression(query: str) -> str:
+    """
+    Turns free text into an FTS5 query that matches ideas containing every word of `query`,
+    so that FTS5's own syntax characters don't need to be escaped by the user.
+
+    >>> to_match_expression("local copy OR fts")
+    '"local" "copy" "OR" "fts"'
+    """
+    return " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+
+
+def search(
+    local_copy: Path,
+    query: str,
+    labels: Iterable[str] = (),
+    project: Optional[str] = None,
+    column: Optional[str] = None,
+    milestone: Optional[str] = None,
+    assignees: Iterable[str] = (),
+    color: Optional[str] = None,
+    pinned: Optional[bool] = None,
+    limit: int = 50,
+) -> list[SearchResult]:
+    """
+    Finds the ideas matching `query` (in their title or body) and all of the given header values,
+    best matches first. String values are compared case-insensitively.
+    Without any word in `query`, ideas are only filtered by header values, most recently written first.
+    """
+    conditions = []
+    parameters: list = []
+    if expression := to_match_expression(query):
+        conditions.append("ideas_text MATCH ?")
+        parameters.append(expression)
+    for name, value in (
+        ("project", project),
+        ("project_column", column),
+        ("milestone", milestone),
+        ("color", color),
+    ):
+        if value:
+            conditions.append(f"{name} = ? COLLATE NOCASE")
+            parameters.append(value)
+    for name, values in (("labels", labels), ("assignees", assignees)):
+        for value in values:
+            conditions.append(
+                f"EXISTS (SELECT 1 FROM json_each(ideas.{name}) WHERE value = ? COLLATE NOCASE)"
+            )
+            parameters.append(value)
+    if pinned is not None:
+        conditions.append("pinned = ?")
+        parameters.append(pinned)
+
+    with closing(connect(local_copy)) as connection:
+        rows = connection.execute(
+            f"""
+            SELECT ideas.path, ideas.title, ideas.body, ideas.url
+            FROM {"ideas_text JOIN ideas ON ideas.rowid = ideas_text.rowid" if expression else "ideas"}
+            WHERE {" AND ".join(conditions) or "TRUE"}
+            ORDER BY {"rank" if expression else "ideas.mtime DESC"}
+            LIMIT ?
+            """,
+            (*parameters, limit),
+        ).fetchall()
+
+    return [
+        SearchResult(local_copy / path, title, body, url)
+        for path, title, body, url in rows
+    ]
@@ -0,0 +1,276 @@
+"""
+Finds past ideas that are worded almost like a new one, using MinHash signatures
+and locality-sensitive hashing (LSH).
+
+Every idea in the search index (see `ideaseed.search`) gets a signature of `PERMUTATIONS` numbers,
+from the 5-character shingles of its title and body (ideas without any word get none).
+The share of numbers that two signatures have in common estimates how similar the two texts are
+(their Jaccard similarity).
+Signatures are cut in `BANDS` bands: ideas that have at least one identical band are candidates,
+so looking for similar ideas only compares a handful of signatures instead of all of them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+import re
+import sqlite3
+import struct
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional
+
+from ideaseed import ondisk
+
+SHINGLE_SIZE = 5
+BANDS = 16
+ROWS = 4
+PERMUTATIONS = BANDS * ROWS
+# Ideas that are at least this similar are shown before pushing and grouped by `archive similar`
+THRESHOLD = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    path TEXT PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets(band, bucket);
+CREATE INDEX IF NOT EXISTS buckets_path ON buckets(path);
+CREATE TRIGGER IF NOT EXISTS signatures_deleted AFTER DELETE ON signatures BEGIN
+    DELETE FROM buckets WHERE path = old.path;
+END;
+"""
+
+# Each shingle is hashed once into PERMUTATIONS 32-bit values, one per hash function
+_SIGNATURE = struct.Struct(f"<{PERMUTATIONS}I")
+_BAND = struct.Struct(f"<{ROWS}I")
+
+
+class SimilarIdea(NamedTuple):
+    path: Path
+    title: str
+    body: str
+    url: str
+    similarity: float
+
+
+def shingles(text: str) -> set[str]:
+    """
+    Overlapping chunks of `SHINGLE_SIZE` characters of `text`, ignoring case, punctuation and whitespace
+
+    >>> sorted(shingles("Hello,   World"))
+    [' worl', 'ello ', 'hello', 'llo w', 'lo wo', 'o wor', 'world']
+    >>> shingles("Hi")
+    {'hi'}
+    """
+    normalized = " ".join(re.findall(r"\w+", text.lower()))
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized} if normalized else set()
+    return {
+        normalized[i : i + SHINGLE_SIZE]
+        for i in range(len(normalized) - SHINGLE_SIZE + 1)
+    }
+
+
+def signature(idea: ondisk.Idea) -> Optional[tuple[int, ...]]:
+    """
+    MinHash signature of the idea's title and body.
+    Ideas without any word have none: they are not similar to anything.
+    """
+    hashes = [
+        _SIGNATURE.unpack(hashlib.shake_128(shingle.encode()).digest(_SIGNATURE.size))
+        for shingle in shingles(f"{idea.title or ''}\n{idea.body or ''}")
+    ]
+    if not hashes:
+        return None
+    return tuple(map(min, zip(*hashes)))
+
+
+def estimate(a: tuple[int, ...], b: tuple[int, ...]) -> float:
+    """
+    Estimated Jaccard similarity of the texts that `a` and `b` are signatures of.
+
+    >>> estimate((1, 2, 3, 4), (1, 2, 0, 4))
+    0.75
+    """
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def buckets(signature: tuple[int, ...]) -> list[tuple[int, int]]:
+    """
+    The (band, bucket) pairs of `signature`. Buckets fit in SQLite's signed 64-bit integers.
+    """
+    return [
+        (
+            band,
+            int.from_bytes(
+                hashlib.blake2b(
+                    _BAND.pack(*signature[band * ROWS : (band + 1) * ROWS]),
+                    digest_size=8,
+                ).digest(),
+                "little",
+                signed=True,
+            ),
+        )
+        for band in range(BANDS)
+    ]
+
+
+def store(connection: sqlite3.Connection, relative_path: str, idea: ondisk.Idea):
+    """
+    Adds or replaces the signature of the idea at `relative_path` in the index.
+    """
+    idea_signature = signature(idea)
+    connection.execute("DELETE FROM signatures WHERE path = ?", (relative_path,))
+    if idea_signature is None:
+        return
+    connection.execute(
+        "INSERT INTO signatures VALUES (?, ?)",
+        (relative_path, _SIGNATURE.pack(*idea_signature)),
+    )
+    connection.executemany(
+        "INSERT INTO buckets VALUES (?, ?, ?)",
+        ((band, bucket, relative_path) for band, bucket in buckets(idea_signature)),
+    )
+
+
+def similar(
+    connection: sqlite3.Connection,
+    local_copy: Path,
+    idea: ondisk.Idea,
+    limit: int = 5,
+    threshold: float = THRESHOLD,
+    exclude: Optional[Path] = None,
+) -> list[SimilarIdea]:
+    """
+    Indexed ideas that are at least `threshold` similar to `idea`, most similar first.
+    `exclude` is left out of the results (e.g. the local copy of `idea` itself).
+    """
+    idea_signature = signature(idea)
+    if idea_signature is None:
+        return []
+    pairs = buckets(idea_signature)
+    rows = connection.execute(
+        f"""
+        SELECT ideas.path, ideas.title, ideas.body, ideas.url, signatures.signature
+        FROM signatures JOIN ideas ON ideas.path = signatures.path
+        WHERE signatures.path IN (
+            SELECT path FROM buckets
+            WHERE {" OR ".join(["(band = ? AND bucket = ?)"] * len(pairs))}
+        )
+        """,
+        [value for pair in pairs for value in pair],
+    ).fetchall()
+
+    excluded = exclude.relative_to(local_copy).as_posix() if exclude else None
+    results = []
+    for path, title, body, url, candidate in rows:
+        if path == excluded:
+            continue
+        similarity = estimate(idea_signature, _SIGNATURE.unpack(candidate))
+        if similarity >= threshold:
+            results.append(SimilarIdea(local_copy / path, title, body, url, similarity))
+    results.sort(key=lambda result: result.similarity, reverse=True)
+    return results[:limit]
+
+
+def clusters(
+    connection: sqlite3.Connection, local_copy: Path, threshold: float = THRESHOLD
+) -> list[list[Path]]:
+    """
+    Groups of indexed ideas that are at least `threshold` similar to another idea of the group,
+    biggest groups first.
+    Only ideas that share a bucket are compared, so this reads the index once
+    instead of comparing every pair of ideas.
+    """
+    signatures = {
+        path: _SIGNATURE.unpack(blob)
+        for path, blob in connection.execute("SELECT path, signature FROM signatures")
+    }
+    parents = {path: path for path in signatures}
+
+    def root(path: str) -> str:
+        while parents[path] != path:
+            parents[path] = parents[parents[path]]
+            path = parents[path]
+        return path
+
+    for paths in _shared_buckets(connection):
+        first, *others = paths
+        for other in others:
+            if root(first) != root(other) and (
+                estimate(signatures[first], signatures[other]) >= threshold
+            ):
+                parents[root(other)] = root(first)
+
+    groups: dict[str, list[Path]] = {}
+    for path in signatures:
+        groups.setdefault(root(path), []).append(local_copy / path)
+    return sorted(
+        (sorted(group) for group in groups.values() if len(group) > 1),
+        key=len,
+        reverse=True,
+    )
+
+
+def _shared_buckets(connection: sqlite3.Connection) -> Iterable[list[str]]:
+    """
+    Paths of the ideas in each bucket that has more than one idea.
+    """
+    rows = connection.execute("""
+        SELECT group_concat(path, char(0)) FROM buckets
+        GROUP BY band, bucket HAVING count(*) > 1
+        """)
+    for (paths,) in rows:
+        yield paths.split("\0")
+
+
+def _benchmark(count: int = 100_000, lookups: int = 1_000):
+    """
+    Indexes `count` generated ideas, then times looking up similar ideas.
+    Run with ``python -m ideaseed.similarity``.
+    """
+    import string
+    import tempfile
+    from time import perf_counter
+
+    from ideaseed import search
+
+    generator = random.Random(0)
+    words = [
+        "".join(generator.choices(string.ascii_lowercase, k=generator.randint(3, 9)))
+        for _ in range(5_000)
+    ]
+    ideas = [
+        ondisk.Idea(
+            title=" ".join(generator.choices(words, k=4)),
+            body=" ".join(generator.choices(words, k=20)),
+        )
+        for _ in range(count)
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        local_copy = Path(directory)
+        connection = search.connect(local_copy)
+        start = perf_counter()
+        with connection:
+            for i, idea in enumerate(ideas):
+                search._upsert(connection, local_copy, local_copy / f"{i}.md", 0, idea)
+        print(f"Indexed {count} ideas in {perf_counter() - start:.1f}s")
+
+        start = perf_counter()
+        for idea in generator.sample(ideas, lookups):
+            similar(connection, local_copy, idea)
+        print(
+            f"Looked up similar ideas in {(perf_counter() - start) / lookups * 1000:.2f}ms on average"
+        )
+        connection.close()
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,353 @@
+"""
+Brings ideas created elsewhere into the local copy directory (``ideaseed sync`` and ``ideaseed pull``)
+
+Only notes and issues updated since the last sync are fetched, and an idea is only (re)written
+when its content changed since it was last written.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, NamedTuple, Optional
+
+import yaml
+from github import Github
+from github.GithubException import RateLimitExceededException
+
+from ideaseed import github_cards, locking, ondisk, search
+from ideaseed.ondisk import Idea
+from ideaseed.queyd import QueydClient
+
+QUEYD_STATE_FILE = "queyd-sync.json"
+GITHUB_STATE_FILE = "github-pull.json"
+_GITHUB_DEFAULT_STATE = {
+    "repos": {},
+    "user": {"etag": None, "projects": {}, "cards": {}},
+}
+
+
+class SyncReport(NamedTuple):
+    created: list[Path]
+    updated: list[Path]
+    # Notes that would have overwritten a file not written by a previous sync
+    conflicts: list[Path]
+    # Why the sync stopped before the end, if it did (what was synced until then is kept)
+    interrupted: Optional[str] = None
+
+
+def content_hash(idea: Idea) -> str:
+    return hashlib.sha256(idea.as_markdown.encode("utf-8")).hexdigest()
+
+
+def note_to_idea(note: dict[str, Any]) -> Idea:
+    return Idea(
+        title=note.get("title") or "",
+        body=note.get("body") or "",
+        project=note.get("project") or "",
+        labels=list(note.get("tags") or []),
+        repo=note.get("project") or "",
+    )
+
+
+def _write(
+    local_copy: Path,
+    idea: Idea,
+    known: Optional[dict[str, str]],
+    report: SyncReport,
+    same_idea: Callable[[Idea], bool] = lambda _: False,
+) -> Optional[str]:
+    """
+    Writes `idea` to its usual place in `local_copy`, removing the file it was previously written to
+    (`known["path"]`) if its slug changed.
+    An existing file that was not written by a previous sync is left alone (and reported as a conflict),
+    unless `same_idea` says that it holds the same idea.
+    Returns the path the idea was written to, relative to `local_copy`.
+    """
+    filepath = ondisk.get_path(
+        root_dir=local_copy,
+        repo_full=idea.repo,
+        title=idea.title,
+        body=idea.body,
+    )
+    relative_path = filepath.relative_to(local_copy).as_posix()
+    if filepath.exists() and not (known and known["path"] == relative_path):
+        try:
+            adopted = same_idea(ondisk.load(local_copy, filepath))
+        except (ValueError, yaml.YAMLError):
+            adopted = False
+        if not adopted:
+            # Don't clobber local copies made by ideaseed itself, or by another note
+            report.conflicts.append(filepath)
+            return None
+
+    ondisk.write(local_copy, filepath, idea)
+    if known and known["path"] != relative_path:
+        # The idea's title changed, so did its slug
+        (local_copy / known["path"]).unlink(missing_ok=True)
+        search.remove(local_copy, local_copy / known["path"])
+    (report.updated if known else report.created).append(filepath)
+    return relative_path
+
+
+def _same_content(idea: Idea) -> Callable[[Idea], bool]:
+    """
+    Tells whether an existing local copy has the same content as `idea` (see `ondisk.fingerprint`)
+    """
+    fingerprint = ondisk.fingerprint(idea, idea.repo)
+    return lambda existing: ondisk.fingerprint(existing, existing.repo) == fingerprint
+
+
+def sync_queyd(client: QueydClient, local_copy: Path) -> SyncReport:
+    """
+    Writes notes from Queyd that are new or changed since the last sync into `local_copy`,
+    using the same layout and format as `ondisk.save`.
+    Notes are written to DIR/PROJECT/slug.md.
+    """
+    with _state(
+        local_copy, QUEYD_STATE_FILE, {"watermark": None, "notes": {}}
+    ) as state:
+        report = SyncReport(created=[], updated=[], conflicts=[])
+        watermark = state["watermark"]
+        # Notes that could not be written are fetched again by the next sync
+        oldest_conflict = None
+
+        with ondisk.group_commit():
+            for note in client.notes(updated_since=state["watermark"]):
+                if watermark is None or note["updatedAt"] > watermark:
+                    watermark = note["updatedAt"]
+
+                idea = note_to_idea(note)
+                if not idea.body and not idea.title:
+                    continue
+                digest = content_hash(idea)
+                known = state["notes"].get(note["id"])
+                if known and known["hash"] == digest:
+                    continue
+
+                # A file with the same content (e.g. the local copy made when the idea was sent
+                # to Queyd) is taken over instead of being reported as a conflict
+                if written := _write(
+                    local_copy, idea, known, report, same_idea=_same_content(idea)
+                ):
+                    state["notes"][note["id"]] = {"path": written, "hash": digest}
+                elif oldest_conflict is None or note["updatedAt"] < oldest_conflict:
+                    oldest_conflict = note["updatedAt"]
+
+        state["watermark"] = oldest_conflict or watermark
+
+    return report
+
+
+def issue_to_idea(issue: dict[str, Any], repo_full_name: str) -> Idea:
+    """
+    Inverse of what `github_cards.create_and_show_issue` does:
+    an issue without a body comes from an idea without a title.
+    """
+    return Idea(
+        title=issue["title"] if issue["body"] else "",
+        body=issue["body"] or issue["title"],
+        labels=[label["name"] for label in issue["labels"]],
+        milestone=(issue["milestone"] or {}).get("title", ""),
+        assignees=[assignee["login"] for assignee in issue["assignees"]],
+        url=issue["html_url"],
+        repo=repo_full_name,
+    )
+
+
+def card_to_idea(card: dict[str, Any], project: dict[str, Any], column: str) -> Idea:
+    """
+    Inverse of what `github_cards.push_to_user` does: the title is the card's first line,
+    if it is a markdown heading.
+
+    >>> card_to_idea({"note": "# Title\\n\\nBody"}, {"name": "Ideas", "html_url": "https://github.com/users/ewen-lbh/projects/1"}, "To do").title
+    'Title'
+    """
+    title, body = "", card["note"] or ""
+    if body.startswith("# "):
+        title, _, body = body.partition("\n")
+        title, body = title.removeprefix("# ").strip(), body.strip()
+    return Idea(
+        title=title,
+        body=body,
+        project=project["name"],
+        column=column,
+        url=project["html_url"],
+        repo=project["name"],
+    )
+
+
+@contextmanager
+def _state(
+    local_copy: Path, filename: str, default: dict[str, Any]
+) -> Iterator[dict[str, Any]]:
+    """
+    Loads the state file `filename` of `local_copy` (or `default` if there is none yet), and writes it back
+    after the `with` block, even if it is left with an exception: what was written until then is not
+    fetched again. Other ideaseed processes wait until then to use it (see `ideaseed.locking`).
+    """
+    state_path = ondisk.state_dir(local_copy) / filename
+    with locking.locked(state_path):
+        state = (
+            json.loads(state_path.read_text())
+            if state_path.exists()
+            else copy.deepcopy(default)
+        )
+        try:
+            yield state
+        finally:
+            ondisk.atomic_write(state_path, json.dumps(state))
+
+
+def pull_issues(gh: Github, repo_full_name: str, local_copy: Path) -> SyncReport:
+    """
+    Writes the issues of `repo_full_name` that are new or changed since the last pull into `local_copy`,
+    as DIR/USER/REPO/slug.md. Pull requests are left out.
+    Issues updated since the last pull are listed with `since=`, and the request is conditional:
+    when nothing changed, pulling costs a single request (answered with a 304, which does not count
+    towards the rate limit).
+    An ETag only matches a request with the same `since=`, so the two are saved together, and `since=`
+    is only moved up to the last pulled issue once listing the issues again would take more than a page.
+    """
+    with _state(local_copy, GITHUB_STATE_FILE, _GITHUB_DEFAULT_STATE) as state:
+        repo_state = state["repos"].setdefault(
+            repo_full_name,
+            {"etag": None, "since": None, "watermark": None, "issues": {}},
+        )
+        report = SyncReport(created=[], updated=[], conflicts=[])
+        parameters = {
+            "state": "all",
+            "sort": "updated",
+            "direction": "asc",
+            "per_page": 100,
+        }
+        since = (
+            repo_state.get("since") if repo_state["etag"] else repo_state["watermark"]
+        )
+        if since:
+            parameters["since"] = since
+        etag, issues = github_cards.get_pages(
+            gh, f"/repos/{repo_full_name}/issues", parameters, repo_state["etag"]
+        )
+        if etag is None:
+            return report
+
+        listed = 0
+        with ondisk.group_commit():
+            try:
+                for issue in issues:
+                    listed += 1
+                    _pull_issue(issue, repo_full_name, repo_state, local_copy, report)
+            except RateLimitExceededException as error:
+                # Issues come oldest first, so the next pull picks up from the watermark.
+                # The ETag is dropped, or the next pull would start from its older `since=`.
+                repo_state["etag"] = repo_state["since"] = None
+                return report._replace(interrupted=str(error))
+
+        if listed <= parameters["per_page"]:
+            # Listing these issues again once something changed costs as much as the one request
+            # it would take to get an ETag for the watermark, and unchanged pulls get a 304 right away
+            repo_state["etag"], repo_state["since"] = etag, since
+        else:
+            repo_state["etag"] = repo_state["since"] = None
+
+    return report
+
+
+def _pull_issue(
+    issue: dict[str, Any],
+    repo_full_name: str,
+    repo_state: dict[str, Any],
+    local_copy: Path,
+    report: SyncReport,
+):
+    if "pull_request" in issue:
+        return
+    if not repo_state["watermark"] or issue["updated_at"] > repo_state["watermark"]:
+        repo_state["watermark"] = issue["updated_at"]
+
+    idea = issue_to_idea(issue, repo_full_name)
+    digest = content_hash(idea)
+    known = repo_state["issues"].get(str(issue["number"]))
+    if known and known["hash"] == digest:
+        return
+    if known and (local_copy / known["path"]).exists():
+        # Keep what GitHub issues don't know about (their project card...)
+        previous = ondisk.load(local_copy, local_copy / known["path"])
+        idea.project, idea.column = previous.project, previous.column
+
+    if written := _write(
+        local_copy,
+        idea,
+        known,
+        report,
+        same_idea=lambda existing: existing.url == idea.url,
+    ):
+        repo_state["issues"][str(issue["number"])] = {
+            "path": written,
+            "hash": digest,
+        }
+
+
+def pull_user_cards(gh: Github, local_copy: Path) -> SyncReport:
+    """
+    Writes the note cards of the logged-in user's projects that are new or changed since the last pull
+    into `local_copy`, as DIR/PROJECT/slug.md.
+    Cards of issues are left out, use `pull_issues` on their repository instead.
+    Listing projects is a conditional request, and only projects updated since the last pull are looked into.
+    """
+    with _state(local_copy, GITHUB_STATE_FILE, _GITHUB_DEFAULT_STATE) as state:
+        user_state = state["user"]
+        report = SyncReport(created=[], updated=[], conflicts=[])
+        login = gh.get_user().login
+        etag, projects = github_cards.get_pages(
+            gh,
+            f"/users/{login}/projects",
+            {"state": "all", "per_page": 100},
+            user_state["etag"],
+            accept=github_cards.PROJECTS_PREVIEW,
+        )
+        if etag is None:
+            return report
+
+        with ondisk.group_commit():
+            for project in projects:
+                if (
+                    user_state["projects"].get(str(project["id"]))
+                    == project["updated_at"]
+                ):
+                    continue
+                _, columns = github_cards.get_pages(
+                    gh,
+                    project["columns_url"],
+                    {"per_page": 100},
+                    accept=github_cards.PROJECTS_PREVIEW,
+                )
+                for column in columns:
+                    _, cards = github_cards.get_pages(
+                        gh,
+                        column["cards_url"],
+                        {"per_page": 100},
+                        accept=github_cards.PROJECTS_PREVIEW,
+                    )
+                    for card in cards:
+                        if not card.get("note"):
+                            continue
+                        idea = card_to_idea(card, project, column["name"])
+                        digest = content_hash(idea)
+                        known = user_state["cards"].get(str(card["id"]))
+                        if known and known["hash"] == digest:
+                            continue
+                        if written := _write(local_copy, idea, known, report):
+                            user_state["cards"][str(card["id"])] = {
+                                "path": written,
+                                "hash": digest,
+                            }
+                user_state["projects"][str(project["id"])] = project["updated_at"]
+
+        user_state["etag"] = etag
+
+    return report
@@ -1,3 +1,5 @@
+import sys
+from functools import lru_cache
 from shutil import get_terminal_size
 from typing import Iterable, NamedTuple, Optional
 
@@ -7,11 +9,9 @@ from rich import print
 from rich.align import Align
 from rich.box import Box
 from rich.console import Console, ConsoleOptions, RenderResult
-from rich.markdown import CodeBlock, Markdown
-from rich.padding import Padding
 from rich.panel import Panel
-from rich.syntax import Syntax
 from rich.table import Table
+from rich.text import Text
 
 from ideaseed import queyd
 from ideaseed.utils import readable_on
@@ -55,18 +55,30 @@ https://github.com/docopt
 """
 
 
-# Remove ugly frames around markdown code blocks
-# see https://github.com/willmcgugan/rich/issues/264
-class FramelessCodeBlock(CodeBlock):
-    def __rich_console__(
-        self, console: Console, options: ConsoleOptions
-    ) -> RenderResult:
-        code = str(self.text).rstrip()
-        syntax = Padding(Syntax(code, self.lexer_name, theme=self.theme), pad=(1, 4))
-        yield syntax
-
-
-Markdown.elements["code_block"] = FramelessCodeBlock
+@lru_cache(maxsize=None)
+def markdown() -> type:
+    """
+    rich's Markdown renderable, imported the first time a card is shown
+    (it takes a while to import, and is not needed with plain output)
+    """
+    from rich.markdown import CodeBlock, Markdown
+    from rich.padding import Padding
+    from rich.syntax import Syntax
+
+    # Remove ugly frames around markdown code blocks
+    # see https://github.com/willmcgugan/rich/issues/264
+    class FramelessCodeBlock(CodeBlock):
+        def __rich_console__(
+            self, console: Console, options: ConsoleOptions
+        ) -> RenderResult:
+            code = str(self.text).rstrip()
+            syntax = Padding(
+                Syntax(code, self.lexer_name, theme=self.theme), pad=(1, 4)
+            )
+            yield syntax
+
+    Markdown.elements["code_block"] = FramelessCodeBlock
+    return Markdown
 
 
 class Label(NamedTuple):
@@ -108,7 +120,7 @@ def make_card(
     card = Table.grid(padding=1, expand=True)
     card.add_column()
     card.add_row(header)
-    card.add_row(Markdown(description))
+    card.add_row(markdown()(description))
 
     if labels:
         label_row = Table.grid(expand=True)
@@ -165,10 +177,39 @@ def make_table(
     return listing
 
 
+@lru_cache(maxsize=None)
 def get_console() -> Console:
+    """
+    The console cards and tables are printed with, the same for the whole process
+    """
     return Console(width=min(get_terminal_size().columns, 75))
 
 
+@lru_cache(maxsize=None)
+def plain_output() -> bool:
+    """
+    Whether to print plain lines instead of cards and tables, because nobody will see them
+    (stdout is not a terminal, e.g. when ideaseed is run from a script)
+    """
+    return not sys.stdout.isatty()
+
+
+def show_table(**rows):
+    """
+    Prints `make_table(**rows)`, or one ``name: value`` line per row with plain output
+    (see `plain_output`).
+    """
+    if plain_output():
+        for name, value in rows.items():
+            if value:
+                if isinstance(value, (list, tuple)):
+                    value = ", ".join(map(str, value))
+                value = str(value)
+                sys.stdout.write(f"{name}: {Text.from_markup(value).plain}\n")
+        return
+    get_console().print(make_table(**rows))
+
+
 def show(
     title: str,
     right_of_title: str,
@@ -182,6 +223,16 @@ def show(
     project_column: Optional[str] = None,
     url: Optional[str] = None,
 ):
+    if plain_output():
+        show_table(
+            milestone=milestone,
+            assignees=assignees,
+            project=project,
+            project_column=project_column,
+            url=url,
+        )
+        return
+
     c = get_console()
     c.print(
         make_card(
@@ -194,19 +245,17 @@ def show(
         )
     )
     c.print()
-    c.print(
-        make_table(
-            milestone=milestone,
-            assignees=assignees,
-            project=project,
-            project_column=project_column,
-            url=url,
-        )
+    show_table(
+        milestone=milestone,
+        assignees=assignees,
+        project=project,
+        project_column=project_column,
+        url=url,
     )
 
 
 def dry_run_banner() -> Panel:
-    width = min(get_terminal_size().columns, 75)
+    width = get_console().width
     return Panel(
         Align(
             """\
@@ -227,7 +276,9 @@ Creation of objects from --create-missing will still occur
 
 
 def show_dry_run_banner(dry_run: bool, **_) -> None:
-    if dry_run:
+    if dry_run and plain_output():
+        print("dry-run: issues and cards will not be created")
+    elif dry_run:
         print()
         print(dry_run_banner())
         print()
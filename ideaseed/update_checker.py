@@ -4,20 +4,20 @@ from xml.dom.minidom import parseString as parse_xml
 
 import requests
 from rich import print
-from rich.markdown import Markdown
 from rich.rule import Rule
 from semantic_version import Version
 
-from ideaseed.constants import RELEASES_RSS_URL, VERSION
-from ideaseed.ui import \
-    FramelessCodeBlock  # markdown with no ugly frame around code blocks
+from ideaseed import deadline
+from ideaseed.constants import NETWORK_TIMEOUT, RELEASES_RSS_URL, VERSION
+from ideaseed.ui import markdown
 from ideaseed.utils import answered_yes_to, ask
 
-Markdown.elements["code_block"] = FramelessCodeBlock
-
 
 def get_latest_version() -> Version:
-    raw_rss = requests.get(RELEASES_RSS_URL).text
+    with deadline.cut_short():
+        raw_rss = requests.get(
+            RELEASES_RSS_URL, timeout=deadline.timeout(NETWORK_TIMEOUT)
+        ).text
     rss = parse_xml(raw_rss)
     version = (
         rss.childNodes[0]
@@ -31,9 +31,11 @@ def get_latest_version() -> Version:
 
 
 def get_release_notes() -> str:
-    return requests.get(
-        "https://raw.githubusercontent.com/ewen-lbh/ideaseed/master/CHANGELOG.md"
-    ).text
+    with deadline.cut_short():
+        return requests.get(
+            "https://raw.githubusercontent.com/ewen-lbh/ideaseed/master/CHANGELOG.md",
+            timeout=deadline.timeout(NETWORK_TIMEOUT),
+        ).text
 
 
 def get_changelog_heading_anchor(release_notes: str, upgrade_to: Version) -> str:
@@ -151,7 +153,7 @@ def prompt(upgrade_from: Version, upgrade_to: Version) -> bool:
                 f"Release notes for [bold blue]{upgrade_from}[/] [magenta]->[/] [bold blue]{upgrade_to}[/]"
             )
         )
-        print(Markdown(notes))
+        print(markdown()(notes))
         return answered_yes_to("Update now?")
 
     return True
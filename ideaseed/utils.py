@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+from itertools import islice
 from random import randint
-from typing import Any, Callable, Iterable, Optional, Text, Union
+from typing import (Any, Callable, Iterable, Iterator, Optional, Text, TypeVar,
+                    Union)
 
 from rich import print
 from rich.console import Console
@@ -9,6 +11,8 @@ from rich.prompt import (Confirm, DefaultType, InvalidResponse, Prompt,
                          PromptType)
 from rich.text import TextType
 
+T = TypeVar("T")
+
 
 class BetterPrompt(Prompt):
     """
@@ -201,6 +205,18 @@ def remove_duplicates_in_list_of_dict(o: dict[Any, Union[Any, list]]) -> dict:
     }
 
 
+def chunked(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """
+    Splits `items` into lists of at most `size` elements
+
+    >>> list(chunked(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+    """
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
 if __name__ == "__main__":
     import doctest
 
@@ -0,0 +1,352 @@
+"""
+Pushes edits made to local copies back to the GitHub issue or Google Keep note
+they were created as (``ideaseed watch``).
+
+Changes are picked up with inotify, so only the files that were actually written to are read
+(and, once, the files that were never seen before).
+Only the fields that changed since the last time a file was synced are sent.
+The state of every synced file is kept in DIR/.ideaseed/watch.json.
+
+A file that was never seen before is taken as it is: it was written by ideaseed itself
+(a push with ``--local-copy``, a sync...), so it already holds what is upstream.
+Only its later edits are pushed.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import json
+import os
+import re
+import select
+import struct
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+import yaml
+from github import Github
+from github.GithubException import GithubException
+from github.Milestone import Milestone
+from gkeepapi import Keep
+from gkeepapi.exception import APIException
+from gkeepapi.node import ColorValue
+from rich import print
+
+from ideaseed import github_cards, gkeep, locking, ondisk
+from ideaseed.constants import COLOR_ALIASES, UsageError
+from ideaseed.ondisk import Idea
+
+WATCH_STATE_FILE = "watch.json"
+# Seconds without any new change to wait for before syncing, so that an editor saving a file
+# several times in a row (or a `git checkout`) only results in one update per file
+DEBOUNCE_DELAY = 0.5
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+GITHUB_ISSUE_URL = re.compile(r"https://github\.com/([^/]+/[^/]+)/issues/(\d+)")
+GOOGLE_KEEP_NOTE_URL = re.compile(r"https://keep\.google\.com/(?:u/\d+/)?#NOTE/(.+)")
+
+
+class Inotify:
+    """
+    Watches a directory and all of its subdirectories (ideaseed's own state directory excepted)
+    for files that get written to or moved in.
+    """
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise UsageError("watch needs inotify, which is only available on Linux")
+        self._libc = libc
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self.directories: dict[int, Path] = {}
+
+    def watch(self, directory: Path):
+        descriptor = self._libc.inotify_add_watch(
+            self.fd,
+            os.fsencode(directory),
+            IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE,
+        )
+        if descriptor < 0:
+            raise OSError(
+                ctypes.get_errno(), os.strerror(ctypes.get_errno()), directory
+            )
+        self.directories[descriptor] = directory
+        for entry in os.scandir(directory):
+            if (
+                entry.is_dir(follow_symlinks=False)
+                and entry.name != ondisk.STATE_DIR_NAME
+            ):
+                self.watch(Path(entry.path))
+
+    def events(self) -> Iterator[Path]:
+        """
+        Paths of the markdown files that were created, written to or moved in,
+        among the events that are waiting to be read (blocks until there is one).
+        """
+        buffer = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(buffer):
+            descriptor, mask, _, length = _EVENT.unpack_from(buffer, offset)
+            name = buffer[offset + _EVENT.size : offset + _EVENT.size + length]
+            offset += _EVENT.size + length
+            if mask & IN_IGNORED:
+                self.directories.pop(descriptor, None)
+                continue
+            if descriptor not in self.directories:
+                continue
+            path = self.directories[descriptor] / os.fsdecode(name.rstrip(b"\0"))
+            if mask & IN_ISDIR:
+                if path.name != ondisk.STATE_DIR_NAME:
+                    self.watch(path)
+            elif (
+                mask & (IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+                and path.suffix == ".md"
+            ):
+                # Created also covers hard links (see `ondisk.atomic_write`)
+                yield path
+
+    def changes(self) -> set[Path]:
+        """
+        Waits for a file to change, then for changes to stop coming for `DEBOUNCE_DELAY` seconds.
+        """
+        changed: set[Path] = set()
+        timeout = None
+        while select.select([self.fd], [], [], timeout)[0]:
+            changed.update(self.events())
+            if changed:
+                timeout = DEBOUNCE_DELAY
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def synced_values(idea: Idea) -> dict[str, Any]:
+    """
+    Fields of a local copy that get pushed when they change
+    """
+    return {
+        "title": idea.title or "",
+        "body": idea.body or "",
+        "labels": sorted(map(str, idea.labels)),
+        "milestone": idea.milestone or "",
+        "pinned": bool(idea.pinned),
+        "color": idea.color or "",
+    }
+
+
+def changed_fields(
+    before: Optional[dict[str, Any]], after: dict[str, Any]
+) -> list[str]:
+    """
+    Names of the fields that differ between `before` and `after`.
+    Every field is considered changed if the file was never synced before.
+
+    >>> changed_fields({"title": "A", "body": "B"}, {"title": "A", "body": "C"})
+    ['body']
+    >>> changed_fields(None, {"title": "A", "body": "B"})
+    ['title', 'body']
+    """
+    if before is None:
+        return list(after)
+    return [field for field, value in after.items() if before.get(field) != value]
+
+
+def track_new_files(
+    local_copy: Path, state: dict[str, dict[str, Any]], filepaths: Iterable[Path]
+) -> list[str]:
+    """
+    Adds the local copies among `filepaths` that are not in `state` yet, as they are now.
+    Files that cannot be updated upstream are left out.
+    Returns the paths (relative to `local_copy`) that were added.
+    """
+    added = []
+    for filepath in filepaths:
+        relative_path = filepath.relative_to(local_copy).as_posix()
+        if relative_path in state:
+            continue
+        try:
+            idea = ondisk.load(local_copy, filepath)
+        except (FileNotFoundError, ValueError, yaml.YAMLError):
+            continue
+        if upstream_of(idea.url or "") is None:
+            continue
+        state[relative_path] = synced_values(idea)
+        added.append(relative_path)
+    return added
+
+
+def push_to_github_issue(
+    gh: Github, repo_full_name: str, number: int, idea: Idea, fields: list[str]
+):
+    repo = gh.get_repo(repo_full_name)
+    issue = repo.get_issue(number)
+    changes: dict[str, Any] = {}
+    if "title" in fields or "body" in fields:
+        # Issues created from an idea without a title have its body as their title,
+        # see `github_cards.create_and_show_issue`
+        changes["title"] = idea.title or idea.body
+        changes["body"] = idea.body if idea.title else ""
+    if "labels" in fields:
+        changes["labels"] = [str(label) for label in idea.labels]
+    if "milestone" in fields:
+        if idea.milestone:
+            milestone = next(
+                (
+                    m
+                    for m in github_cards.list_objects(
+                        repo,
+                        Milestone,
+                        f"{repo.url}/milestones",
+                        [idea.milestone],
+                        get_name=lambda m: m.title,
+                        parameters={"state": "all"},
+                    )
+                    if m.title == idea.milestone
+                ),
+                None,
+            )
+            if milestone is None:
+                raise UsageError(
+                    f"Milestone {idea.milestone!r} not found in {repo_full_name}"
+                )
+            changes["milestone"] = milestone
+        else:
+            changes["milestone"] = None
+    if changes:
+        issue.edit(**changes)
+
+
+def push_to_gkeep_note(keep: Keep, note_id: str, idea: Idea, fields: list[str]):
+    note = keep.get(note_id)
+    if note is None:
+        raise UsageError(f"Google Keep note {note_id} not found")
+    if "title" in fields:
+        note.title = idea.title or ""
+    if "body" in fields:
+        note.text = idea.body or ""
+    if "pinned" in fields:
+        note.pinned = bool(idea.pinned)
+    if "color" in fields:
+        color = COLOR_ALIASES.get(idea.color, idea.color) or "White"
+        note.color = getattr(ColorValue, color)
+    if "labels" in fields:
+        wanted = {str(label) for label in idea.labels}
+        for label in note.labels.all():
+            if label.name not in wanted:
+                note.labels.remove(label)
+        for name in wanted - {label.name for label in note.labels.all()}:
+            label = keep.findLabel(name)
+            if label is None:
+                raise UsageError(f"Google Keep label {name!r} not found")
+            note.labels.add(label)
+    keep.sync()
+
+
+def upstream_of(url: str) -> Optional[tuple[str, tuple]]:
+    """
+    Where the idea at `url` lives: ("github", (repo full name, issue number))
+    or ("google_keep", (note ID,)), or `None` if it cannot be updated (e.g. a project card).
+
+    >>> upstream_of("https://github.com/ewen-lbh/ideaseed/issues/42")
+    ('github', ('ewen-lbh/ideaseed', 42))
+    >>> upstream_of("https://keep.google.com/u/0/#NOTE/1a2b3c")
+    ('google_keep', ('1a2b3c',))
+    >>> upstream_of("https://github.com/users/ewen-lbh/projects/1") is None
+    True
+    """
+    if match := GITHUB_ISSUE_URL.fullmatch(url):
+        return "github", (match.group(1), int(match.group(2)))
+    if match := GOOGLE_KEEP_NOTE_URL.fullmatch(url):
+        return "google_keep", (match.group(1),)
+    return None
+
+
+def watch(local_copy: Path, auth_cache: Path, dry_run: bool = False):
+    """
+    Pushes changes made to local copies in `local_copy` until interrupted.
+    Logging in to GitHub or Google Keep only happens once a file that needs it changes.
+    """
+    state_path = ondisk.state_dir(local_copy) / WATCH_STATE_FILE
+    state: dict[str, dict[str, Any]] = (
+        json.loads(state_path.read_text()) if state_path.exists() else {}
+    )
+    clients: dict[str, Any] = {}
+    logins: dict[str, Callable[[], Any]] = {
+        "github": lambda: github_cards.AuthCache(auth_cache).login(),
+        "google_keep": lambda: gkeep.AuthCache(auth_cache).login(),
+    }
+    pushers = {"github": push_to_github_issue, "google_keep": push_to_gkeep_note}
+
+    inotify = Inotify()
+    inotify.watch(local_copy)
+    tracked = track_new_files(
+        local_copy,
+        state,
+        (Path(entry.path) for entry in ondisk.iter_local_copies(local_copy)),
+    )
+    print(f"Watching [bold]{local_copy}[/] for changes. Hit Ctrl-C to stop.")
+    try:
+        while True:
+            changes = sorted(inotify.changes())
+            # Created since we started watching, e.g. by `ideaseed --local-copy`
+            changed = {*tracked, *track_new_files(local_copy, state, changes)}
+            tracked = []
+            for filepath in changes:
+                relative_path = filepath.relative_to(local_copy).as_posix()
+                try:
+                    idea = ondisk.load(local_copy, filepath)
+                except (FileNotFoundError, ValueError, yaml.YAMLError):
+                    # Deleted since, or in the middle of being edited
+                    continue
+                upstream = upstream_of(idea.url or "")
+                if upstream is None:
+                    continue
+                service, reference = upstream
+                values = synced_values(idea)
+                fields = changed_fields(state.get(relative_path), values)
+                if not fields:
+                    continue
+
+                if dry_run:
+                    print(f"Would update {', '.join(fields)} of {idea.url}")
+                    continue
+                try:
+                    if service not in clients:
+                        clients[service] = logins[service]()
+                    pushers[service](clients[service], *reference, idea, fields)
+                except (GithubException, APIException, UsageError) as error:
+                    print(f"[red]Could not update {idea.url}: {error}")
+                    continue
+                print(
+                    f"Updated {', '.join(fields)} of [blue link {idea.url}]{idea.url}"
+                )
+                state[relative_path] = values
+                changed.add(relative_path)
+
+            if changed and not dry_run:
+                # Another ideaseed process might be watching another part of the directory:
+                # only the files we changed are written, what we have of the others may be outdated
+                with locking.locked(state_path):
+                    on_disk = (
+                        json.loads(state_path.read_text())
+                        if state_path.exists()
+                        else {}
+                    )
+                    state = on_disk | {path: state[path] for path in changed}
+                    ondisk.atomic_write(
+                        state_path, json.dumps(state), durability="file"
+                    )
+    finally:
+        inotify.close()